@@ -1,9 +1,15 @@
 # backend/app/attacks/__init__.py
-from .zero_width import ZeroWidthAttack
-from .direct_injection import DirectInjectionAttack
-from .role_manipulation import RoleManipulationAttack
-from .delimiter_injection import DelimiterInjectionAttack
-from .encoded_payload import EncodedPayloadAttack
+# Detector classes are imported on first access, so importing one detector
+# module (or the package, for the registry) does not load the others
+import importlib
+
+_MODULES = {
+    'ZeroWidthAttack': '.zero_width',
+    'DirectInjectionAttack': '.direct_injection',
+    'RoleManipulationAttack': '.role_manipulation',
+    'DelimiterInjectionAttack': '.delimiter_injection',
+    'EncodedPayloadAttack': '.encoded_payload',
+}
 
 __all__ = [
     'ZeroWidthAttack',
@@ -11,4 +17,10 @@ __all__ = [
     'RoleManipulationAttack',
     'DelimiterInjectionAttack',
     'EncodedPayloadAttack',
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        return getattr(importlib.import_module(_MODULES[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,12 @@
 # backend/app/attacks/base.py
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import Any, List, Dict, Optional, Tuple
 from dataclasses import dataclass
 
+# (start, end, rule_id) of a rule match in the scanned text; plain tuples,
+# as a finding on a large text can have thousands
+Span = Tuple[int, int, str]
+
 @dataclass
 class AttackResult:
     """Result of a single attack test"""
@@ -15,6 +19,25 @@ class AttackResult:
     evidence: Optional[str] = None
     mitigation: Optional[str] = None
     reference_url: Optional[str] = None
+    timed_out: bool = False  # ran out of time budget; findings may be incomplete
+    decoded_from: Optional[List[Dict[str, Any]]] = None  # layers of encoding the finding was under, outermost first
+    spans: Optional[List[Span]] = None  # rule matches behind a finding, in text order; evidence may be built from them
+
+@dataclass(frozen=True)
+class Rule:
+    """A regex rule a detector contributes to the shared scan"""
+    rule_id: str
+    pattern: str
+    flags: int = 0
+
+# Spans matched per rule id, in the order findall() would have returned them
+RuleHits = Dict[str, List[Tuple[int, int]]]
+
+def hit_spans(hits: RuleHits, rules: List[Rule]) -> List[Span]:
+    """The spans matched for rules, in text order"""
+    spans = [(start, end, rule.rule_id) for rule in rules for start, end in hits.get(rule.rule_id, ())]
+    spans.sort()
+    return spans
 
 class BaseAttack(ABC):
     """Base class for all attack types"""
@@ -23,6 +46,7 @@ class BaseAttack(ABC):
         self.name = self.__class__.__name__
         self.description = ""
         self.severity_base = 0.5
+        self._matcher = None
     
     @abstractmethod
     def detect(self, text: str) -> AttackResult:
@@ -40,6 +64,82 @@ class BaseAttack(ABC):
         """
         pass
     
+    def get_rules(self) -> List[Rule]:
+        """
+        Regex rules matched on this detector's behalf by the scan engine.
+        Detectors that return rules must implement score(); the others
+        are run through detect() directly.
+        """
+        return []
+    
+    def score(self, text: str, hits: RuleHits) -> AttackResult:
+        """
+        Build an AttackResult from the spans matched for get_rules().
+        Detectors may leave out the evidence and keep the spans instead,
+        building it in render_evidence() only when the result is shown.
+        """
+        raise NotImplementedError
+    
+    def evidence(self, text: str, result: AttackResult) -> Optional[str]:
+        """Return the evidence of a result scored from text, building it from its spans if need be"""
+        if result.evidence is not None or not result.spans:
+            return result.evidence
+        return self.render_evidence(text, result.spans)
+    
+    def render_evidence(self, text: str, spans: List[Span]) -> Optional[str]:
+        """Build the evidence string for a finding from where its rules matched in text"""
+        return None
+    
+    def match_rules(self, text: str) -> RuleHits:
+        """Match this detector's rules on their own, outside a shared scan"""
+        if self._matcher is None:
+            from ..engine import RuleMatcher
+            self._matcher = RuleMatcher({self.name: self.get_rules()})
+        return self._matcher.scan(text)[self.name]
+    
+    # Whether findings never cross a line break, so that lex_line() and
+    # detect_lines() can stand in for detect()
+    line_local = False
+
+    def lex_line(self, line: str) -> Any:
+        """What detect() needs from one line of a text, for line_local detectors"""
+        raise NotImplementedError(f"{self.name} does not scan line by line")
+
+    def detect_lines(self, lexed: List[Any]) -> AttackResult:
+        """The result detect() returns for a text, from lex_line() of each of its lines in order"""
+        raise NotImplementedError(f"{self.name} does not scan line by line")
+
+    def start_stream(self) -> Dict:
+        """
+        Return the running state for scanning a text window by window.
+        Detectors without rules may implement this with feed_stream() and
+        finish_stream() to keep less than the text; rule-based detectors
+        are streamed by the engine. By default the text is collected and
+        passed to detect() at the end.
+        """
+        return {"pieces": []}
+
+    def feed_stream(self, state: Dict, window: str, owned: int) -> None:
+        """
+        Update state from a window of the text. Only findings starting
+        before window[owned] belong to this window; the next window starts
+        at window[owned], so later ones are seen again there.
+        """
+        state["pieces"].append(window[:owned])
+
+    def finish_stream(self, state: Dict) -> AttackResult:
+        """Build the AttackResult for a text streamed through feed_stream()"""
+        return self.detect("".join(state["pieces"]))
+
+    def stream_reach(self, window: str) -> int:
+        """
+        The earliest position in window from which a finding could still
+        run past its end; the stream holds the window open while that is
+        inside the part it would keep. Findings no longer than the overlap
+        need not be reported.
+        """
+        return len(window)
+
     def get_info(self) -> Dict:
         """Return information about this attack type"""
         return {
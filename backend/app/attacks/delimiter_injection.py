@@ -1,5 +1,5 @@
 # backend/app/attacks/delimiter_injection.py
-from .base import BaseAttack, AttackResult
+from .base import BaseAttack, AttackResult, Rule, RuleHits, hit_spans
 import re
 
 class DelimiterInjectionAttack(BaseAttack):
@@ -35,26 +35,32 @@ class DelimiterInjectionAttack(BaseAttack):
         super().__init__()
         self.description = "Detects attempts to escape prompt delimiters or break structured formats"
         self.severity_base = 0.75
-        self.compiled_delimiters = [re.compile(d) for d in self.DELIMITERS]
-        self.compiled_breaks = [re.compile(p, re.IGNORECASE) for p in self.BREAK_PATTERNS]
+        self.delimiter_rules = [
+            Rule(f"delimiter.{i}", d) for i, d in enumerate(self.DELIMITERS)
+        ]
+        self.break_rules = [
+            Rule(f"delimiter.break.{i}", p, re.IGNORECASE) for i, p in enumerate(self.BREAK_PATTERNS)
+        ]
+    
+    def get_rules(self):
+        return self.delimiter_rules + self.break_rules
     
     def detect(self, text: str) -> AttackResult:
         """Detect delimiter injection attempts"""
-        delimiter_count = {}
-        break_attempts = []
-        
+        return self.score(text, self.match_rules(text))
+    
+    def score(self, text: str, hits: RuleHits) -> AttackResult:
+        """Score the delimiters and break patterns matched in text"""
         # Count delimiter occurrences
-        for i, pattern in enumerate(self.compiled_delimiters):
-            matches = pattern.findall(text)
-            if matches:
-                delimiter_name = self.DELIMITERS[i]
-                delimiter_count[delimiter_name] = len(matches)
+        delimiter_count = {}
+        for delimiter_name, rule in zip(self.DELIMITERS, self.delimiter_rules):
+            if rule.rule_id in hits:
+                delimiter_count[delimiter_name] = len(hits[rule.rule_id])
         
         # Check for delimiter breaking patterns
-        for pattern in self.compiled_breaks:
-            found = pattern.findall(text)
-            if found:
-                break_attempts.extend(found)
+        break_attempts = [
+            span for rule in self.break_rules for span in hits.get(rule.rule_id, ())
+        ]
         
         # Check for unbalanced delimiters (odd counts)
         unbalanced = {k: v for k, v in delimiter_count.items() if v % 2 != 0}
@@ -98,7 +104,8 @@ class DelimiterInjectionAttack(BaseAttack):
             description="Detected potential delimiter manipulation",
             evidence="; ".join(evidence_parts),
             mitigation="Use consistent delimiter syntax, validate delimiter balance, escape user input",
-            reference_url="https://github.com/your-repo/docs/delimiter-injection"
+            reference_url="https://github.com/your-repo/docs/delimiter-injection",
+            spans=hit_spans(hits, self.get_rules())
         )
     
     def generate_payload(self, instruction: str) -> str:
@@ -1,11 +1,54 @@
 # backend/app/attacks/encoded_payload.py
 from .base import BaseAttack, AttackResult
+from typing import Dict, List, Optional
 import re
 import base64
+import string
 
 class EncodedPayloadAttack(BaseAttack):
     """Detects encoded or obfuscated payloads"""
     
+    # Base64-like strings (length > 20, valid base64 chars)
+    BASE64_PATTERN = r'[A-Za-z0-9+/]{20,}={0,2}'
+    
+    # Hex strings (0x prefix or long hex sequences)
+    HEX_PATTERNS = [
+        r'0x[0-9a-fA-F]{8,}',
+        r'\\x[0-9a-fA-F]{2}',
+        r'[0-9a-fA-F]{32,}'  # Long hex without prefix
+    ]
+    
+    URL_PATTERN = r'%[0-9a-fA-F]{2}'
+    
+    UNICODE_PATTERNS = [
+        r'\\u[0-9a-fA-F]{4}',
+        r'\\U[0-9a-fA-F]{8}',
+    ]
+    
+    # The lexer: a base64, 0x or long hex match always lies inside a run of
+    # 10 or more base64 characters, so one pass over such runs finds them
+    # all. Escapes start with a literal, so each kind is only searched for
+    # in texts containing it, which most don't.
+    RUN_PATTERN = re.compile(r'([A-Za-z0-9+/]{10,})(={0,2})')
+    ESCAPES = [
+        ('%', "url", re.compile(URL_PATTERN)),
+        ('\\x', "hex", re.compile(HEX_PATTERNS[1])),
+        ('\\u', "unicode", re.compile(UNICODE_PATTERNS[0])),
+        ('\\U', "unicode", re.compile(UNICODE_PATTERNS[1])),
+    ]
+    HEX_PREFIXED = re.compile(HEX_PATTERNS[0])
+    HEX_LONG = re.compile(HEX_PATTERNS[2])
+    
+    # b64decode(validate=True) accepts a run of base64 characters exactly
+    # for these (length % 4, padding) pairs, whatever the characters are
+    BASE64_VALID = {(0, 0), (0, 1), (0, 2), (2, 2), (3, 1)}
+    
+    # What base64 and long hex matches are made of
+    RUN_CHARS = string.ascii_letters + string.digits + '+/='
+    
+    # No pattern matches across a line break
+    line_local = True
+    
     def __init__(self):
         super().__init__()
         self.description = "Detects base64, hex, or other encoded payloads that may hide malicious content"
@@ -13,27 +56,115 @@ class EncodedPayloadAttack(BaseAttack):
     
     def detect(self, text: str) -> AttackResult:
         """Detect encoded payloads"""
+        return self._found_result(self._lex(text))
+    
+    def lex_line(self, line: str) -> Dict:
+        return self._lex(line)
+    
+    def detect_lines(self, lexed: List[Dict]) -> AttackResult:
+        return self._found_result({
+            "base64": [match for found in lexed for match in found["base64"]],
+            "hex": sum(found["hex"] for found in lexed),
+            "url": sum(found["url"] for found in lexed),
+            "unicode": sum(found["unicode"] for found in lexed),
+        })
+    
+    def _found_result(self, found: Dict) -> AttackResult:
+        """Build the result from what _lex() found in a text"""
+        return self._result(
+            base64_count=len(found["base64"]),
+            hex_count=found["hex"],
+            url_count=found["url"] if found["url"] > 3 else 0,  # Only flag if multiple encodings
+            unicode_count=found["unicode"],
+            decoded_content=self._try_decode(found["base64"]),
+        )
+    
+    def _lex(self, text: str) -> Dict:
+        """
+        Find every pattern's matches: the base64 matches that would decode,
+        in order (told apart by length and padding, without decoding), and
+        how many hex, URL and unicode escape matches there are.
+        """
+        base64_matches: List[str] = []
+        hex_count = 0
+        for run, padding in self.RUN_PATTERN.findall(text):
+            if len(run) >= 20 and (len(run) % 4, len(padding)) in self.BASE64_VALID:
+                base64_matches.append(run + padding)
+            # Most shorter runs are long words, without a 0x
+            if '0x' in run:
+                hex_count += len(self.HEX_PREFIXED.findall(run))
+            if len(run) >= 32:
+                hex_count += len(self.HEX_LONG.findall(run))
+        
+        found = {"base64": base64_matches, "hex": hex_count, "url": 0, "unicode": 0}
+        for prefix, kind, pattern in self.ESCAPES:
+            if prefix in text:
+                found[kind] += len(pattern.findall(text))
+        return found
+    
+    def start_stream(self) -> Dict:
+        return {"base64": 0, "hex": 0, "url": 0, "unicode": 0, "samples": [], "offset": 0, "next_start": {}}
+    
+    def feed_stream(self, state: Dict, window: str, owned: int) -> None:
+        """Count the encodings starting in window[:owned]"""
+        offset, next_start = state["offset"], state["next_start"]
+        
+        def owned_matches(patterns):
+            # Like findall(), but resuming after the match each pattern
+            # ended in the previous window
+            found = []
+            for pattern in patterns:
+                compiled = re.compile(pattern)
+                for m in compiled.finditer(window, max(next_start.get(pattern, 0) - offset, 0)):
+                    if m.start() >= owned:
+                        break
+                    found.append(m.group())
+                    next_start[pattern] = offset + m.end()
+            return found
+        
+        for match in owned_matches([self.BASE64_PATTERN]):
+            if self._is_base64(match):
+                state["base64"] += 1
+                if len(state["samples"]) < 3:
+                    state["samples"].append(match)
+        state["hex"] += len(owned_matches(self.HEX_PATTERNS))
+        state["url"] += len(owned_matches([self.URL_PATTERN]))
+        state["unicode"] += len(owned_matches(self.UNICODE_PATTERNS))
+        state["offset"] += owned
+    
+    def stream_reach(self, window: str) -> int:
+        """Where the run of base64 characters ending window starts; a match in it may go on"""
+        return len(window.rstrip(self.RUN_CHARS))
+    
+    def finish_stream(self, state: Dict) -> AttackResult:
+        return self._result(
+            base64_count=state["base64"],
+            hex_count=state["hex"],
+            url_count=state["url"] if state["url"] > 3 else 0,
+            unicode_count=state["unicode"],
+            decoded_content=self._try_decode(state["samples"]),
+        )
+    
+    def _result(self, base64_count: int, hex_count: int, url_count: int,
+                unicode_count: int, decoded_content: str) -> AttackResult:
+        """Build the result from the encodings counted in a text"""
         findings = []
         
         # Check for Base64
-        base64_matches = self._detect_base64(text)
-        if base64_matches:
-            findings.append(f"Base64: {len(base64_matches)} instance(s)")
+        if base64_count:
+            findings.append(f"Base64: {base64_count} instance(s)")
         
         # Check for Hex encoding
-        hex_matches = self._detect_hex(text)
-        if hex_matches:
-            findings.append(f"Hex: {len(hex_matches)} instance(s)")
+        if hex_count:
+            findings.append(f"Hex: {hex_count} instance(s)")
         
         # Check for URL encoding
-        url_matches = self._detect_url_encoding(text)
-        if url_matches:
-            findings.append(f"URL encoded: {len(url_matches)} instance(s)")
+        if url_count:
+            findings.append(f"URL encoded: {url_count} instance(s)")
         
         # Check for Unicode escapes
-        unicode_matches = self._detect_unicode_escapes(text)
-        if unicode_matches:
-            findings.append(f"Unicode escapes: {len(unicode_matches)} instance(s)")
+        if unicode_count:
+            findings.append(f"Unicode escapes: {unicode_count} instance(s)")
         
         if not findings:
             return AttackResult(
@@ -48,8 +179,7 @@ class EncodedPayloadAttack(BaseAttack):
         # Calculate severity based on number and type of encodings
         severity = 0.4 + (len(findings) * 0.15)
         
-        # Try to decode and check for suspicious content
-        decoded_content = self._try_decode(text, base64_matches)
+        # Check decoded content for suspicious keywords
         if decoded_content and self._is_suspicious_decoded(decoded_content):
             severity += 0.2
             findings.append(f"Suspicious decoded content detected")
@@ -66,70 +196,24 @@ class EncodedPayloadAttack(BaseAttack):
             reference_url="https://github.com/ethan10clay/promptredteam-api/docs"
         )
     
-    def _detect_base64(self, text: str) -> list:
-        """Detect Base64 encoded strings"""
-        # Look for base64-like strings (length > 20, valid base64 chars)
-        pattern = r'[A-Za-z0-9+/]{20,}={0,2}'
-        matches = re.findall(pattern, text)
-        
-        # Validate they're actually base64
-        valid_matches = []
-        for match in matches:
-            try:
-                # Try to decode to verify it's valid base64
-                base64.b64decode(match, validate=True)
-                valid_matches.append(match)
-            except:
-                pass
-        
-        return valid_matches
-    
-    def _detect_hex(self, text: str) -> list:
-        """Detect hex encoded strings"""
-        # Look for hex strings (0x prefix or long hex sequences)
-        patterns = [
-            r'0x[0-9a-fA-F]{8,}',
-            r'\\x[0-9a-fA-F]{2}',
-            r'[0-9a-fA-F]{32,}'  # Long hex without prefix
-        ]
-        
-        matches = []
-        for pattern in patterns:
-            matches.extend(re.findall(pattern, text))
-        
-        return matches
-    
-    def _detect_url_encoding(self, text: str) -> list:
-        """Detect URL encoded strings"""
-        pattern = r'%[0-9a-fA-F]{2}'
-        matches = re.findall(pattern, text)
-        return matches if len(matches) > 3 else []  # Only flag if multiple encodings
-    
-    def _detect_unicode_escapes(self, text: str) -> list:
-        """Detect Unicode escape sequences"""
-        patterns = [
-            r'\\u[0-9a-fA-F]{4}',
-            r'\\U[0-9a-fA-F]{8}',
-        ]
-        
-        matches = []
-        for pattern in patterns:
-            matches.extend(re.findall(pattern, text))
-        
-        return matches
+    def _is_base64(self, match: str) -> bool:
+        """Check that a base64-like string actually decodes, without decoding it"""
+        data = match.rstrip('=')
+        return (len(data) % 4, len(match) - len(data)) in self.BASE64_VALID
     
-    def _try_decode(self, text: str, base64_matches: list) -> str:
+    def _decode_base64(self, match: str, decoded: Dict[str, str]) -> str:
+        """Decode a valid base64 match as UTF-8, once per match in a request"""
+        text = decoded.get(match)
+        if text is None:
+            text = decoded[match] = base64.b64decode(match).decode('utf-8', errors='ignore')
+        return text
+    
+    def _try_decode(self, base64_matches: List[str], decoded: Optional[Dict[str, str]] = None) -> str:
         """Attempt to decode base64 content"""
-        decoded_parts = []
-        
-        for match in base64_matches[:3]:  # Only try first 3
-            try:
-                decoded = base64.b64decode(match).decode('utf-8', errors='ignore')
-                decoded_parts.append(decoded)
-            except:
-                pass
-        
-        return ' '.join(decoded_parts)
+        if decoded is None:
+            decoded = {}
+        # Only try first 3
+        return ' '.join(self._decode_base64(match, decoded) for match in base64_matches[:3])
     
     def _is_suspicious_decoded(self, decoded: str) -> bool:
         """Check if decoded content contains suspicious keywords"""
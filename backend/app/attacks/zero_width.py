@@ -1,12 +1,19 @@
 # backend/app/attacks/zero_width.py
 from .base import BaseAttack, AttackResult
-from typing import Optional
+from typing import Dict, Optional
+import re
 
 class ZeroWidthAttack(BaseAttack):
     """Detects hidden messages in zero-width Unicode characters"""
     
     ZERO_WIDTH_CHARS = ['\u200b', '\u200c', '\u200d', '\ufeff']
     
+    # Runs of zero-width characters, collected in one pass over the text
+    ZERO_WIDTH_RUNS = re.compile('[' + ''.join(ZERO_WIDTH_CHARS) + ']+')
+    
+    # Hidden characters kept for decoding when streaming a text
+    MAX_STREAM_HIDDEN = 65536
+    
     def __init__(self):
         super().__init__()
         self.description = "Detects messages hidden in zero-width Unicode characters (ZWJ, ZWNJ, ZWSP)"
@@ -15,9 +22,33 @@ class ZeroWidthAttack(BaseAttack):
     def detect(self, text: str) -> AttackResult:
         """Detect and decode zero-width character injection"""
         
-        # Extract zero-width characters
-        hidden_chars = ''.join(c for c in text if c in self.ZERO_WIDTH_CHARS)
-        
+        hidden_chars = self._extract(text)
+        return self._result(hidden_chars, len(hidden_chars))
+    
+    def _extract(self, text: str) -> str:
+        """Return the zero-width characters of text, in order"""
+        # Most texts have none, and substring checks are much cheaper than the regex
+        if not any(c in text for c in self.ZERO_WIDTH_CHARS):
+            return ''
+        return ''.join(self.ZERO_WIDTH_RUNS.findall(text))
+    
+    def start_stream(self) -> Dict:
+        return {"count": 0, "kept": 0, "hidden": []}
+    
+    def feed_stream(self, state: Dict, window: str, owned: int) -> None:
+        """Collect the hidden characters of window[:owned]"""
+        hidden_chars = self._extract(window[:owned])
+        state["count"] += len(hidden_chars)
+        room = self.MAX_STREAM_HIDDEN - state["kept"]
+        if hidden_chars and room > 0:
+            state["hidden"].append(hidden_chars[:room])
+            state["kept"] += min(len(hidden_chars), room)
+    
+    def finish_stream(self, state: Dict) -> AttackResult:
+        return self._result(''.join(state["hidden"]), state["count"])
+    
+    def _result(self, hidden_chars: str, char_count: int) -> AttackResult:
+        """Build the result for the hidden characters found in a text"""
         if not hidden_chars:
             return AttackResult(
                 attack_name="Zero-Width Injection",
@@ -31,7 +62,7 @@ class ZeroWidthAttack(BaseAttack):
         # Try to decode
         decoded_message = self._decode_binary(hidden_chars)
         
-        severity = self._calculate_severity(len(hidden_chars), decoded_message)
+        severity = self._calculate_severity(char_count, decoded_message)
         
         return AttackResult(
             attack_name="Zero-Width Injection",
@@ -39,43 +70,43 @@ class ZeroWidthAttack(BaseAttack):
             detected=True,
             severity=severity,
             confidence=0.95 if decoded_message else 0.7,
-            description=f"Found {len(hidden_chars)} zero-width characters",
+            description=f"Found {char_count} zero-width characters",
             evidence=decoded_message if decoded_message else hidden_chars[:50],
             mitigation="Remove or escape zero-width Unicode characters before processing",
             reference_url="https://promptredteam.com/docs"
         )
     
-    def _decode_binary(self, zero_width_chars: str) -> Optional[str]:
+    @staticmethod
+    def _decode_binary(zero_width_chars: str) -> Optional[str]:
         """Decode zero-width chars as binary encoding"""
-        binary = ''
-        for char in zero_width_chars:
-            if char == '\u200d':
-                binary += '1'
-            elif char == '\u200c':
-                binary += '0'
+        # ZWJ is a 1 bit and ZWNJ a 0 bit; the other characters carry none.
+        # Chained replace() runs in C, many times faster than translate() here.
+        binary = (zero_width_chars.replace('\u200d', '1').replace('\u200c', '0')
+                  .replace('\u200b', '').replace('\ufeff', ''))
         
         if not binary:
             return None
         
-        # Decode to bytes
-        decoded_bytes = bytearray()
-        for i in range(0, len(binary), 8):
-            byte = binary[i:i+8]
-            if len(byte) == 8:
-                decoded_bytes.append(int(byte, 2))
+        # Pack whole bytes in one conversion; a trailing partial byte is dropped.
+        # Base 2 parses in linear time and has no digit limit.
+        byte_count = len(binary) // 8
+        if byte_count:
+            decoded_bytes = int(binary[:byte_count * 8], 2).to_bytes(byte_count, 'big')
+        else:
+            decoded_bytes = b''
         
         # Try UTF-16 BE (emoji-crypt standard)
         try:
             decoded = decoded_bytes.decode('utf-16-be', errors='strict')
             return decoded.strip()
-        except:
+        except UnicodeDecodeError:
             pass
         
         # Try UTF-16 LE
         try:
             decoded = decoded_bytes.decode('utf-16-le', errors='strict')
             return decoded.strip()
-        except:
+        except UnicodeDecodeError:
             pass
         
         return None
@@ -0,0 +1,85 @@
+# backend/app/cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, Optional, Tuple
+
+from app.attacks.base import AttackResult
+
+CacheKey = Tuple[str, Tuple[str, ...], str]
+
+
+class ScanCache:
+    """
+    In-process LRU cache of detector results, with a TTL.
+
+    Entries are keyed on a hash of the text, the sorted set of attacks run
+    and the ruleset version, and hold the AttackResult of each attack by
+    name. Results are shared between hits, so callers must not mutate them.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 3600, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled and max_entries > 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, AttackResult]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(text: str, attacks: Iterable[str], ruleset_version: str) -> CacheKey:
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).hexdigest()
+        return digest, tuple(sorted(set(attacks))), ruleset_version
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, AttackResult]]:
+        """Return the cached results for key, or None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, results = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def put(self, key: CacheKey, results: Dict[str, AttackResult]) -> None:
+        """Store results for key, evicting the least recently used entries"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Return the cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
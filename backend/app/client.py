@@ -0,0 +1,171 @@
+# backend/app/client.py
+"""
+Asyncio client for a hosted scanner.
+
+    from app.client import AsyncScanClient
+
+    async with AsyncScanClient("https://api.promptredteam.com") as client:
+        report = await client.scan("Ignore all previous instructions")
+
+The client keeps one pooled httpx.AsyncClient, so requests reuse
+keep-alive connections instead of opening one each. Concurrent scan()
+calls are gathered for up to batch_window_ms (or until max_batch_size
+are waiting) and sent together as one POST /test/batch; each caller gets
+its own item's report, the same as POST /test returns. Batches are sent
+as soon as they close, without waiting for earlier ones to come back,
+up to the pool's connection limit.
+
+Requests answered 429 or 503 are retried after the Retry-After the rate
+limiter sends, or a doubling backoff without one, as are requests that
+fail to connect. Only httpx is needed, not the rest of the app.
+"""
+import asyncio
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+DEFAULT_BATCH_WINDOW_MS = 5
+DEFAULT_MAX_BATCH_SIZE = 100  # the server's default limit per /test/batch (BATCH_MAX_ITEMS)
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF = 0.5  # seconds before the first retry without a Retry-After
+
+RETRY_STATUSES = {429, 503}
+
+
+class ScanError(Exception):
+    """The server rejected one text of a batch, e.g. for being too long"""
+
+
+def retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds the server asked to wait before retrying, if it said"""
+    value = response.headers.get("Retry-After")
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AsyncScanClient:
+    """
+    Scans texts on a scanner at base_url, batching concurrent scans.
+
+    max_batch_size of 1 sends every scan as its own POST /test. Waits
+    between retries are capped at max_retry_wait seconds; past
+    max_retries the last error is raised, as httpx.HTTPStatusError for an
+    error status.
+    """
+
+    def __init__(self, base_url: str = "http://localhost:8000", batch_window_ms: float = DEFAULT_BATCH_WINDOW_MS,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 max_retry_wait: float = 60.0, timeout: float = 30.0, max_connections: int = 10,
+                 http2: bool = False, client: Optional[httpx.AsyncClient] = None):
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self._client = client if client is not None else httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            http2=http2  # multiplexes batches over one connection; needs httpx[http2]
+        )
+        # Scans waiting for the current batch to close, with their callers' futures
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: set = set()
+        self.requests_sent = 0
+        self.retries = 0
+
+    async def __aenter__(self) -> "AsyncScanClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Send the scans still waiting, wait for their answers, and close the connections"""
+        self._flush()
+        while self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        await self._client.aclose()
+
+    async def scan(self, text: str, attacks: Optional[List[str]] = None, sanitize: bool = False) -> Dict[str, Any]:
+        """The POST /test report for text, sent in a batch with other concurrent scans"""
+        item = {"text": text, "attacks": attacks, "sanitize": sanitize}
+        if self.max_batch_size <= 1:
+            return await self._post("/test", item)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return await future
+
+    async def scan_many(self, texts: List[str], attacks: Optional[List[str]] = None,
+                        sanitize: bool = False) -> List[Dict[str, Any]]:
+        """Reports for texts, in order, sent in batches of max_batch_size at once"""
+        return await asyncio.gather(*(self.scan(text, attacks, sanitize) for text in texts))
+
+    async def gate(self, text: str, attacks: Optional[List[str]] = None) -> Dict[str, Any]:
+        """The POST /gate verdict for text; verdicts are not batched"""
+        return await self._post("/gate", {"text": text, "attacks": attacks})
+
+    def _flush(self) -> None:
+        """Close the current batch and send it"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            body = await self._post("/test/batch", {"items": [item for item, _ in batch]})
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        try:
+            for outcome in body["results"]:
+                future = batch[outcome["index"]][1]
+                if future.done():  # the caller was cancelled
+                    continue
+                if outcome.get("error") is not None:
+                    future.set_exception(ScanError(outcome["error"]))
+                else:
+                    future.set_result(outcome["result"])
+        finally:
+            # Don't leave a caller waiting on an item the response left out
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(ScanError("No result for this item in the batch response"))
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        """POST payload as JSON, retrying rate-limited, unavailable and unreachable attempts"""
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            backoff = DEFAULT_BACKOFF * 2 ** attempt * (1 + random.random() / 2)
+            try:
+                self.requests_sent += 1
+                response = await self._client.post(path, json=payload)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if last:
+                    raise
+                wait = backoff
+            else:
+                if response.status_code not in RETRY_STATUSES or last:
+                    response.raise_for_status()
+                    return response.json()
+                wait = retry_after(response)
+                if wait is None:
+                    wait = backoff
+            self.retries += 1
+            await asyncio.sleep(min(wait, self.max_retry_wait))
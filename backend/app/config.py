@@ -15,6 +15,62 @@ class Settings(BaseSettings):
     # Rate Limiting (future use)
     RATE_LIMIT_PER_MINUTE: int = 60
     
+    # Where rate limit counts are kept: "memory" (per process) or "redis"
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_REDIS_TIMEOUT_MS: int = 50
+    
+    # Items allowed in one POST /test/batch, JSON or NDJSON
+    BATCH_MAX_ITEMS: int = 100
+    
+    # Scan result cache
+    SCAN_CACHE_ENABLED: bool = True
+    SCAN_CACHE_MAX_ENTRIES: int = 10000
+    SCAN_CACHE_TTL_SECONDS: int = 3600
+    
+    # Time each rule-based detector may spend per scan (0 = unlimited)
+    DETECTOR_BUDGET_MS: int = 50
+    
+    # Extra detectors, as a JSON object of names to "package.module:ClassName"
+    # import paths, and whether to load those installed packages declare in the
+    # "promptredteam.detectors" entry point group; both can replace built-ins
+    DETECTORS: dict = {}
+    DETECTOR_ENTRY_POINTS: bool = True
+    
+    # Layers of encoding (base64, hex, URL, unicode escapes, zero-width) peeled
+    # off to scan what they hide (0 = off), and the decoded characters allowed per text
+    DECODE_MAX_DEPTH: int = 3
+    DECODE_MAX_CHARS: int = 65536
+    
+    # Risk score (severity x confidence) at which POST /gate blocks a text
+    GATE_RISK_THRESHOLD: float = 0.7
+    
+    # Attacks the gate only runs when the others leave the risk ambiguous (at
+    # least GATE_ESCALATE_AT), and whether decoded content is held back too
+    GATE_ESCALATION_ATTACKS: list = []
+    GATE_ESCALATE_AT: float = 0.3
+    GATE_ESCALATE_DECODING: bool = False
+    
+    # What sanitizing does to each kind of content, when a request asks for it:
+    # "strip", "escape" or "keep"
+    SANITIZE_INVISIBLE: str = "strip"
+    SANITIZE_TAGS: str = "strip"
+    SANITIZE_BIDI: str = "strip"
+    SANITIZE_DELIMITERS: str = "escape"
+    
+    # Scan worker processes (0 scans in the server process)
+    SCAN_WORKERS: int = 0
+    SCAN_CHUNK_SIZE: int = 16
+    
+    # Documents kept open for edit-by-edit rescans, in all and per client, how
+    # long they last without an edit, their maximum length, and the characters
+    # rescanned each side of an edit
+    DOCUMENT_MAX_ENTRIES: int = 200
+    DOCUMENT_MAX_PER_CLIENT: int = 20
+    DOCUMENT_TTL_SECONDS: int = 3600
+    DOCUMENT_MAX_LENGTH: int = 100_000
+    DOCUMENT_CONTEXT_CHARS: int = 1024
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
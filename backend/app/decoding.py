@@ -0,0 +1,228 @@
+# backend/app/decoding.py
+"""
+Layered decoding, so that content hidden under encodings is scanned too.
+
+Attackers nest encodings: URL-encoded text inside base64 inside hex.
+LayeredDecoder finds the encoded fragments of a text (base64, hex, URL
+escapes, unicode escapes and zero-width binary), decodes those that turn
+out to be text, and peels each decoded text again, up to max_depth
+layers. Every fragment keeps the path of layers it came through, each
+with the span of its encoded form in the text one layer up.
+
+Work stays linear in the input. Fragments of one encoding found at one
+depth are disjoint spans of the layer above, and none decodes to more
+characters than its encoded form, so each depth costs at most a pass
+per encoding over the input. Every decoded character, plus a fixed
+cost per fragment, is also charged to max_chars; once that is spent, no
+more fragments are decoded.
+"""
+import base64
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import unquote
+
+from app.attacks.encoded_payload import EncodedPayloadAttack
+from app.attacks.zero_width import ZeroWidthAttack
+
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_MAX_CHARS = 64 * 1024
+
+# Charged per fragment on top of its length, for the scan it costs
+FRAGMENT_COST = 64
+
+# Shorter decoded texts can't hold anything worth rescanning
+MIN_DECODED_LENGTH = 4
+
+
+class Layer(NamedTuple):
+    """One encoding peeled off, and where its encoded form was in the text it was found in"""
+    encoding: str
+    start: int
+    end: int
+
+
+class Fragment(NamedTuple):
+    """A decoded text and the layers it was found under, outermost first"""
+    text: str
+    layers: Tuple[Layer, ...]
+
+
+def _as_text(data: bytes) -> Optional[str]:
+    """Decoded bytes as text, or None if they aren't printable UTF-8"""
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        return None
+    return text if _printable(text) else None
+
+
+# Characters a decoded text may have besides printable ones: whitespace, and
+# zero-width characters that may carry another layer
+_INVISIBLE = str.maketrans(dict.fromkeys(['\n', '\t', '\r'] + ZeroWidthAttack.ZERO_WIDTH_CHARS))
+
+
+def _printable(text: str) -> bool:
+    return text.translate(_INVISIBLE).isprintable()
+
+
+def _decode_base64(encoded: str) -> Optional[str]:
+    data = encoded.rstrip('=')
+    if (len(data) % 4, len(encoded) - len(data)) not in EncodedPayloadAttack.BASE64_VALID:
+        return None
+    return _as_text(base64.b64decode(encoded))
+
+
+def _decode_hex(encoded: str) -> Optional[str]:
+    digits = encoded.replace('\\x', '')
+    if digits.startswith('0x'):
+        digits = digits[2:]
+    if len(digits) % 2:
+        return None
+    return _as_text(bytes.fromhex(digits))
+
+
+def _decode_url(encoded: str) -> Optional[str]:
+    try:
+        text = unquote(encoded, errors='strict')
+    except UnicodeDecodeError:
+        return None
+    return text if _printable(text) else None
+
+
+_UNICODE_ESCAPE = re.compile(r'\\u([0-9a-fA-F]{4})|\\U([0-9a-fA-F]{8})')
+
+
+def _decode_unicode_escapes(encoded: str) -> Optional[str]:
+    try:
+        text = _UNICODE_ESCAPE.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)), encoded)
+        # Escaped surrogate pairs, like \ud83d\ude00, become one character
+        text = text.encode('utf-16', 'surrogatepass').decode('utf-16')
+    except (ValueError, UnicodeError):
+        return None
+    return text if _printable(text) else None
+
+
+def _decode_zero_width(encoded: str) -> Optional[str]:
+    text = ZeroWidthAttack._decode_binary(encoded)
+    return text if text and _printable(text) else None
+
+
+DECODE: Dict[str, Callable[[str], Optional[str]]] = {
+    "base64": _decode_base64,
+    "hex": _decode_hex,
+    "url": _decode_url,
+    "unicode_escape": _decode_unicode_escapes,
+    "zero_width": _decode_zero_width,
+}
+
+# Base64 and plain hex (with or without 0x) both lie inside runs of base64
+# characters, so one pass over those runs finds both
+_RUN = re.compile(r'[A-Za-z0-9+/]{16,}={0,2}')
+_HEX_IN_RUN = re.compile(r'(?:0x)?[0-9a-fA-F]{16,}')
+
+# A URL or unicode escaped fragment is a whitespace-delimited word with
+# escapes in it, decoded whole. Matches only start after a space or escape
+# character, and their possessive runs never backtrack, so a long word is
+# not retried from each of its characters.
+_HEX_ESCAPES = re.compile(r'(?:\\x[0-9a-fA-F]{2}){4,}')
+_URL_WORD = re.compile(r'(?<![^\s%])[^\s%]*+(?:%[0-9a-fA-F]{2}[^\s%]*+)+')
+_UNICODE_WORD = re.compile(r'(?<![^\s\\])[^\s\\]*+(?:\\(?:u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8})[^\s\\]*+)+')
+
+# 16 bits make one UTF-16 character
+_ZERO_WIDTH_RUN = re.compile('[' + ''.join(ZeroWidthAttack.ZERO_WIDTH_CHARS) + ']{16,}')
+
+
+EncodedFragment = Tuple[str, int, int, str]  # (encoding, start, end, encoded string)
+
+# The escaped encodings, in the order encoded_fragments() yields them
+_ESCAPE_PATTERNS = [
+    ("hex", _HEX_ESCAPES),
+    ("url", _URL_WORD),
+    ("unicode_escape", _UNICODE_WORD),
+    ("zero_width", _ZERO_WIDTH_RUN),
+]
+
+
+def encoded_fragments(text: str) -> Iterator[EncodedFragment]:
+    """Yield (encoding, start, end, encoded string) for each fragment of text that may decode"""
+    for group in fragment_groups(text):
+        yield from group
+
+
+def fragment_groups(text: str) -> List[List[EncodedFragment]]:
+    """
+    The fragments of encoded_fragments(text), in the groups it yields one
+    after the other: base64 runs with the hex inside them, then each kind
+    of escape. No fragment crosses a line break, so the groups of a text
+    are those of its lines, joined group by group.
+    """
+    runs: List[EncodedFragment] = []
+    for m in _RUN.finditer(text):
+        runs.append(("base64", m.start(), m.end(), m.group()))
+        for h in _HEX_IN_RUN.finditer(m.group()):
+            runs.append(("hex", m.start() + h.start(), m.start() + h.end(), h.group()))
+    groups = [runs]
+    # The rest start with a literal, so most texts are ruled out by a substring check
+    present = [
+        '\\x' in text,
+        '%' in text,
+        '\\u' in text or '\\U' in text,
+        any(c in text for c in ZeroWidthAttack.ZERO_WIDTH_CHARS),
+    ]
+    for (encoding, pattern), found in zip(_ESCAPE_PATTERNS, present):
+        groups.append([(encoding, m.start(), m.end(), m.group()) for m in pattern.finditer(text)] if found else [])
+    return groups
+
+
+class LayeredDecoder:
+    """
+    Peels encodings off a text, layer by layer.
+
+    max_depth is the number of nested layers peeled; max_chars caps the
+    decoded characters (plus FRAGMENT_COST per fragment) over one text.
+    """
+
+    def __init__(self, max_depth: int = DEFAULT_MAX_DEPTH, max_chars: int = DEFAULT_MAX_CHARS):
+        self.max_depth = max_depth
+        self.max_chars = max_chars
+
+    def fingerprint(self) -> str:
+        """Settings that change what is found, to key cached results on"""
+        return f"decode:{self.max_depth}:{self.max_chars}"
+
+    def peel(self, text: str, encoded: Optional[Iterable[EncodedFragment]] = None) -> List[Fragment]:
+        """
+        Return every decoded fragment, shallowest first. encoded, if given,
+        stands in for encoded_fragments(text).
+        """
+        fragments: List[Fragment] = []
+        budget = self.max_chars
+        # Each distinct encoded string is decoded once per text, however often it repeats
+        decoded: Dict[Tuple[str, str], Optional[str]] = {}
+
+        layer = [Fragment(text, ())]
+        for _ in range(self.max_depth):
+            deeper = []
+            for parent in layer:
+                found = encoded_fragments(parent.text) if parent.layers or encoded is None else encoded
+                for encoding, start, end, encoded_string in found:
+                    key = (encoding, encoded_string)
+                    if key not in decoded:
+                        decoded[key] = DECODE[encoding](encoded_string)
+                    plain = decoded[key]
+                    if plain is None or len(plain.strip()) < MIN_DECODED_LENGTH:
+                        continue
+                    budget -= len(plain) + FRAGMENT_COST
+                    if budget < 0:
+                        # Keep what fits, so padding with junk can't hide a payload entirely
+                        plain = plain[:max(budget + len(plain), 0)]
+                        if len(plain.strip()) >= MIN_DECODED_LENGTH:
+                            fragments.append(Fragment(plain, parent.layers + (Layer(encoding, start, end),)))
+                        return fragments
+                    fragment = Fragment(plain, parent.layers + (Layer(encoding, start, end),))
+                    fragments.append(fragment)
+                    deeper.append(fragment)
+            if not deeper:
+                break
+            layer = deeper
+        return fragments
@@ -0,0 +1,358 @@
+# backend/app/documents.py
+"""
+Documents scanned once in full, then around each edit.
+
+An editor opens a document with its whole text, then sends only edits:
+(offset, delete length, inserted text), applied in order. A Document
+keeps its text with the rule matches of its last scan. After an edit the
+shared rule pass reruns only over the changed region widened by `margin`
+characters each side (further where a kept match straddles the edge);
+matches elsewhere are kept, shifted past the edit. The rule-based
+detectors are then scored from the merged matches.
+
+Detectors marked line_local (what they find never spans a line break)
+keep what they found per line, by the line's text, and only lex the
+lines an edit touched; so does the decoder with encoded fragments.
+Other detectors without rules, and decoded content, still see the whole
+text, as in a full scan.
+
+The window also reaches back to the earliest position from which a
+match attempt could read the change, worked out from each rule's
+pattern (RuleMatcher.reach_start): whitespace matched across many lines
+before "previous instructions" is still read by an attempt at the
+"ignore" above it. Rules whose reach has no bound rescan from the start.
+Kept matches before the window are then the ones a full scan finds.
+Matches starting after the change are found again only if they would
+now begin differently; a window match that runs into a kept one, or a
+detector running out of its time budget, falls back to a full scan.
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.attacks.base import AttackResult, RuleHits
+from app.decoding import EncodedFragment, fragment_groups
+from app.engine import Budget, RuleMatcher, ScanEngine
+from app.streaming import DEFAULT_OVERLAP
+
+DEFAULT_MARGIN = DEFAULT_OVERLAP
+
+
+class TextEdit(NamedTuple):
+    """Replace text[offset:offset + delete] with insert"""
+    offset: int
+    delete: int
+    insert: str
+
+
+class Change(NamedTuple):
+    """Where edits changed a text: new[start:new_end] replaced old[start:old_end]"""
+    start: int
+    old_end: int
+    new_end: int
+
+
+class VersionConflict(Exception):
+    """Edits were made against a version of the document that is not the latest"""
+
+
+def apply_edits(text: str, edits: Iterable[TextEdit]) -> Tuple[str, Optional[Change]]:
+    """
+    Apply edits in order, each to the text the ones before it left, and
+    return the new text with the extent of the changes (None for no edits).
+    """
+    change = None
+    for offset, delete, insert in edits:
+        if offset < 0 or delete < 0 or offset + delete > len(text):
+            raise ValueError(
+                f"Edit deleting {delete} characters at {offset} is outside the text ({len(text)} characters)"
+            )
+        text = text[:offset] + insert + text[offset + delete:]
+        cut_end = offset + delete
+        if change is None:
+            change = Change(offset, cut_end, offset + len(insert))
+            continue
+        # Widen the extent, in the text before this edit, to cover it
+        start, old_end, new_end = change
+        if cut_end > new_end:
+            old_end += cut_end - new_end
+            new_end = cut_end
+        change = Change(min(start, offset), old_end, new_end + len(insert) - delete)
+    return text, change
+
+
+def splice_hits(matcher: RuleMatcher, text: str, hits: Dict[str, RuleHits], change: Change,
+                margin: int, budget: Optional[Budget] = None) -> Optional[Dict[str, RuleHits]]:
+    """
+    The rule matches of the edited text, from the matches of the text
+    before the change: rescanned around the change, kept elsewhere.
+    Returns None where only a full scan can tell.
+    """
+    start, old_end, new_end = change
+    shift = new_end - old_end
+    # One more character past the change, for a \b just after it
+    window_end = min(new_end + max(margin, 1), len(text))
+    # Attempts from before the window never read as far as the change
+    window_start = min(max(start - margin, 0), matcher.reach_start(text, start))
+
+    # Split each rule's matches, still in old positions, into those before
+    # and after the change; one cut by it widens the window to cover it
+    before: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+    after: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+    for owner, rule_hits in hits.items():
+        for rule_id, spans in rule_hits.items():
+            i = bisect_left(spans, (start,))
+            if i and spans[i - 1][1] > start:
+                i -= 1
+                window_start = min(window_start, spans[i][0])
+            j = bisect_left(spans, (old_end,), i)
+            if j > i:
+                window_end = max(window_end, spans[j - 1][1] + shift)
+            before[(owner, rule_id)] = spans[:i]
+            after[(owner, rule_id)] = spans[j:]
+
+    # A kept match straddling an edge of the window is rescanned too,
+    # which can widen the window into another rule's match
+    widened = True
+    while widened:
+        widened = False
+        for spans in before.values():
+            i = bisect_left(spans, (window_start,))
+            if i and spans[i - 1][1] > window_start:
+                window_start = spans[i - 1][0]
+                widened = True
+        for spans in after.values():
+            j = bisect_left(spans, (window_end - shift,))
+            if j and spans[j - 1][1] + shift > window_end:
+                window_end = spans[j - 1][1] + shift
+                widened = True
+
+    found = matcher.scan(text, budget=budget, region=(window_start, window_end))
+
+    spliced: Dict[str, RuleHits] = {owner: {} for owner in hits}
+    for (owner, rule_id), spans in before.items():
+        kept = spans[:bisect_left(spans, (window_start,))]
+        tail = after[(owner, rule_id)]
+        tail = tail[bisect_left(tail, (window_end - shift,)):]
+        middle = found[owner].get(rule_id, [])
+        if middle and tail:
+            last_start, last_end = middle[-1]
+            if tail[0][0] + shift < (last_end if last_end > last_start else last_start + 1):
+                return None
+        if shift:
+            tail = [(a + shift, b + shift) for a, b in tail]
+        merged = kept + middle + tail
+        if merged:
+            spliced[owner][rule_id] = merged
+    # Rules that had no matches before the edit
+    for owner, rule_hits in found.items():
+        for rule_id, spans in rule_hits.items():
+            if (owner, rule_id) not in before:
+                spliced[owner][rule_id] = spans
+    return spliced
+
+
+class Document:
+    """A text being edited, with the rule matches of its last scan"""
+
+    def __init__(self, doc_id: str, text: str, names: List[str]):
+        self.doc_id = doc_id
+        self.text = text
+        self.names = names
+        self.version = 0
+        self.hits: Optional[Dict[str, RuleHits]] = None  # None until a scan found them all
+        self.matcher: Optional[RuleMatcher] = None  # that found the hits
+        # What line_local detectors and the decoder found in each line, by its text
+        self.lines: Dict[str, Tuple[List[Any], List[List[EncodedFragment]]]] = {}
+        self.lock = threading.Lock()
+
+
+class DocumentStore:
+    """
+    Open documents by owner and id. Ids are chosen by clients, so each
+    owner (a client) only sees its own. The least recently used are
+    evicted past max_entries in all, or past max_per_owner for one owner,
+    and dropped after ttl_seconds without an edit. Texts longer than
+    max_length characters are refused with a ValueError.
+    """
+
+    def __init__(self, engine: ScanEngine, margin: int = DEFAULT_MARGIN, max_entries: int = 200,
+                 ttl_seconds: float = 3600, max_length: int = 100_000, max_per_owner: int = 20):
+        self.engine = engine
+        self.margin = margin
+        self.max_length = max_length
+        self.max_entries = max_entries
+        self.max_per_owner = max_per_owner
+        self.ttl_seconds = ttl_seconds
+        self._documents: "OrderedDict[Tuple[str, str], Tuple[float, Document]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.full_scans = 0
+        self.partial_scans = 0
+
+    def open(self, doc_id: str, text: str, names: List[str], timings: Optional[Dict[str, float]] = None,
+             owner: str = "") -> Tuple[Document, Dict[str, AttackResult]]:
+        """Start (or restart) owner's document and scan it in full"""
+        self._check_length(text)
+        document = Document(doc_id, text, names)
+        with document.lock:
+            results = self._scan(document, None, timings)
+        key = (owner, doc_id)
+        with self._lock:
+            self._documents[key] = (time.monotonic() + self.ttl_seconds, document)
+            self._documents.move_to_end(key)
+            owned = [k for k in self._documents if k[0] == owner]
+            for k in owned[:-self.max_per_owner]:
+                del self._documents[k]
+            while len(self._documents) > self.max_entries:
+                self._documents.popitem(last=False)
+        return document, results
+
+    def get(self, doc_id: str, owner: str = "") -> Document:
+        """owner's document with doc_id, raising KeyError if it is not open"""
+        key = (owner, doc_id)
+        with self._lock:
+            expires_at, document = self._documents[key]
+            if expires_at <= time.monotonic():
+                del self._documents[key]
+                raise KeyError(doc_id)
+            self._documents[key] = (time.monotonic() + self.ttl_seconds, document)
+            self._documents.move_to_end(key)
+            return document
+
+    def close(self, doc_id: str, owner: str = "") -> None:
+        with self._lock:
+            self._documents.pop((owner, doc_id), None)
+
+    def edit(self, doc_id: str, edits: List[TextEdit], version: Optional[int] = None,
+             timings: Optional[Dict[str, float]] = None, owner: str = "") -> Tuple[Document, Dict[str, AttackResult]]:
+        """
+        Apply edits to owner's document and rescan it. With a version, the edits
+        must have been made against that version, or VersionConflict is raised.
+        """
+        document = self.get(doc_id, owner)
+        with document.lock:
+            if version is not None and version != document.version:
+                raise VersionConflict(f"Document {doc_id} is at version {document.version}, not {version}")
+            text, change = apply_edits(document.text, edits)
+            self._check_length(text)
+            document.text = text
+            document.version += 1
+            return document, self._scan(document, change, timings)
+
+    def _check_length(self, text: str) -> None:
+        if len(text) > self.max_length:
+            raise ValueError(f"Document too long. Maximum {self.max_length} characters.")
+
+    def _scan(self, document: Document, change: Optional[Change],
+              timings: Optional[Dict[str, float]] = None) -> Dict[str, AttackResult]:
+        """Rescan document around change, or in full when there is no change or no earlier matches"""
+        engine = self.engine
+        names = document.names
+        rule_based = frozenset(n for n in names if engine.attacks[n].get_rules())
+        hits = None
+        if rule_based:
+            hits = self._rule_hits(document, rule_based, change, timings)
+            if hits is None:
+                # Rescan in full so timeouts are reported as /test does
+                return engine.scan(document.text, names, timings)
+
+        line_local = [n for n in names if n not in rule_based and engine.attacks[n].line_local]
+        decode = engine.decoder is not None
+        lexed, encoded = self._lex_lines(document, line_local, decode, timings)
+
+        rest = [n for n in names if n not in line_local]
+        results = engine.scan(document.text, rest, timings, decode=False, hits=hits) if rest else {}
+        for name, parts in zip(line_local, lexed):
+            started = time.perf_counter()
+            results[name] = engine.attacks[name].detect_lines(parts)
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+        results = {name: results[name] for name in names}
+        if decode:
+            engine.scan_decoded(document.text, names, results, timings, encoded)
+        return results
+
+    def _rule_hits(self, document: Document, rule_based: FrozenSet[str], change: Optional[Change],
+                   timings: Optional[Dict[str, float]] = None) -> Optional[Dict[str, RuleHits]]:
+        """The document's rule matches, spliced or from a full pass; None if a detector ran out of time"""
+        engine = self.engine
+        budget = Budget(engine.budget) if engine.budget else Budget(float("inf"))
+        started = time.perf_counter()
+        matcher = engine.matcher_for(rule_based)
+        hits = None
+        if change is None:
+            hits = document.hits
+        elif document.hits is not None and document.matcher is matcher:
+            hits = splice_hits(matcher, document.text, document.hits, change, self.margin, budget)
+        if hits is not None:
+            self.partial_scans += 1
+        else:
+            hits = matcher.scan(document.text, budget=budget)
+            self.full_scans += 1
+
+        if budget.timed_out:
+            # Start the next edit over from scratch
+            document.hits = None
+            return None
+        document.hits = hits
+        document.matcher = matcher
+        if timings is not None:
+            timings.update(budget.spent)
+            timings["rule_pass"] = time.perf_counter() - started - sum(budget.spent.values())
+        return hits
+
+    def _lex_lines(self, document: Document, names: List[str], decode: bool,
+                   timings: Optional[Dict[str, float]] = None) -> Tuple[List[List[Any]], Optional[List[EncodedFragment]]]:
+        """
+        lex_line() of each line for the named line_local detectors, and the
+        encoded fragments of the text if decode, lexing only the lines not
+        seen in the last scan
+        """
+        if not names and not decode:
+            return [], None
+        attacks = [self.engine.attacks[name] for name in names]
+        clock = time.perf_counter
+        seen = document.lines
+        lines: Dict[str, Tuple[List[Any], List[List[EncodedFragment]]]] = {}
+        lexed: List[List[Any]] = [[] for _ in names]
+        groups: List[List[EncodedFragment]] = []
+        offset = 0
+        for line in document.text.split("\n"):
+            entry = lines.get(line) or seen.get(line)
+            if entry is None:
+                parts = []
+                for name, attack in zip(names, attacks):
+                    started = clock()
+                    parts.append(attack.lex_line(line))
+                    if timings is not None:
+                        timings[name] = timings.get(name, 0.0) + clock() - started
+                started = clock()
+                entry = (parts, fragment_groups(line) if decode else [])
+                if timings is not None and decode:
+                    timings["decoding"] = timings.get("decoding", 0.0) + clock() - started
+            lines[line] = entry
+            parts, line_groups = entry
+            for found, part in zip(lexed, parts):
+                found.append(part)
+            for i, group in enumerate(line_groups):
+                if i == len(groups):
+                    groups.append([])
+                if group:
+                    groups[i].extend((encoding, start + offset, end + offset, encoded)
+                                     for encoding, start, end, encoded in group)
+            offset += len(line) + 1
+        document.lines = lines
+        return lexed, [fragment for group in groups for fragment in group] if decode else None
+
+    def get_stats(self) -> Dict:
+        return {
+            "documents": len(self._documents),
+            "max_entries": self.max_entries,
+            "max_per_owner": self.max_per_owner,
+            "ttl_seconds": self.ttl_seconds,
+            "margin": self.margin,
+            "full_scans": self.full_scans,
+            "partial_scans": self.partial_scans,
+        }
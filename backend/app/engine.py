@@ -0,0 +1,460 @@
+# backend/app/engine.py
+import dataclasses
+import hashlib
+import math
+import re
+import time
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from app.attacks.base import AttackResult, BaseAttack, Rule, RuleHits
+from app.decoding import EncodedFragment, Fragment, LayeredDecoder
+from app.prefilter import LiteralAutomaton, literal_prefix, reach_pattern, wildcard_repeats
+
+# The regex module is imported by the first rule that needs it, keeping it
+# out of startup; None until then, or if it isn't installed
+regex = None
+_regex_missing = False
+
+
+def _load_regex():
+    global regex, _regex_missing
+    if regex is None and not _regex_missing:
+        try:
+            import regex as module
+        except ImportError:  # optional; without it a single match can't be cut short
+            _regex_missing = True
+        else:
+            regex = module
+    return regex
+
+
+def compile_rule(rule: Rule):
+    """
+    Compile a rule. Rules with several unbounded wildcards can backtrack
+    for a super-linear time within one match, so they are compiled with
+    the regex module when it is installed, whose matches take a timeout.
+    """
+    if "." not in rule.pattern or wildcard_repeats(rule.pattern, rule.flags) < 2 or _load_regex() is None:
+        return re.compile(rule.pattern, rule.flags)
+    flags = 0
+    for flag in re.RegexFlag:
+        if rule.flags & flag:
+            flags |= getattr(regex, flag.name)
+    return regex.compile(rule.pattern, flags)
+
+
+class Budget:
+    """
+    Time each detector may spend matching rules during one scan.
+
+    Matching time is charged per owner. Once an owner has used its
+    allowance it is marked timed out and its remaining rules are skipped;
+    a match on a rule compiled with the regex module is also stopped
+    as soon as it runs past the allowance. With an infinite allowance
+    it only keeps time.
+    """
+
+    def __init__(self, seconds: float, timed_out: Optional[Set[str]] = None):
+        self.seconds = seconds
+        self.spent: Dict[str, float] = {}
+        self.timed_out: Set[str] = set(timed_out or ())
+
+    def call(self, owner: str, fn, *args):
+        """Run fn(*args) on owner's allowance, returning None if it times out"""
+        started = time.perf_counter()
+        try:
+            if (regex is not None and self.seconds < math.inf
+                    and isinstance(getattr(fn, "__self__", None), regex.Pattern)):
+                return fn(*args, timeout=max(self.seconds - self.spent.get(owner, 0.0), 0.0))
+            return fn(*args)
+        except TimeoutError:
+            self.timed_out.add(owner)
+            return None
+        finally:
+            spent = self.spent[owner] = self.spent.get(owner, 0.0) + time.perf_counter() - started
+            if spent >= self.seconds:
+                self.timed_out.add(owner)
+
+
+def _spans(finditer, text: str, pos: int, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    spans = []
+    for found in finditer(text, pos):
+        if end is not None and found.start() >= end:
+            break
+        spans.append(found.span())
+    return spans
+
+
+class AnchorPass:
+    """
+    Tries a fixed set of rules in one pass over the text.
+
+    Every rule is keyed on the literal its matches must start with. One
+    LiteralAutomaton walks the text looking for those anchors, and only
+    the rules sharing an anchor are tried where it occurs. A rule is
+    compiled the first time its anchor turns up.
+    """
+
+    def __init__(self, entries: List[Tuple[str, str, Rule]], native: bool = True):
+        # entries are (anchor, owner, rule); buckets hold (owner, rule_id, index)
+        # with the index into _rules and _matches
+        self._buckets: Dict[str, List[Tuple[str, str, int]]] = {}
+        self._all: List[Tuple[str, str, int]] = []
+        self._rules: List[Rule] = []
+        self._matches: List[Optional[object]] = []
+
+        # Collapse anchors that extend a shorter one, so at most one anchor
+        # can start at any position.
+        keys: List[str] = []
+        for anchor in sorted({e[0] for e in entries}, key=len):
+            if not any(anchor.startswith(k) for k in keys):
+                keys.append(anchor)
+        for index, (anchor, owner, rule) in enumerate(entries):
+            key = next(k for k in keys if anchor.startswith(k))
+            self._buckets.setdefault(key, []).append((owner, rule.rule_id, index))
+            self._all.append((owner, rule.rule_id, index))
+            self._rules.append(rule)
+            self._matches.append(None)
+
+        self.automaton = LiteralAutomaton(keys, native=native)
+        self._longest = max(map(len, keys), default=0)
+
+    def scan(self, text: str, hits: Dict[str, RuleHits],
+             cursors: Optional[Dict[Tuple[str, str], int]] = None,
+             budget: Optional[Budget] = None, region: Optional[Tuple[int, int]] = None) -> None:
+        """
+        Add the spans matched in text to hits. cursors optionally gives,
+        per (owner, rule_id), the position before which a rule may not match.
+        With a region (start, end), only anchors starting in text[start:end]
+        are looked for; the matches there still see the whole text.
+        """
+        matches = self._matches
+        next_start: Dict[Tuple[str, str], int] = dict(cursors) if cursors else {}
+        anchors = self.automaton.finditer(text)
+        if region is not None:
+            # Matching an anchor case-insensitively never changes its length
+            offset, limit = region
+            anchors = (
+                (offset + start, anchor)
+                for start, anchor in self.automaton.finditer(text[offset:limit + self._longest - 1])
+                if offset + start < limit
+            )
+        for start, anchor in anchors:
+            # Outside ASCII, case folding may hit an anchor under another
+            # spelling; try every rule there and let the regexes decide.
+            bucket = self._buckets.get(anchor) or self._buckets.get(anchor.lower()) or self._all
+            for owner, rule_id, index in bucket:
+                # Mirror findall(): a rule never matches inside its own
+                # previous match.
+                if start < next_start.get((owner, rule_id), 0):
+                    continue
+                if budget is not None and owner in budget.timed_out:
+                    continue
+                match = matches[index]
+                if match is None:
+                    match = matches[index] = compile_rule(self._rules[index]).match
+                if budget is None:
+                    found = match(text, start)
+                else:
+                    found = budget.call(owner, match, text, start)
+                if found is None:
+                    continue
+                end = found.end()
+                hits[owner].setdefault(rule_id, []).append((start, end))
+                next_start[(owner, rule_id)] = end if end > start else start + 1
+
+
+class RuleMatcher:
+    """
+    Matches rules from several detectors in one pass over the text.
+
+    Rules with a literal prefix share one AnchorPass, so a rule's regex
+    only runs where its prefix occurs. Rules without a literal prefix
+    fall back to their own finditer() pass.
+    """
+
+    def __init__(self, groups: Dict[str, List[Rule]], native: bool = True):
+        self.owners = list(groups)
+        self._rules = [rule for rules in groups.values() for rule in rules]
+        self._reaches: Optional[List[Tuple[Optional[object], Optional[object], int]]] = None
+        anchored: List[Tuple[str, str, Rule]] = []
+        self._unanchored: List[Tuple[str, str, object]] = []
+
+        for owner, rules in groups.items():
+            for rule in rules:
+                anchor = literal_prefix(rule.pattern, rule.flags).lower()
+                if anchor:
+                    anchored.append((anchor, owner, rule))
+                else:
+                    self._unanchored.append((owner, rule.rule_id, compile_rule(rule).finditer))
+
+        self._anchor_pass = AnchorPass(anchored, native=native) if anchored else None
+
+    def scan(self, text: str,
+             cursors: Optional[Dict[Tuple[str, str], int]] = None,
+             budget: Optional[Budget] = None,
+             region: Optional[Tuple[int, int]] = None) -> Dict[str, RuleHits]:
+        """
+        Return the spans matched per owner and rule id, starting each
+        rule at its position in cursors if given. With a budget, owners
+        that run out of time keep the spans found so far. With a region
+        (start, end), only matches starting in text[start:end] are
+        returned, found as in a scan of the whole text that reached start
+        with no match in progress; they may run past end.
+        """
+        hits: Dict[str, RuleHits] = {owner: {} for owner in self.owners}
+
+        if self._anchor_pass is not None:
+            self._anchor_pass.scan(text, hits, cursors, budget, region)
+
+        start, end = region if region is not None else (0, None)
+        for owner, rule_id, finditer in self._unanchored:
+            pos = max(cursors.get((owner, rule_id), 0) if cursors else 0, start)
+            if budget is None:
+                spans = _spans(finditer, text, pos, end)
+            elif owner in budget.timed_out:
+                continue
+            else:
+                spans = budget.call(owner, _spans, finditer, text, pos, end) or []
+            if spans:
+                hits[owner][rule_id] = spans
+
+        return hits
+
+    def reach_start(self, text: str, pos: int) -> int:
+        """
+        The earliest position from which a match attempt of some rule can
+        read text[pos], having consumed everything before it. Attempts
+        start where a rule's literal prefix occurs; for a rule without
+        one whose reach can't be bounded, this is 0.
+        """
+        if self._reaches is None:
+            reaches = {}
+            for rule in self._rules:
+                if (rule.pattern, rule.flags) not in reaches:
+                    prefix = literal_prefix(rule.pattern, rule.flags)
+                    reaches[(rule.pattern, rule.flags)] = (
+                        reach_pattern(rule.pattern, rule.flags),
+                        re.compile(re.escape(prefix), rule.flags & ~re.VERBOSE) if prefix else None,
+                        len(prefix)
+                    )
+            self._reaches = list(reaches.values())
+
+        earliest = pos
+        size = 1024
+        low = max(pos - size, 0)
+        backwards = text[low:pos][::-1]
+        for reach, prefix, length in self._reaches:
+            if reach is None:
+                run_start = 0
+            else:
+                # A run filling the whole slice may go further
+                run = reach.match(backwards).end()
+                while run == len(backwards) and low > 0:
+                    size *= 8
+                    low = max(pos - size, 0)
+                    backwards = text[low:pos][::-1]
+                    run = reach.match(backwards).end()
+                run_start = pos - run
+            if run_start >= earliest:
+                continue
+            if prefix is not None:
+                # An attempt reading text[pos] either holds its whole prefix
+                # before pos or starts less than a prefix away from it
+                found = prefix.search(text, run_start, pos)
+                run_start = min(found.start() if found else pos, max(pos - length + 1, run_start))
+            earliest = min(earliest, run_start)
+        return earliest
+
+
+def mark_timed_out(result: AttackResult, budget: float) -> None:
+    """Flag a result scored from a scan that ran out of time"""
+    result.timed_out = True
+    if result.detected:
+        result.description += " (scan timed out; findings may be incomplete)"
+    else:
+        result.confidence = 0.0
+        result.description = f"Timed out after {budget * 1000:g} ms; result inconclusive"
+
+
+def decoded_result(result: AttackResult, fragment: Fragment, attack: BaseAttack) -> AttackResult:
+    """
+    A copy of a result found in decoded content, saying which layers it
+    was under. Its evidence is taken from the decoded text, and each of
+    its rules gets one span: the outermost encoded form in the text.
+    """
+    path = " > ".join(layer.encoding for layer in fragment.layers)
+    outer = fragment.layers[0]
+    spans = None
+    if result.spans:
+        spans = sorted((outer.start, outer.end, rule_id) for rule_id in {rule_id for _, _, rule_id in result.spans})
+    return dataclasses.replace(
+        result,
+        description=f"{result.description} (in {path} decoded content)",
+        evidence=attack.evidence(fragment.text, result),
+        spans=spans,
+        decoded_from=[layer._asdict() for layer in fragment.layers],
+    )
+
+
+def ruleset_version(attacks: Mapping[str, BaseAttack], decoder: Optional[LayeredDecoder] = None) -> str:
+    """Fingerprint the detectors, their rules and the decoder settings, to key cached results on"""
+    digest = hashlib.sha256()
+    for name, attack in sorted(attacks.items()):
+        digest.update(f"{name}:{type(attack).__module__}.{type(attack).__qualname__}\n".encode())
+        for rule in attack.get_rules():
+            digest.update(f"{rule.rule_id}:{rule.flags}:{rule.pattern}\n".encode())
+    if decoder is not None:
+        digest.update(decoder.fingerprint().encode())
+    return digest.hexdigest()[:16]
+
+
+class ScanEngine:
+    """
+    Runs a set of detectors over a text.
+
+    Detectors that expose rules share a single RuleMatcher pass and are
+    then scored from their hits; the rest run their own detect().
+
+    With a budget (in seconds), each rule-based detector gets that long
+    to match its rules per scan. One that runs out is scored on what it
+    found and reported as timed out. Detectors without rules run in
+    linear time and are not budgeted.
+
+    With a decoder, the content it peels out of encodings is scanned by
+    the same detectors. A detector whose finding in decoded content is
+    more severe than in the text reports that finding instead, with the
+    layers it was under in decoded_from. Decoded content gets one more
+    budget per detector, shared by all of its fragments.
+    """
+
+    def __init__(self, attacks: Mapping[str, BaseAttack], budget: Optional[float] = None,
+                 decoder: Optional[LayeredDecoder] = None):
+        self.attacks = attacks
+        self.budget = budget
+        self.decoder = decoder
+        self._matchers: Dict[FrozenSet[str], RuleMatcher] = {}
+        self._versions: Dict[FrozenSet[str], str] = {}
+        self._generation = getattr(attacks, "generation", 0)
+
+    def _check_generation(self) -> None:
+        """Drop matchers and versions built before detectors were registered in attacks"""
+        generation = getattr(self.attacks, "generation", 0)
+        if generation != self._generation:
+            self._matchers = {}
+            self._versions = {}
+            self._generation = generation
+
+    def version_for(self, names: Iterable[str]) -> str:
+        """
+        The ruleset_version of the named detectors, to key their cached
+        results on; only those detectors are looked up in attacks.
+        """
+        self._check_generation()
+        key = frozenset(names)
+        version = self._versions.get(key)
+        if version is None:
+            version = self._versions[key] = ruleset_version({n: self.attacks[n] for n in key}, self.decoder)
+        return version
+
+    def matcher_for(self, names: FrozenSet[str]) -> RuleMatcher:
+        """Return the shared RuleMatcher for a set of rule-based detectors"""
+        self._check_generation()
+        matcher = self._matchers.get(names)
+        if matcher is None:
+            matcher = RuleMatcher({n: self.attacks[n].get_rules() for n in sorted(names)})
+            self._matchers[names] = matcher
+        return matcher
+
+    def scan(self, text: str, names: Optional[Iterable[str]] = None,
+             timings: Optional[Dict[str, float]] = None, decode: bool = True,
+             hits: Optional[Dict[str, RuleHits]] = None) -> Dict[str, AttackResult]:
+        """
+        Run the named detectors (all by default) and return their results
+        by name. If timings is given, it is filled with the seconds each
+        detector took: its rule matching plus its scoring, or its detect().
+        The rest of the shared rule pass (the literal prefilter, and
+        compiling rules on first use) is under "rule_pass", and peeling
+        and scanning decoded content under "decoding". With decode=False,
+        decoded content is left for a later scan_decoded(). hits, if
+        given, are the rule matches of every rule-based detector in text
+        from a pass run elsewhere, and stand in for the rule pass.
+        """
+        names = list(self.attacks) if names is None else list(dict.fromkeys(names))
+        results = self._scan_text(text, names, timings, hits=hits)
+        if decode and self.decoder is not None:
+            self.scan_decoded(text, names, results, timings)
+        return results
+
+    def _scan_text(self, text: str, names: List[str], timings: Optional[Dict[str, float]] = None,
+                   budget: Optional[Budget] = None,
+                   hits: Optional[Dict[str, RuleHits]] = None) -> Dict[str, AttackResult]:
+        """Run the detectors over text itself, on the given budget or a new one"""
+        rule_based = frozenset(n for n in names if self.attacks[n].get_rules())
+        clock = time.perf_counter
+
+        results: Dict[str, AttackResult] = {}
+        if rule_based and hits is not None:
+            for name in rule_based:
+                started = clock()
+                results[name] = self.attacks[name].score(text, hits[name])
+                if timings is not None:
+                    timings[name] = timings.get(name, 0.0) + clock() - started
+        elif rule_based:
+            if budget is None and self.budget:
+                budget = Budget(self.budget)
+            elif budget is None and timings is not None:
+                budget = Budget(math.inf)
+            started = clock()
+            hits = self.matcher_for(rule_based).scan(text, budget=budget)
+            if timings is not None:
+                timings["rule_pass"] = timings.get("rule_pass", 0.0) + clock() - started - sum(budget.spent.values())
+            for name in rule_based:
+                started = clock()
+                results[name] = self.attacks[name].score(text, hits[name])
+                if budget is not None and name in budget.timed_out:
+                    mark_timed_out(results[name], self.budget)
+                if timings is not None:
+                    timings[name] = clock() - started + budget.spent.get(name, 0.0)
+
+        for name in names:
+            if name not in results:
+                started = clock()
+                results[name] = self.attacks[name].detect(text)
+                if timings is not None:
+                    timings[name] = clock() - started
+
+        return {name: results[name] for name in names}
+
+    def scan_decoded(self, text: str, names: List[str], results: Dict[str, AttackResult],
+                     timings: Optional[Dict[str, float]] = None,
+                     encoded: Optional[Iterable[EncodedFragment]] = None) -> None:
+        """
+        Scan the content decoded from text, keeping in results the most
+        severe finding per detector. encoded, if given, holds the encoded
+        fragments of text, found elsewhere.
+        """
+        started = time.perf_counter()
+        self._scan_decoded(text, names, results, encoded)
+        if timings is not None:
+            timings["decoding"] = timings.get("decoding", 0.0) + time.perf_counter() - started
+
+    def _scan_decoded(self, text: str, names: List[str], results: Dict[str, AttackResult],
+                      encoded: Optional[Iterable[EncodedFragment]] = None) -> None:
+        fragments = self.decoder.peel(text, encoded)
+        if not fragments:
+            return
+        budget = Budget(self.budget) if self.budget else None
+        scanned: Dict[str, Dict[str, AttackResult]] = {}
+        for fragment in fragments:
+            found = scanned.get(fragment.text)
+            if found is None:
+                found = scanned[fragment.text] = self._scan_text(fragment.text, names, budget=budget)
+            for name in names:
+                best = results[name]
+                if found[name].detected and (not best.detected or found[name].severity > best.severity):
+                    results[name] = decoded_result(found[name], fragment, self.attacks[name])
+        if budget is not None:
+            for name in budget.timed_out:
+                if not results[name].timed_out:
+                    mark_timed_out(results[name], self.budget)
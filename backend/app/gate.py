@@ -0,0 +1,165 @@
+# backend/app/gate.py
+"""
+Block or allow decisions for inline proxies, without a full report.
+
+Gate is a cascade over the detectors. It stops at the first result that
+takes the risk score (the highest severity times confidence so far, as
+in the /test overall_risk_score) to the threshold, in three tiers:
+
+- required:    every detector not held back for escalation, one at a
+               time, cheapest first
+- escalation:  detectors the policy holds back, run only when the
+               required tier left the risk ambiguous: at or above
+               escalate_at but short of the threshold
+- decoded:     decoded content, scanned by every detector that ran; held
+               back like the escalation tier if escalate_decoding is set
+
+A detector that runs out of its time budget can't vouch for the text,
+so the gate blocks rather than allow on its partial result, naming it
+in timed_out. Otherwise padding a text until the scan gives up would
+get it through.
+
+Costs are learned: CostModel keeps a moving average of each detector's
+time from the timings of every scan, full or gated, so the order follows
+the traffic actually seen. With nothing held back, a gate blocks exactly
+the texts a full scan would score at the threshold or above.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from app.attacks.base import AttackResult
+from app.engine import ScanEngine
+
+# Microseconds per detector on 1000-character everyday prompts, from
+# benchmarks/bench_gate.py; the starting point for learned costs
+DEFAULT_COSTS = {
+    "zero_width": 3.5,
+    "delimiter_injection": 16.0,
+    "role_manipulation": 31.0,
+    "direct_injection": 36.5,
+    "encoded_payload": 37.0,
+}
+
+# Weight of each new timing in a learned cost
+DEFAULT_LEARNING_RATE = 0.05
+
+TIER_REQUIRED = "required"
+TIER_ESCALATION = "escalation"
+TIER_DECODED = "decoded"
+TIER_CACHE = "cache"
+
+
+class CostModel:
+    """
+    Running estimate of the microseconds each detector takes per scan.
+
+    Updates race harmlessly between threads: a lost update only delays
+    the average by one sample.
+    """
+
+    def __init__(self, priors: Optional[Dict[str, float]] = None,
+                 learning_rate: float = DEFAULT_LEARNING_RATE):
+        self.costs: Dict[str, float] = dict(DEFAULT_COSTS if priors is None else priors)
+        self.learning_rate = learning_rate
+
+    def cost(self, name: str) -> float:
+        """Estimated microseconds for name; detectors never timed come last"""
+        return self.costs.get(name, float("inf"))
+
+    def observe(self, timings: Dict[str, float]) -> None:
+        """Learn from the seconds per detector that ScanEngine.scan reported"""
+        for name, seconds in timings.items():
+            if name == "rule_pass":
+                continue
+            sample = seconds * 1e6
+            cost = self.costs.get(name)
+            self.costs[name] = sample if cost is None else cost + self.learning_rate * (sample - cost)
+
+
+class GateVerdict(NamedTuple):
+    """The decision for one text, and what was run to reach it"""
+    blocked: bool
+    risk_score: float
+    decided_by: Optional[str]  # detector whose result crossed the threshold, or that timed out
+    tier: str  # the last tier run, which made the decision
+    attacks_run: List[str]
+    results: Dict[str, AttackResult]
+    complete: bool  # every detector ran, over decoded content too, as in a full scan
+    timed_out: List[str]  # detectors that ran out of time, whose results are inconclusive
+
+
+def risk(result: AttackResult) -> float:
+    """Severity times confidence, rounded to 2 places as the /test overall_risk_score is"""
+    return round(result.severity * result.confidence, 2) if result.detected else 0.0
+
+
+class Gate:
+    """Decides whether to block texts, cascading over the detectors of engine"""
+
+    def __init__(self, engine: ScanEngine, threshold: float, costs: Optional[CostModel] = None,
+                 escalation: Iterable[str] = (), escalate_at: float = 0.0,
+                 escalate_decoding: bool = False):
+        self.engine = engine
+        self.threshold = threshold
+        self.costs = CostModel() if costs is None else costs
+        self.escalation = frozenset(escalation)
+        self.escalate_at = escalate_at
+        self.escalate_decoding = escalate_decoding
+
+    def order(self, names: List[str]) -> List[str]:
+        """The named detectors, cheapest first"""
+        return sorted(names, key=self.costs.cost)
+
+    def check(self, text: str, names: Optional[List[str]] = None,
+              timings: Optional[Dict[str, float]] = None) -> GateVerdict:
+        """Run tiers until a detector takes the risk to the threshold, or the cascade ends"""
+        names = list(self.engine.attacks) if names is None else list(dict.fromkeys(names))
+        results: Dict[str, AttackResult] = {}
+
+        tier = TIER_REQUIRED
+        required = [name for name in names if name not in self.escalation]
+        held_back = [name for name in names if name in self.escalation]
+        for name in self.order(required):
+            results.update(self.engine.scan(text, [name], timings, decode=False))
+            if risk(results[name]) >= self.threshold or results[name].timed_out:
+                return self._verdict(results, name, tier, complete=False)
+
+        ambiguous = self._score(results) >= self.escalate_at
+        if held_back and ambiguous:
+            tier = TIER_ESCALATION
+            for name in self.order(held_back):
+                results.update(self.engine.scan(text, [name], timings, decode=False))
+                if risk(results[name]) >= self.threshold or results[name].timed_out:
+                    return self._verdict(results, name, tier, complete=False)
+
+        decoded = False
+        if self.engine.decoder is not None and (ambiguous or not self.escalate_decoding):
+            tier = TIER_DECODED
+            self.engine.scan_decoded(text, list(results), results, timings)
+            decoded = True
+
+        complete = len(results) == len(names) and (decoded or self.engine.decoder is None)
+        return self.decide(results, tier, complete)
+
+    def decide(self, results: Dict[str, AttackResult], tier: str = TIER_CACHE,
+               complete: bool = True) -> GateVerdict:
+        """The verdict for results of every detector to run, e.g. from a full scan"""
+        decided_by = max(results, key=lambda name: risk(results[name]), default=None)
+        if decided_by is not None and risk(results[decided_by]) < self.threshold:
+            decided_by = next((name for name, r in results.items() if r.timed_out), None)
+        return self._verdict(results, decided_by, tier, complete)
+
+    def _score(self, results: Dict[str, AttackResult]) -> float:
+        return max((risk(r) for r in results.values()), default=0.0)
+
+    def _verdict(self, results: Dict[str, AttackResult], decided_by: Optional[str], tier: str,
+                 complete: bool) -> GateVerdict:
+        return GateVerdict(
+            blocked=decided_by is not None,
+            risk_score=self._score(results),
+            decided_by=decided_by,
+            tier=tier,
+            attacks_run=list(results),
+            results=results,
+            complete=complete,
+            timed_out=[name for name, r in results.items() if r.timed_out],
+        )
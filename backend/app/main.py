@@ -1,42 +1,91 @@
-from fastapi import FastAPI, HTTPException, Request
+from app.startup import startup_timer
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect, WebSocketException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Union
+import asyncio
+import codecs
+import json
 import time
+startup_timer.mark("import fastapi")
+from app.config import settings
 from app.middleware.rate_limit import rate_limit_middleware, rate_limiter
+from app.middleware.metrics import MetricsMiddleware
+from app import metrics
 
-# Since we're creating a standalone version, include AttackResult inline
-class AttackResult:
-    def __init__(self, attack_name: str, attack_type: str, detected: bool, 
-                 severity: float, confidence: float, description: str,
-                 evidence: Optional[str] = None, mitigation: Optional[str] = None,
-                 reference_url: Optional[str] = None):
-        self.attack_name = attack_name
-        self.attack_type = attack_type
-        self.detected = detected
-        self.severity = severity
-        self.confidence = confidence
-        self.description = description
-        self.evidence = evidence
-        self.mitigation = mitigation
-        self.reference_url = reference_url
-
-from app.attacks import (
-    ZeroWidthAttack,
-    DirectInjectionAttack,
-    RoleManipulationAttack,
-    DelimiterInjectionAttack,
-    EncodedPayloadAttack
+from app.attacks.base import AttackResult
+from app.cache import ScanCache
+from app.documents import DocumentStore, TextEdit, VersionConflict
+from app.gate import CostModel, Gate
+from app.responses import BodyStreamingResponse, PlainJSONResponse, dumps
+from app.scanner import Scanner, calculate_overall_risk, generate_recommendations
+from app.streaming import ScanSession, StreamScan
+startup_timer.mark("import app")
+
+# Scans with the detectors (built-ins, then installed plugins, then DETECTORS,
+# each built the first time a request selects it) sharing one pattern pass under
+# a time budget, rescans decoded content, sanitizes texts for requests that ask
+# for it, and reuses results for texts scanned recently with the same attacks
+SCANNER = Scanner(
+    detectors=settings.DETECTORS,
+    entry_points=settings.DETECTOR_ENTRY_POINTS,
+    budget_ms=settings.DETECTOR_BUDGET_MS,
+    decode_max_depth=settings.DECODE_MAX_DEPTH,
+    decode_max_chars=settings.DECODE_MAX_CHARS,
+    sanitize={
+        "invisible": settings.SANITIZE_INVISIBLE,
+        "tags": settings.SANITIZE_TAGS,
+        "bidi": settings.SANITIZE_BIDI,
+        "delimiters": settings.SANITIZE_DELIMITERS,
+    },
+    cache=ScanCache(
+        max_entries=settings.SCAN_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SCAN_CACHE_TTL_SECONDS,
+        enabled=settings.SCAN_CACHE_ENABLED
+    )
 )
+ATTACKS = SCANNER.attacks
+DETECTOR_BUDGET = SCANNER.budget
+DECODER = SCANNER.decoder
+ENGINE = SCANNER.engine
+SANITIZER = SCANNER.sanitizer
+SCAN_CACHE = SCANNER.cache
 
-# Use the real attack detectors
-ATTACKS = {
-    "zero_width": ZeroWidthAttack(),
-    "direct_injection": DirectInjectionAttack(),
-    "role_manipulation": RoleManipulationAttack(),
-    "delimiter_injection": DelimiterInjectionAttack(),
-    "encoded_payload": EncodedPayloadAttack(),
-}
+# Detector costs learned from the timings of every scan, to order the gate's cascade
+DETECTOR_COSTS = CostModel()
+
+# Block or allow decisions that stop at the first decisive detector
+GATE = Gate(
+    ENGINE,
+    threshold=settings.GATE_RISK_THRESHOLD,
+    costs=DETECTOR_COSTS,
+    escalation=settings.GATE_ESCALATION_ATTACKS,
+    escalate_at=settings.GATE_ESCALATE_AT,
+    escalate_decoding=settings.GATE_ESCALATE_DECODING
+)
+
+# Documents open for editing, rescanned around each edit
+DOCUMENTS = DocumentStore(
+    ENGINE,
+    margin=settings.DOCUMENT_CONTEXT_CHARS,
+    max_entries=settings.DOCUMENT_MAX_ENTRIES,
+    max_per_owner=settings.DOCUMENT_MAX_PER_CLIENT,
+    ttl_seconds=settings.DOCUMENT_TTL_SECONDS,
+    max_length=settings.DOCUMENT_MAX_LENGTH
+)
+
+# Share rate limit counts across workers and containers; connects on first request
+if settings.RATE_LIMIT_BACKEND == "redis":
+    from app.middleware.rate_limit_backends import RedisBackend, RedisClient
+    rate_limiter.backend = RedisBackend(RedisClient.from_url(
+        settings.RATE_LIMIT_REDIS_URL,
+        timeout=settings.RATE_LIMIT_REDIS_TIMEOUT_MS / 1000
+    ))
+
+startup_timer.mark("detectors")
 
 app = FastAPI(
     title="LLM Security Testing API",
@@ -44,6 +93,9 @@ app = FastAPI(
     version="0.1.0"
 )
 
+# Request metrics, inside the rate limiter so they time the requests it lets through
+app.add_middleware(MetricsMiddleware)
+
 # Add rate limiting middleware - CRITICAL: Must be added before CORS
 app.middleware("http")(rate_limit_middleware)
 
@@ -56,8 +108,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def start_scan_pool():
+    """Scan in worker processes when SCAN_WORKERS > 0"""
+    if settings.SCAN_WORKERS > 0:
+        from app.workers import ScanPool
+        SCANNER.pool = ScanPool(
+            ATTACKS.paths,
+            workers=settings.SCAN_WORKERS,
+            chunk_size=settings.SCAN_CHUNK_SIZE,
+            budget=DETECTOR_BUDGET,
+            decoder=DECODER
+        )
+        SCANNER.pool.warm()
+
+@app.on_event("shutdown")
+def stop_scan_pool():
+    if SCANNER.pool is not None:
+        SCANNER.pool.close()
+        SCANNER.pool = None
+
 # Request/Response Models
-class TestRequest(BaseModel):
+class GateRequest(BaseModel):
     text: str = Field(..., description="Text to analyze for security threats")
     attacks: Optional[List[str]] = Field(
         default=None,
@@ -76,6 +148,17 @@ class TestRequest(BaseModel):
             raise ValueError("Text cannot be empty")
         return v
 
+class TestRequest(GateRequest):
+    sanitize: bool = Field(
+        default=False,
+        description="Return the text sanitized, with the spans that were changed"
+    )
+
+class DecodedLayer(BaseModel):
+    encoding: str
+    start: int
+    end: int
+
 class AttackResultResponse(BaseModel):
     attack_name: str
     attack_type: str
@@ -86,6 +169,21 @@ class AttackResultResponse(BaseModel):
     evidence: Optional[str]
     mitigation: Optional[str]
     reference_url: Optional[str]
+    timed_out: bool = False
+    decoded_from: Optional[List[DecodedLayer]] = Field(
+        default=None,
+        description="Encodings the finding was hidden under, outermost first, with the span of each in the text it was found in"
+    )
+    spans: Optional[List[Tuple[int, int, str]]] = Field(
+        default=None,
+        description="[start, end, rule_id] of each rule match behind the finding, in text order"
+    )
+
+class SanitizedSpanResponse(BaseModel):
+    start: int
+    end: int
+    kind: str
+    action: str
 
 class TestResponse(BaseModel):
     scan_id: str
@@ -96,7 +194,104 @@ class TestResponse(BaseModel):
     overall_risk_score: float
     results: List[AttackResultResponse]
     recommendations: List[str]
-    cleaned_text: str
+    cleaned_text: Optional[str] = Field(
+        default=None,
+        description="The sanitized text, when the request asked for it"
+    )
+    sanitized_spans: Optional[List[SanitizedSpanResponse]] = Field(
+        default=None,
+        description="Spans of the original text that were stripped or escaped"
+    )
+    timings_ms: Optional[Dict[str, float]] = Field(
+        default=None,
+        description="Time each detector took on this text; empty when the results came from the cache"
+    )
+
+class BatchItem(BaseModel):
+    text: str
+    attacks: Optional[List[str]] = None
+    sanitize: bool = False
+
+class BatchTestRequest(BaseModel):
+    items: List[Union[str, BatchItem]] = Field(
+        ...,
+        description="Texts to analyze, or objects with a text and optional attacks"
+    )
+
+class BatchItemResult(BaseModel):
+    index: int
+    result: Optional[TestResponse] = None
+    error: Optional[str] = None
+
+class BatchTestResponse(BaseModel):
+    batch_id: str
+    items_tested: int
+    results: List[BatchItemResult]
+
+class StreamTestResponse(BaseModel):
+    scan_id: str
+    timestamp: float
+    text_length: int
+    windows_scanned: int
+    attacks_tested: int
+    threats_detected: int
+    overall_risk_score: float
+    results: List[AttackResultResponse]
+    recommendations: List[str]
+
+class DocumentRequest(BaseModel):
+    text: str = Field(..., description="The whole document")
+    attacks: Optional[List[str]] = Field(
+        default=None,
+        description="Specific attacks to test. If None, tests all."
+    )
+
+class TextEditRequest(BaseModel):
+    offset: int = Field(..., ge=0, description="Where the edit starts, in the text left by the edits before it")
+    delete: int = Field(default=0, ge=0, description="Characters removed at offset")
+    insert: str = Field(default="", description="Text inserted at offset")
+
+class DocumentEditRequest(BaseModel):
+    edits: List[TextEditRequest] = Field(..., description="Edits to apply, in order")
+    version: Optional[int] = Field(
+        default=None,
+        description="The document version the edits were made against; rejected with 409 if it is not the latest"
+    )
+
+class DocumentResponse(TestResponse):
+    document_id: str
+    version: int
+
+class SessionVerdictResponse(BaseModel):
+    text_length: int
+    attacks_tested: int
+    threats_detected: int
+    overall_risk_score: float
+    results: List[AttackResultResponse]
+
+class GateResponse(BaseModel):
+    scan_id: str
+    decision: str = Field(..., description='"block" or "allow"')
+    risk_score: float
+    threshold: float
+    decided_by: Optional[str] = Field(
+        default=None,
+        description="Attack whose finding took the risk score to the threshold, or that timed out"
+    )
+    tier: str = Field(
+        ...,
+        description='Last tier of the cascade that ran: "required", "escalation", "decoded", or "cache" for cached results'
+    )
+    attacks_run: List[str] = Field(..., description="Attacks run before deciding, in order")
+    timed_out: List[str] = Field(
+        default_factory=list,
+        description="Attacks that ran out of time; their results are inconclusive, so the text is blocked"
+    )
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+BATCH_CHUNK_SIZE = 16
+# Distinct texts a batch remembers results of, to answer repeats without scanning
+BATCH_MEMO_SIZE = 1024
 
 # Endpoints
 @app.get("/")
@@ -143,13 +338,52 @@ def rate_limit_status(request: Request):
     client_ip = get_client_ip(request)
     return {
         "your_ip": client_ip,
-        "requests_in_last_minute": len(rate_limiter.ip_requests[client_ip]),
+        "requests_in_last_minute": rate_limiter.get_request_count(client_ip),
         "remaining_requests": rate_limiter.get_remaining_requests(client_ip),
         "reset_in_seconds": rate_limiter.get_reset_time(client_ip),
         "limit": rate_limiter.requests_per_minute,
-        "all_request_counts": {ip: len(timestamps) for ip, timestamps in rate_limiter.ip_requests.items()}
+        "tracked_clients": rate_limiter.tracked_clients()
+    }
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Scan result cache counters"""
+    return SCAN_CACHE.get_stats()
+
+@app.get("/document-stats")
+def document_stats():
+    """Open documents, and how many of their scans were full or around an edit"""
+    return DOCUMENTS.get_stats()
+
+@app.get("/detector-stats")
+def detector_stats():
+    """Per-detector run and time budget counters, learned costs, detectors built so far, and the gate's order"""
+    runs = metrics.DETECTOR_RUNS.values()
+    timeouts = metrics.DETECTOR_TIMEOUTS.values()
+    return {
+        "budget_ms": settings.DETECTOR_BUDGET_MS,
+        "detectors": {
+            name: {
+                "runs": runs[(name,)],
+                "timeouts": timeouts.get((name,), 0),
+                "cost_us": round(DETECTOR_COSTS.cost(name), 1)
+            }
+            for (name,) in sorted(runs)
+        },
+        "loaded": ATTACKS.loaded(),
+        "gate_order": GATE.order(list(ATTACKS))
     }
 
+@app.get("/metrics")
+def prometheus_metrics():
+    """Latency, detection and rate limit metrics in the Prometheus text format"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/startup-stats")
+def startup_stats():
+    """Init-time breakdown of this process"""
+    return startup_timer.get_stats()
+
 @app.post("/test", response_model=TestResponse)
 def test_prompt(request: TestRequest):
     """
@@ -159,44 +393,275 @@ def test_prompt(request: TestRequest):
     start_time = time.time()
     
     # Determine which attacks to run
-    attacks_to_run = request.attacks if request.attacks else list(ATTACKS.keys())
+    attacks_to_run = resolve_attacks(request.attacks)
+    
+    # Run all selected attacks in a single scan
+    metrics.TEXT_LENGTH.observe(len(request.text), "/test")
+    timings: List[Dict[str, float]] = []
+    results = run_many([(request.text, attacks_to_run)], timings)[0]
+    
+    # Generate unique scan ID
+    scan_id = f"scan_{int(start_time * 1000)}"
+    
+    return PlainJSONResponse(
+        build_response(request.text, attacks_to_run, results, scan_id, start_time, timings[0], request.sanitize)
+    )
+
+@app.post("/gate", response_model=GateResponse)
+def gate_prompt(request: GateRequest):
+    """
+    Decide whether to block a prompt, for inline proxies.
+    Runs detectors cheapest first and stops as soon as the risk score reaches
+    the threshold, or a detector runs out of time, returning only the verdict.
+    """
+    start_time = time.time()
+    attacks_to_run = resolve_attacks(request.attacks)
+    metrics.TEXT_LENGTH.observe(len(request.text), "/gate")
     
-    # Validate attack names
-    invalid_attacks = [a for a in attacks_to_run if a not in ATTACKS]
-    if invalid_attacks:
+    key = SCAN_CACHE.make_key(request.text, attacks_to_run, ENGINE.version_for(attacks_to_run))
+    cached = SCAN_CACHE.get(key)
+    if cached is not None:
+        verdict = GATE.decide(cached)
+    else:
+        timings: Dict[str, float] = {}
+        verdict = GATE.check(request.text, attacks_to_run, timings)
+        count_runs(verdict.results, timings)
+        DETECTOR_COSTS.observe(timings)
+        # Verdicts reached early lack the results of the detectors not run
+        if verdict.complete and not any(r.timed_out for r in verdict.results.values()):
+            SCAN_CACHE.put(key, verdict.results)
+    count_detections(verdict.attacks_run, [verdict.results[name] for name in verdict.attacks_run])
+    decision = "block" if verdict.blocked else "allow"
+    metrics.GATE_DECISIONS.inc(decision, verdict.tier, verdict.decided_by or "none")
+    
+    return PlainJSONResponse({
+        "scan_id": f"gate_{int(start_time * 1000)}",
+        "decision": decision,
+        "risk_score": verdict.risk_score,
+        "threshold": GATE.threshold,
+        "decided_by": verdict.decided_by,
+        "tier": verdict.tier,
+        "attacks_run": verdict.attacks_run,
+        "timed_out": verdict.timed_out
+    })
+
+@app.post(
+    "/test/batch",
+    response_model=BatchTestResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": BatchTestRequest.model_json_schema()},
+                NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "description": "One item per line"}},
+            },
+        }
+    },
+)
+async def test_batch(request: Request):
+    """
+    Test many prompts in one request.
+    Items are texts or {"text", "attacks"} objects; results come back in input order,
+    with a per-item error instead of failing the whole batch. Send and/or accept
+    application/x-ndjson (one item per line) to stream large batches.
+    """
+    batch_id = f"batch_{int(time.time() * 1000)}"
+    stream_in = request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE)
+    stream_out = stream_in or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+    
+    scanner = BatchScanner(batch_id)
+    
+    if stream_in:
+        return BodyStreamingResponse(_scan_ndjson(request, scanner), media_type=NDJSON_MEDIA_TYPE)
+    
+    # Items are validated one by one in scan_items, so one bad item gets
+    # its own error, as in an NDJSON batch
+    try:
+        body = await request.json()
+    except ValueError:
+        raise RequestValidationError([{"loc": ("body",), "msg": "Invalid JSON body", "type": "json_invalid"}])
+    batch = body.get("items") if isinstance(body, dict) else None
+    if not isinstance(batch, list):
+        raise RequestValidationError([{
+            "loc": ("body", "items"),
+            "msg": 'Body must be an object with an "items" list',
+            "type": "list_type"
+        }])
+    if len(batch) > rate_limiter.max_batch_size:
         raise HTTPException(
             status_code=400,
-            detail=f"Invalid attack types: {invalid_attacks}. Valid types: {list(ATTACKS.keys())}"
+            detail=f"Batch too large. Maximum {rate_limiter.max_batch_size} items."
         )
+    items = list(enumerate(batch))
     
-    # Run all selected attacks
-    results = []
-    for attack_name in attacks_to_run:
-        attack = ATTACKS[attack_name]
-        result = attack.detect(request.text)
-        results.append(result)
+    if stream_out:
+        async def ndjson_lines():
+            # Scan in small chunks so results go out as they are ready
+            for i in range(0, len(items), BATCH_CHUNK_SIZE):
+                chunk = items[i:i + BATCH_CHUNK_SIZE]
+                for result in await run_in_threadpool(scanner.scan_items, chunk):
+                    yield dumps(result) + b"\n"
+        return StreamingResponse(ndjson_lines(), media_type=NDJSON_MEDIA_TYPE)
     
-    # Calculate metrics
-    threats = [r for r in results if r.detected]
-    overall_risk = calculate_overall_risk(results)
-    recommendations = generate_recommendations(threats)
-    cleaned_text = clean_text(request.text)
+    results = await run_in_threadpool(scanner.scan_items, items)
+    return PlainJSONResponse({"batch_id": batch_id, "items_tested": len(results), "results": results})
+
+@app.post(
+    "/test/stream",
+    response_model=StreamTestResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"text/plain": {"schema": {"type": "string"}}},
+        }
+    },
+)
+async def test_stream(request: Request, attacks: Optional[List[str]] = Query(None)):
+    """
+    Test a document far larger than /test accepts.
+    The raw UTF-8 request body is scanned in overlapping windows as it arrives,
+    so memory stays bounded however large the document is.
+    """
+    start_time = time.time()
+    attacks_to_run = resolve_attacks(attacks)
     
-    # Generate unique scan ID
-    scan_id = f"scan_{int(start_time * 1000)}"
+    scan = StreamScan(ENGINE, attacks_to_run)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    
+    async for data in request.stream():
+        chunk = decoder.decode(data)
+        if scan.length + len(chunk) > rate_limiter.max_stream_length:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Document too long. Maximum {rate_limiter.max_stream_length} characters."
+            )
+        await run_in_threadpool(scan.feed, chunk)
+    scan.feed(decoder.decode(b"", final=True))
+    
+    scanned = await run_in_threadpool(scan.finish)
+    metrics.TEXT_LENGTH.observe(scan.length, "/test/stream")
+    count_runs(scanned)
+    results = [scanned[attack_name] for attack_name in attacks_to_run]
+    count_detections(attacks_to_run, results)
+    threats = [r for r in results if r.detected]
     
-    return TestResponse(
-        scan_id=scan_id,
+    return StreamTestResponse(
+        scan_id=f"scan_{int(start_time * 1000)}",
         timestamp=start_time,
-        text_length=len(request.text),
+        text_length=scan.length,
+        windows_scanned=scan.windows_scanned,
         attacks_tested=len(results),
         threats_detected=len(threats),
-        overall_risk_score=overall_risk,
+        overall_risk_score=calculate_overall_risk(results),
         results=[AttackResultResponse(**r.__dict__) for r in results],
-        recommendations=recommendations,
-        cleaned_text=cleaned_text
+        recommendations=generate_recommendations(threats)
     )
 
+@app.websocket("/test/session")
+async def test_session(websocket: WebSocket, attacks: Optional[List[str]] = Query(None)):
+    """
+    Test text as it arrives, e.g. chat input or model output.
+    Each text message is appended to the session's text; a SessionVerdictResponse
+    for all of it so far is sent back whenever which detectors fired, or how
+    strongly, changes. An append costs about the same however long the text
+    has grown, unlike re-posting it to /test.
+    """
+    from app.middleware.rate_limit import get_client_ip
+    
+    # The connection counts as one request against the rate limit, checked
+    # off the event loop if the backend is remote
+    client_ip = get_client_ip(websocket)
+    if rate_limiter.backend.blocking:
+        limit = await run_in_threadpool(rate_limiter.check, client_ip)
+    else:
+        limit = rate_limiter.check(client_ip)
+    if limit.limited:
+        metrics.RATE_LIMITED.inc()
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="Rate limit exceeded")
+    try:
+        attacks_to_run = resolve_attacks(attacks)
+    except HTTPException as e:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=e.detail)
+    
+    session = ScanSession(ENGINE, attacks_to_run)
+    await websocket.accept()
+    try:
+        while True:
+            chunk = await websocket.receive_text()
+            if session.length + len(chunk) > rate_limiter.max_stream_length:
+                await websocket.close(
+                    code=status.WS_1009_MESSAGE_TOO_BIG,
+                    reason=f"Text too long. Maximum {rate_limiter.max_stream_length} characters."
+                )
+                break
+            scanned = await run_in_threadpool(session.append, chunk)
+            if scanned is not None:
+                results = [scanned[attack_name] for attack_name in attacks_to_run]
+                verdict = SessionVerdictResponse(
+                    text_length=session.length,
+                    attacks_tested=len(results),
+                    threats_detected=sum(r.detected for r in results),
+                    overall_risk_score=calculate_overall_risk(results),
+                    results=[AttackResultResponse(**r.__dict__) for r in results]
+                )
+                await websocket.send_text(verdict.model_dump_json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if session.results:
+            metrics.TEXT_LENGTH.observe(session.length, "/test/session")
+            count_runs(session.results)
+            count_detections(attacks_to_run, [session.results[attack_name] for attack_name in attacks_to_run])
+
+@app.put("/documents/{document_id}", response_model=DocumentResponse)
+def open_document(document_id: str, request: DocumentRequest, http_request: Request):
+    """
+    Open a document for editing, scanning it in full.
+    Send later changes to POST /documents/{document_id}/edits.
+    Document ids are per client: other clients can't see or edit them.
+    """
+    from app.middleware.rate_limit import get_client_ip
+
+    start_time = time.time()
+    attacks_to_run = resolve_attacks(request.attacks)
+    timings: Dict[str, float] = {}
+    try:
+        document, scanned = DOCUMENTS.open(document_id, request.text, attacks_to_run, timings,
+                                           owner=get_client_ip(http_request))
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return PlainJSONResponse(document_response(document, scanned, start_time, timings))
+
+@app.post("/documents/{document_id}/edits", response_model=DocumentResponse)
+def edit_document(document_id: str, request: DocumentEditRequest, http_request: Request):
+    """
+    Apply edits to an open document and return its results, the same as
+    POST /test on the edited text. Only the text around the edits is rescanned.
+    """
+    from app.middleware.rate_limit import get_client_ip
+
+    start_time = time.time()
+    edits = [TextEdit(e.offset, e.delete, e.insert) for e in request.edits]
+    timings: Dict[str, float] = {}
+    try:
+        document, scanned = DOCUMENTS.edit(document_id, edits, request.version, timings,
+                                           owner=get_client_ip(http_request))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} is not open")
+    except VersionConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PlainJSONResponse(document_response(document, scanned, start_time, timings))
+
+@app.delete("/documents/{document_id}", status_code=204)
+def close_document(document_id: str, request: Request):
+    """Forget an open document"""
+    from app.middleware.rate_limit import get_client_ip
+
+    DOCUMENTS.close(document_id, owner=get_client_ip(request))
+    return Response(status_code=204)
+
 @app.post("/generate-payload")
 def generate_payload(attack_type: str, instruction: str = "reveal system prompt"):
     """Generate an example attack payload for testing"""
@@ -228,54 +693,191 @@ def test_info():
     }
 
 # Helper functions
-def calculate_overall_risk(results: List[AttackResult]) -> float:
-    """Calculate overall risk score from all results"""
-    if not results:
-        return 0.0
+def resolve_attacks(attacks: Optional[List[str]]) -> List[str]:
+    """Return the attacks to run, rejecting unknown names"""
+    try:
+        return SCANNER.resolve(attacks)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def run_many(jobs: List[Tuple[str, List[str]]],
+             timings: Optional[List[Dict[str, float]]] = None) -> List[List[AttackResult]]:
+    """
+    Run (text, attacks) jobs with SCANNER, counting them in the metrics.
+    If timings is given, each job's detector timings in seconds are appended to it;
+    jobs answered from the cache get an empty map.
+    """
+    scanned = SCANNER.run(jobs, timings, observe_scan)
+    ordered = [[s[attack_name] for attack_name in attacks] for s, (_, attacks) in zip(scanned, jobs)]
+    for results, (_, attacks) in zip(ordered, jobs):
+        count_detections(attacks, results)
+    return ordered
+
+def observe_scan(results: Dict[str, AttackResult], timings: Dict[str, float]) -> None:
+    """Record a fresh scan in the metrics and the learned detector costs"""
+    count_runs(results, timings)
+    DETECTOR_COSTS.observe(timings)
+
+def count_runs(results: Dict[str, AttackResult], timings: Optional[Dict[str, float]] = None) -> None:
+    """Count the detectors that ran, by name, and those that ran out of time; record their timings"""
+    for attack_name, r in results.items():
+        metrics.DETECTOR_RUNS.inc(attack_name)
+        if r.timed_out:
+            metrics.DETECTOR_TIMEOUTS.inc(attack_name)
+    for name, seconds in (timings or {}).items():
+        metrics.DETECTOR_SECONDS.observe(seconds, name)
+
+def count_detections(attacks: List[str], results: List[AttackResult]) -> None:
+    """Count the attack types detected in one text"""
+    for attack_name, r in zip(attacks, results):
+        if r.detected:
+            metrics.DETECTIONS.inc(attack_name)
+
+def build_response(text: str, attacks: List[str], results: List[AttackResult], scan_id: str, timestamp: float,
+                   timings: Optional[Dict[str, float]] = None, sanitize: bool = False) -> Dict[str, Any]:
+    """Assemble the TestResponse content for a scanned text, sanitizing it if asked to"""
+    return SCANNER.report(text, attacks, results, scan_id, timestamp, timings, sanitize)
+
+def document_response(document, scanned: Dict[str, AttackResult], start_time: float,
+                      timings: Dict[str, float]) -> Dict[str, Any]:
+    """Count a document scan in the metrics and assemble its DocumentResponse content"""
+    metrics.TEXT_LENGTH.observe(len(document.text), "/documents")
+    count_runs(scanned, timings)
+    results = [scanned[attack_name] for attack_name in document.names]
+    count_detections(document.names, results)
+    response = build_response(document.text, document.names, results, f"scan_{int(start_time * 1000)}",
+                              start_time, timings)
+    return dict(response, document_id=document.doc_id, version=document.version)
+
+class BatchScanner:
+    """Scans the items of one batch, reusing results for texts repeated within BATCH_MEMO_SIZE distinct ones"""
     
-    # Weight by severity and confidence
-    weighted_scores = [
-        r.severity * r.confidence
-        for r in results if r.detected
-    ]
+    def __init__(self, batch_id: str):
+        self.batch_id = batch_id
+        self.seen: Dict[Tuple[str, Tuple[str, ...]], Tuple[List[AttackResult], Dict[str, float]]] = {}
     
-    if not weighted_scores:
-        return 0.0
+    def scan_items(self, items: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+        """Validate and scan items, scanning their distinct texts together; returns BatchItemResult contents"""
+        start_time = time.time()
+        parsed = [(index, self.parse_item(item)) for index, item in items]
+        
+        # Collect the texts not scanned earlier in this batch
+        jobs = {}
+        for index, item in parsed:
+            if not isinstance(item, str):
+                metrics.TEXT_LENGTH.observe(len(item.text), "/test/batch")
+                key = (item.text, tuple(item.attacks))
+                if key not in self.seen:
+                    jobs[key] = (item.text, item.attacks)
+        timings: List[Dict[str, float]] = []
+        scanned = dict(zip(jobs, zip(run_many(list(jobs.values()), timings), timings)))
+        
+        outcomes = []
+        for index, item in parsed:
+            if isinstance(item, str):
+                outcomes.append({"index": index, "result": None, "error": item})
+                continue
+            key = (item.text, tuple(item.attacks))
+            results, timings = scanned.get(key) or self.seen[key]
+            scan_id = f"{self.batch_id}_{index}"
+            response = build_response(item.text, item.attacks, results, scan_id, start_time, timings, item.sanitize)
+            outcomes.append({"index": index, "result": response, "error": None})
+        
+        # Keep the latest texts for the chunks to come, oldest out first
+        self.seen.update(scanned)
+        while len(self.seen) > BATCH_MEMO_SIZE:
+            del self.seen[next(iter(self.seen))]
+        return outcomes
     
-    # Use max score (most severe threat)
-    return round(max(weighted_scores), 2)
+    def parse_item(self, item: Any) -> Union[TestRequest, str]:
+        """Validate one item, returning its request with attacks resolved or an error message"""
+        try:
+            if isinstance(item, Exception):
+                raise item
+            if isinstance(item, str):
+                request = TestRequest(text=item)
+            elif isinstance(item, BatchItem):
+                request = TestRequest(text=item.text, attacks=item.attacks, sanitize=item.sanitize)
+            elif isinstance(item, dict):
+                request = TestRequest(**item)
+            else:
+                raise ValueError("Item must be a text or an object with a text")
+            request.attacks = resolve_attacks(request.attacks)
+            return request
+        except ValidationError as e:
+            return "; ".join(err["msg"] for err in e.errors())
+        except HTTPException as e:
+            return e.detail
+        except (ValueError, TypeError) as e:
+            return str(e)
 
-def generate_recommendations(threats: List[AttackResult]) -> List[str]:
-    """Generate actionable recommendations based on threats found"""
-    if not threats:
-        return ["No threats detected. Your prompt appears secure."]
-    
-    recommendations = []
-    
-    # Collect unique mitigations
-    mitigations = set()
-    for threat in threats:
-        if threat.mitigation:
-            mitigations.add(threat.mitigation)
+async def _scan_ndjson(request: Request, scanner: BatchScanner) -> AsyncIterator[bytes]:
+    """
+    Scan the items of an NDJSON request body in chunks as their lines
+    arrive, yielding each chunk's BatchItemResult lines once it is scanned.
+    An item past max_batch_size gets an error line, and ends the batch.
     
-    recommendations.extend(mitigations)
+    The body is read on while scanned lines wait to be sent: most HTTP
+    clients send all of it before reading the response, and would wait
+    forever for a scan waiting for them. Only those lines are held.
+    """
+    scanned: asyncio.Queue = asyncio.Queue()
+    reader = asyncio.ensure_future(_read_ndjson(request, scanner, scanned.put_nowait))
+    try:
+        while True:
+            lines = await scanned.get()
+            if lines is None:
+                break
+            yield lines
+        await reader  # raises whatever stopped it
+    finally:
+        reader.cancel()
+
+async def _read_ndjson(request: Request, scanner: BatchScanner, emit: Callable[[Optional[bytes]], None]) -> None:
+    """Scan the NDJSON request body for _scan_ndjson, passing each chunk's lines to emit, then None"""
+    pending: List[Tuple[int, Any]] = []
+    buffer = b""
+    count = 0
+    limit = rate_limiter.max_batch_size
     
-    # Add general recommendations
-    if len(threats) > 2:
-        recommendations.append("Multiple threats detected. Consider a comprehensive security review.")
+    def parse(line: bytes) -> bool:
+        """Queue the item on line; False once it is one too many"""
+        nonlocal count
+        if count == limit:
+            return False
+        try:
+            pending.append((count, json.loads(line)))
+        except ValueError:
+            pending.append((count, ValueError("Invalid JSON line")))
+        count += 1
+        return True
     
-    # Add severity-based recommendations
-    high_severity_threats = [t for t in threats if t.severity > 0.8]
-    if high_severity_threats:
-        recommendations.append("High severity threats found. Address these immediately.")
+    async def scan(chunk: List[Tuple[int, Any]]) -> None:
+        emit(b"".join(dumps(result) + b"\n" for result in await run_in_threadpool(scanner.scan_items, chunk)))
     
-    return list(recommendations)
+    try:
+        admitted = True
+        async for data in request.stream():
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            admitted = all(parse(line) for line in lines if line.strip())
+            while len(pending) >= BATCH_CHUNK_SIZE:
+                chunk, pending[:] = pending[:BATCH_CHUNK_SIZE], pending[BATCH_CHUNK_SIZE:]
+                await scan(chunk)
+            if not admitted:
+                break
+        else:
+            if buffer.strip():
+                admitted = parse(buffer)
+        
+        if pending:
+            await scan(pending)
+        if not admitted:
+            emit(dumps({"index": count, "result": None, "error": f"Batch too large. Maximum {limit} items."}) + b"\n")
+    finally:
+        emit(None)
 
-def clean_text(text: str) -> str:
-    """Remove detected malicious content"""
-    # Remove zero-width characters
-    cleaned = ''.join(c for c in text if c not in ['\u200b', '\u200c', '\u200d', '\ufeff'])
-    return cleaned
+startup_timer.mark("routes")
 
 if __name__ == "__main__":
     import uvicorn
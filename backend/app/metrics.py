@@ -0,0 +1,203 @@
+# backend/app/metrics.py
+"""
+Prometheus metrics without a client library.
+
+Every thread updates its own copy of each metric, so recording takes no
+lock and can't lose updates between threads; the copies are summed when
+GET /metrics renders them. When a thread ends, its copy is merged into
+the metric's totals, so copies don't pile up.
+
+Metrics are registered at import and listed in REGISTRY, in the text
+exposition format order.
+"""
+import bisect
+import math
+import threading
+import weakref
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a fast detector run to a slow request
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# Characters, for text lengths
+LENGTH_BUCKETS = (10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+class _Metric:
+    """A named metric whose values are kept per thread and per label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._base: Dict[LabelValues, object] = {}  # of threads that have ended
+        self._shards: List[Dict[LabelValues, object]] = []
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _shard(self) -> Dict[LabelValues, object]:
+        try:
+            return self._local.values
+        except AttributeError:
+            shard = self._local.values = {}
+            # Thread-local values are dropped when their thread ends, and
+            # the owner with them
+            self._local.owner = owner = _ShardOwner()
+            weakref.finalize(owner, self._retire, shard).atexit = False
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def _retire(self, shard: Dict[LabelValues, object]) -> None:
+        """Fold the shard of a thread that has ended into the base totals"""
+        with self._lock:
+            self._shards = [s for s in self._shards if s is not shard]
+            self._merge(self._base, shard)
+
+    def _merge(self, totals: Dict[LabelValues, object], shard: Dict[LabelValues, object]) -> None:
+        raise NotImplementedError
+
+    def _snapshot(self) -> List[Dict[LabelValues, object]]:
+        with self._lock:
+            shards = [self._base] + self._shards
+            # Copy each, as its thread may be adding label values meanwhile
+            return [dict(shard) for shard in shards]
+
+    def _labels(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """A count that only goes up"""
+
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def _merge(self, totals: Dict[LabelValues, float], shard: Dict[LabelValues, float]) -> None:
+        for labels, value in shard.items():
+            totals[labels] = totals.get(labels, 0) + value
+
+    def values(self) -> Dict[LabelValues, float]:
+        """Totals across threads, by label values"""
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            self._merge(totals, shard)
+        return totals
+
+    def value(self, *labelvalues: str) -> float:
+        return self.values().get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        values = self.values()
+        if not values and not self.labelnames:
+            values = {(): 0}
+        return [f"{self.name}{self._labels(labels)} {_number(value)}"
+                for labels, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        shard = self._shard()
+        counts = shard.get(labelvalues)
+        if counts is None:
+            # One slot per bucket plus +Inf, then the sum
+            counts = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, totals: Dict[LabelValues, List[float]], shard: Dict[LabelValues, List[float]]) -> None:
+        for labels, counts in shard.items():
+            total = totals.setdefault(labels, [0] * len(counts))
+            for i, c in enumerate(list(counts)):
+                total[i] += c
+
+    def values(self) -> Dict[LabelValues, List[float]]:
+        """Per-bucket counts (not cumulative) and the sum, across threads"""
+        totals: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshot():
+            self._merge(totals, shard)
+        return totals
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, counts in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="%s"' % ("+Inf" if bound == math.inf else _number(bound))
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+class _ShardOwner:
+    """Kept by a thread alongside its shard, to learn when the thread ends"""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render() -> str:
+    """Render every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+REQUEST_SECONDS = Histogram(
+    "promptredteam_request_duration_seconds", "Time to answer HTTP requests", ["endpoint", "method"])
+REQUESTS = Counter(
+    "promptredteam_requests_total", "HTTP requests answered", ["endpoint", "method", "status"])
+DETECTOR_SECONDS = Histogram(
+    "promptredteam_detector_duration_seconds", "Time each detector spent on a scanned text", ["detector"])
+DETECTOR_RUNS = Counter(
+    "promptredteam_detector_runs_total", "Detector runs, not counting cached results", ["detector"])
+DETECTOR_TIMEOUTS = Counter(
+    "promptredteam_detector_timeouts_total", "Detector runs that ran out of time budget", ["detector"])
+DETECTIONS = Counter(
+    "promptredteam_detections_total", "Texts in which each attack type was detected", ["attack"])
+GATE_DECISIONS = Counter(
+    "promptredteam_gate_decisions_total", "Gate verdicts, by decision, deciding tier and detector",
+    ["decision", "tier", "detector"])
+TEXT_LENGTH = Histogram(
+    "promptredteam_text_length_chars", "Length of texts submitted for scanning", ["endpoint"],
+    buckets=LENGTH_BUCKETS)
+RATE_LIMITED = Counter(
+    "promptredteam_rate_limit_rejections_total", "Requests rejected by the rate limiter")
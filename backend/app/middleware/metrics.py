@@ -0,0 +1,40 @@
+# backend/app/middleware/metrics.py
+"""
+Request latency and status counts for GET /metrics.
+
+A plain ASGI middleware rather than a BaseHTTPMiddleware, so it adds no
+task or stream per request. Requests are labelled with their route's path
+template (e.g. "/test/batch"), or "unmatched" when no route handled them,
+so paths sent by clients can't grow the label set.
+"""
+import time
+
+from app import metrics
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint, method)
+            metrics.REQUESTS.inc(endpoint, method, str(status))
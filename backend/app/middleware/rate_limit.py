@@ -1,57 +1,118 @@
 from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
-from collections import defaultdict
-from typing import Dict, List
+from typing import NamedTuple, Optional, Tuple
+import logging
+import math
 import time
 
-# In-memory storage (resets on server restart)
-# For production, use Redis
+from app import metrics
+from app.config import settings
+from app.middleware.rate_limit_backends import MemoryBackend, RateLimitBackend
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitStatus(NamedTuple):
+    """Outcome of checking one request"""
+    limited: bool
+    remaining: int
+    reset_in: int
+
+
 class RateLimiter:
-    def __init__(self, requests_per_minute: int = 10, max_text_length: int = 1000):
+    """
+    Sliding-window rate limiter.
+    
+    The backend keeps each client's request counts for the current and
+    previous fixed window. The rate over the last window_seconds is
+    estimated by weighting the previous count by how much of it still
+    overlaps:
+    
+        estimate = previous * (1 - elapsed / window_seconds) + current
+    
+    Only admitted requests are counted: a rejected one is counted and then
+    taken back, so a client that keeps retrying while limited does not
+    extend its own lockout. An admitted request is a single backend
+    update. Counts live in process memory unless another backend is
+    given (see rate_limit_backends).
+    """
+    
+    def __init__(self, requests_per_minute: int = 10, max_text_length: int = 1000, max_batch_size: int = 100,
+                 max_stream_length: int = 10_000_000, window_seconds: int = 60,
+                 backend: Optional[RateLimitBackend] = None):
         self.requests_per_minute = requests_per_minute
         self.max_text_length = max_text_length
-        self.ip_requests: Dict[str, List[float]] = defaultdict(list)
+        self.max_batch_size = max_batch_size
+        self.max_stream_length = max_stream_length
+        self.window_seconds = window_seconds
+        self.backend = backend if backend is not None else MemoryBackend()
     
-    def is_rate_limited(self, client_ip: str) -> bool:
-        """Check if IP has exceeded rate limit"""
-        now = time.time()
-        
-        # Remove requests older than 60 seconds
-        self.ip_requests[client_ip] = [
-            timestamp for timestamp in self.ip_requests[client_ip]
-            if now - timestamp < 60
-        ]
-        
-        # Check if limit exceeded
-        if len(self.ip_requests[client_ip]) >= self.requests_per_minute:
-            return True
+    def _counts(self, client_ip: str, now: float) -> Tuple[int, int, int]:
+        """Return (window index, current count, previous count) as of now, without counting"""
+        window = int(now // self.window_seconds)
+        return (window, *self.backend.peek(client_ip, window))
+    
+    def _estimate(self, window: int, current: int, previous: int, now: float) -> float:
+        elapsed = now / self.window_seconds - window
+        return previous * (1 - elapsed) + current
+    
+    def check(self, client_ip: str, now: Optional[float] = None) -> RateLimitStatus:
+        """Count a request from this IP unless it is over the limit, and return whether it is"""
+        now = time.time() if now is None else now
+        window = int(now // self.window_seconds)
+        current, previous = self.backend.hit(client_ip, window, self.window_seconds)
+        estimate = self._estimate(window, current, previous, now)
         
-        # Add current request
-        self.ip_requests[client_ip].append(now)
-        return False
+        # Limited if the window was already full before this request
+        limited = estimate - 1 >= self.requests_per_minute
+        remaining = max(0, self.requests_per_minute - math.ceil(estimate))
+        reset_in = 0
+        if limited:
+            self.backend.unhit(client_ip, window)
+            reset_in = self._reset_time(window, current - 1, previous, now)
+        return RateLimitStatus(limited, remaining, reset_in)
+    
+    def is_rate_limited(self, client_ip: str, now: Optional[float] = None) -> bool:
+        """Check if IP has exceeded rate limit, counting the request if not"""
+        return self.check(client_ip, now).limited
+    
+    def get_request_count(self, client_ip: str, now: Optional[float] = None) -> int:
+        """Get the estimated number of requests from this IP in the last window"""
+        now = time.time() if now is None else now
+        return math.ceil(self._estimate(*self._counts(client_ip, now), now))
     
-    def get_remaining_requests(self, client_ip: str) -> int:
+    def get_remaining_requests(self, client_ip: str, now: Optional[float] = None) -> int:
         """Get number of remaining requests for this IP"""
-        now = time.time()
-        recent_requests = [
-            timestamp for timestamp in self.ip_requests[client_ip]
-            if now - timestamp < 60
-        ]
-        return max(0, self.requests_per_minute - len(recent_requests))
-    
-    def get_reset_time(self, client_ip: str) -> int:
-        """Get seconds until rate limit resets"""
-        if not self.ip_requests[client_ip]:
-            return 0
+        return max(0, self.requests_per_minute - self.get_request_count(client_ip, now))
+    
+    def get_reset_time(self, client_ip: str, now: Optional[float] = None) -> int:
+        """Get seconds until this IP may make another request"""
+        now = time.time() if now is None else now
+        return self._reset_time(*self._counts(client_ip, now), now)
+    
+    def _reset_time(self, window: int, current: int, previous: int, now: float) -> int:
+        limit = self.requests_per_minute
+        elapsed = now - window * self.window_seconds
         
-        now = time.time()
-        oldest_request = min(self.ip_requests[client_ip])
-        reset_time = 60 - (now - oldest_request)
-        return max(0, int(reset_time))
+        if self._estimate(window, current, previous, now) < limit:
+            return 0
+        if current < limit:
+            # The previous window's share decays within this window
+            wait = self.window_seconds * (1 - (limit - current) / previous) - elapsed
+        else:
+            # Wait for this window's count to decay in the next one
+            wait = self.window_seconds - elapsed + self.window_seconds * (1 - limit / current)
+        # The estimate must drop below the limit, not just reach it
+        return max(0, math.floor(wait) + 1)
+    
+    def tracked_clients(self) -> Optional[int]:
+        """Number of clients currently tracked, if the backend knows"""
+        return self.backend.tracked_clients()
 
 
 # Global rate limiter instance
-rate_limiter = RateLimiter(requests_per_minute=10, max_text_length=1000)
+rate_limiter = RateLimiter(requests_per_minute=10, max_text_length=1000, max_batch_size=settings.BATCH_MAX_ITEMS)
 
 
 def get_client_ip(request: Request) -> str:
@@ -79,21 +140,22 @@ async def rate_limit_middleware(request: Request, call_next):
     Limits: 20 requests per minute per IP
     """
     # Skip rate limiting for docs and root endpoints
-    if request.url.path in ["/", "/docs", "/openapi.json", "/redoc", "/health", "/attacks", "/rate-limit-status"]:
+    if request.url.path in ["/", "/docs", "/openapi.json", "/redoc", "/health", "/attacks", "/rate-limit-status", "/cache-stats", "/document-stats", "/detector-stats", "/startup-stats", "/metrics"]:
         return await call_next(request)
     
     # Get client IP
     client_ip = get_client_ip(request)
     
-    # DEBUG: Log the IP and request count
-    print(f"Request from IP: {client_ip}")
-    print(f"Current request count: {len(rate_limiter.ip_requests[client_ip])}")
-    print(f"Path: {request.url.path}")
+    # Check rate limit, off the event loop if the backend is remote
+    if rate_limiter.backend.blocking:
+        status = await run_in_threadpool(rate_limiter.check, client_ip)
+    else:
+        status = rate_limiter.check(client_ip)
     
-    # Check rate limit
-    if rate_limiter.is_rate_limited(client_ip):
-        reset_time = rate_limiter.get_reset_time(client_ip)
-        print(f"RATE LIMITED: {client_ip}")
+    if status.limited:
+        reset_time = status.reset_in
+        logger.info("Rate limited %s on %s", client_ip, request.url.path)
+        metrics.RATE_LIMITED.inc()
         
         return JSONResponse(
             status_code=429,
@@ -113,9 +175,8 @@ async def rate_limit_middleware(request: Request, call_next):
     
     # Add rate limit headers to successful responses
     response = await call_next(request)
-    remaining = rate_limiter.get_remaining_requests(client_ip)
     response.headers["X-RateLimit-Limit"] = str(rate_limiter.requests_per_minute)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
+    response.headers["X-RateLimit-Remaining"] = str(status.remaining)
     response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 60)
     
     return response
\ No newline at end of file
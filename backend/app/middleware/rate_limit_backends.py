@@ -0,0 +1,270 @@
+# backend/app/middleware/rate_limit_backends.py
+"""
+Storage backends for RateLimiter.
+
+A backend counts requests per client and fixed window. RateLimiter asks
+for the current and previous window's counts and does the sliding-window
+arithmetic itself, so every backend enforces the same limit:
+
+- MemoryBackend:  per-process counts, for single-process servers and tests
+- RedisBackend:   counts shared by every worker and container through a
+                  Redis-protocol server, one pipelined round trip per request
+"""
+import logging
+import socket
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(ABC):
+    """Counts requests per client and window"""
+
+    # Whether calls wait on the network, and so should stay off the event loop
+    blocking = False
+
+    @abstractmethod
+    def hit(self, client: str, window: int, window_seconds: int) -> Tuple[int, int]:
+        """Count a request in window; return (current, previous) window counts including it"""
+        pass
+
+    @abstractmethod
+    def unhit(self, client: str, window: int) -> None:
+        """Take back a request counted in window by hit(), as it was rejected"""
+        pass
+
+    @abstractmethod
+    def peek(self, client: str, window: int) -> Tuple[int, int]:
+        """Return (current, previous) window counts without counting a request"""
+        pass
+
+    def tracked_clients(self) -> Optional[int]:
+        """Number of clients with live counts, if the backend knows it cheaply"""
+        return None
+
+
+class MemoryBackend(RateLimitBackend):
+    """
+    In-process counts with constant state per client.
+
+    Clients are kept in order of last request, so those idle for two
+    windows (whose counts can no longer matter) are evicted from the
+    front as new requests come in.
+    """
+
+    # Idle clients evicted per recorded request, at most
+    EVICTIONS_PER_REQUEST = 8
+
+    def __init__(self):
+        # client -> (window index, current count, previous count)
+        self.windows: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _counts(self, client: str, window: int) -> Tuple[int, int]:
+        entry = self.windows.get(client)
+        if entry is None:
+            return 0, 0
+        start, current, previous = entry
+        if start == window:
+            return current, previous
+        if start == window - 1:
+            return 0, current
+        return 0, 0
+
+    def hit(self, client: str, window: int, window_seconds: int) -> Tuple[int, int]:
+        with self._lock:
+            current, previous = self._counts(client, window)
+            current += 1
+            self.windows[client] = (window, current, previous)
+            self.windows.move_to_end(client)
+            self._evict_idle(window)
+            return current, previous
+
+    def unhit(self, client: str, window: int) -> None:
+        with self._lock:
+            entry = self.windows.get(client)
+            if entry is not None and entry[0] == window and entry[1] > 0:
+                self.windows[client] = (window, entry[1] - 1, entry[2])
+
+    def peek(self, client: str, window: int) -> Tuple[int, int]:
+        return self._counts(client, window)
+
+    def _evict_idle(self, window: int) -> None:
+        """Drop up to EVICTIONS_PER_REQUEST clients that have been idle for two windows"""
+        for _ in range(self.EVICTIONS_PER_REQUEST):
+            if not self.windows:
+                return
+            start = next(iter(self.windows.values()))[0]
+            if start >= window - 1:
+                return
+            self.windows.popitem(last=False)
+
+    def tracked_clients(self) -> Optional[int]:
+        return len(self.windows)
+
+
+class RedisError(Exception):
+    """An error reply from the server"""
+    pass
+
+
+class RedisClient:
+    """
+    Minimal Redis-protocol (RESP2) client over one socket.
+
+    execute() writes a batch of commands at once and reads all their
+    replies, so a batch costs a single round trip. Calls are serialized
+    by a lock; the connection is opened lazily and reopened after errors.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, timeout: float = 0.05):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 0.05) -> "RedisClient":
+        """Build a client from redis://[:password@]host[:port][/db]"""
+        parsed = urlparse(url)
+        return cls(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(parsed.path.lstrip("/") or 0),
+            password=unquote(parsed.password) if parsed.password else None,
+            timeout=timeout,
+        )
+
+    @staticmethod
+    def encode(*args) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _connect(self) -> None:
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile("rb")
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._roundtrip(setup)
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            finally:
+                self._sock = None
+                self._reader = None
+
+    def _read_reply(self):
+        line = self._reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("Connection closed by server")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            return RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            length = int(body)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            if len(data) != length + 2:
+                raise ConnectionError("Connection closed by server")
+            return data[:-2]
+        if kind == b"*":
+            length = int(body)
+            return None if length < 0 else [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f"Unexpected reply: {line!r}")
+
+    def _roundtrip(self, commands) -> List:
+        self._sock.sendall(b"".join(self.encode(*command) for command in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    def execute(self, *commands) -> List:
+        """Send commands as one pipeline and return their replies in order"""
+        with self._lock:
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._roundtrip(commands)
+            except (OSError, ConnectionError):
+                self.close()
+                raise
+
+
+class RedisBackend(RateLimitBackend):
+    """
+    Counts kept in a Redis-protocol server, shared by every process.
+
+    Each client and window gets a counter key that expires after two
+    windows. A request increments its counter and reads the previous
+    window's in one MULTI/EXEC transaction, sent as a single pipeline; a
+    rejected request is taken back with a DECR.
+    If the server can't be reached, requests are let through.
+    """
+
+    blocking = True
+
+    def __init__(self, client: RedisClient, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, client: str, window: int) -> str:
+        return f"{self.prefix}{client}:{window}"
+
+    def hit(self, client: str, window: int, window_seconds: int) -> Tuple[int, int]:
+        key = self._key(client, window)
+        try:
+            replies = self.client.execute(
+                ("MULTI",),
+                ("INCR", key),
+                ("EXPIRE", key, 2 * window_seconds),
+                ("GET", self._key(client, window - 1)),
+                ("EXEC",),
+            )
+        except (OSError, ConnectionError, RedisError) as e:
+            logger.warning("Rate limit backend unavailable, allowing request: %s", e)
+            return 0, 0
+        current, _, previous = replies[-1]
+        return current, int(previous or 0)
+
+    def unhit(self, client: str, window: int) -> None:
+        try:
+            self.client.execute(("DECR", self._key(client, window)))
+        except (OSError, ConnectionError, RedisError) as e:
+            logger.warning("Rate limit backend unavailable: %s", e)
+
+    def peek(self, client: str, window: int) -> Tuple[int, int]:
+        try:
+            [(current, previous)] = self.client.execute(
+                ("MGET", self._key(client, window), self._key(client, window - 1))
+            )
+        except (OSError, ConnectionError, RedisError) as e:
+            logger.warning("Rate limit backend unavailable: %s", e)
+            return 0, 0
+        return int(current or 0), int(previous or 0)
@@ -0,0 +1,233 @@
+# backend/app/prefilter.py
+"""
+Literal prefilter for the rule engine.
+
+Every rule match has to start with the rule's literal prefix ("ignore",
+"act", "[INST]", "<|"...), so the engine first finds where those literals
+occur and only runs a rule's regex there. The literals are searched for
+together by a single multi-string automaton: an Aho-Corasick automaton
+when the pyahocorasick extension is installed, otherwise a regex whose
+alternation is factored into a prefix trie.
+"""
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+try:
+    import ahocorasick
+except ImportError:  # optional C extension
+    ahocorasick = None
+
+
+def literal_prefix(pattern: str, flags: int = 0) -> str:
+    """Return the literal text every match of pattern must start with"""
+    prefix = []
+    for op, arg in sre_parse.parse(pattern, flags):
+        if op is not sre_parse.LITERAL:
+            break
+        prefix.append(chr(arg))
+    return ''.join(prefix)
+
+
+def wildcard_repeats(pattern: str, flags: int = 0) -> int:
+    """Count the unbounded repeats of "." in pattern, like the .*? in </.*?>"""
+    def count(items) -> int:
+        total = 0
+        for op, arg in items:
+            if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+                low, high, body = arg
+                if high == sre_parse.MAXREPEAT and list(body) == [(sre_parse.ANY, None)]:
+                    total += 1
+                total += count(body)
+            elif op is sre_parse.SUBPATTERN:
+                total += count(arg[-1])
+            elif op is sre_parse.BRANCH:
+                total += sum(count(branch) for branch in arg[1])
+        return total
+    return count(sre_parse.parse(pattern, flags))
+
+
+_CATEGORIES = {
+    sre_parse.CATEGORY_DIGIT: r"\d", sre_parse.CATEGORY_NOT_DIGIT: r"\D",
+    sre_parse.CATEGORY_SPACE: r"\s", sre_parse.CATEGORY_NOT_SPACE: r"\S",
+    sre_parse.CATEGORY_WORD: r"\w", sre_parse.CATEGORY_NOT_WORD: r"\W",
+}
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)} - {None}
+
+
+def _char_source(op, arg) -> Optional[str]:
+    """Regex source for a pattern item matching one character, or None"""
+    if op is sre_parse.LITERAL:
+        return re.escape(chr(arg))
+    if op is sre_parse.NOT_LITERAL:
+        return f"[^{re.escape(chr(arg))}]"
+    if op is sre_parse.ANY:
+        return "."
+    if op is sre_parse.IN:
+        parts = []
+        for item_op, item_arg in arg:
+            if item_op is sre_parse.NEGATE:
+                parts.insert(0, "^")
+            elif item_op is sre_parse.LITERAL:
+                parts.append(re.escape(chr(item_arg)))
+            elif item_op is sre_parse.RANGE:
+                parts.append(f"{re.escape(chr(item_arg[0]))}-{re.escape(chr(item_arg[1]))}")
+            elif item_op is sre_parse.CATEGORY and item_arg in _CATEGORIES:
+                parts.append(_CATEGORIES[item_arg])
+            else:
+                return None
+        return "[" + "".join(parts) + "]"
+    return None
+
+
+def reach_pattern(pattern: str, flags: int = 0) -> Optional["re.Pattern[str]"]:
+    """
+    How far back a match attempt of pattern can start and still read a
+    given character, or None if that can't be bounded.
+
+    To read the character at i, an attempt from p consumes all of
+    text[p:i], each character by some single-character part of pattern.
+    Parts repeated without bound may take any number; the others, at
+    most their combined width between them. The pattern returned matches
+    the longest such run, on the reversed text before i.
+    Backreferences, lookarounds, inline flags and unbounded repeats of
+    anything but one character can't be bounded this way.
+    """
+    chars: Set[str] = set()
+    repeated: Set[str] = set()
+
+    def width(items) -> Optional[int]:
+        total = 0
+        for op, arg in items:
+            source = _char_source(op, arg)
+            if source is not None:
+                chars.add(source)
+                total += 1
+            elif op is sre_parse.AT:
+                continue
+            elif op in _REPEATS:
+                low, high, body = arg
+                body = list(body)
+                if high == sre_parse.MAXREPEAT:
+                    source = _char_source(*body[0]) if len(body) == 1 else None
+                    if source is None:
+                        return None
+                    chars.add(source)
+                    repeated.add(source)
+                else:
+                    inner = width(body)
+                    if inner is None:
+                        return None
+                    total += high * inner
+            elif op is sre_parse.SUBPATTERN:
+                group, add_flags, del_flags, body = arg
+                inner = None if add_flags or del_flags else width(body)
+                if inner is None:
+                    return None
+                total += inner
+            elif op is getattr(sre_parse, "ATOMIC_GROUP", None):
+                inner = width(arg)
+                if inner is None:
+                    return None
+                total += inner
+            elif op is sre_parse.BRANCH:
+                widths = [width(branch) for branch in arg[1]]
+                if None in widths:
+                    return None
+                total += max(widths)
+            else:
+                return None
+        return total
+
+    bounded = width(sre_parse.parse(pattern, flags))
+    if bounded is None:
+        return None
+    any_char = "|".join(sorted(chars)) or "(?!)"
+    free = "|".join(sorted(repeated))
+    source = f"(?:{any_char}){{0,{bounded}}}"
+    if free:
+        source = f"(?:{free})*(?:(?:{any_char})(?:{free})*){{0,{bounded}}}"
+    return re.compile(source, flags & ~(re.VERBOSE | re.MULTILINE))
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """Build a regex alternation of words, factored into a prefix trie"""
+    branches: Dict[str, List[str]] = {}
+    optional = False
+    for word in sorted(set(words)):
+        if not word:
+            optional = True
+            continue
+        branches.setdefault(word[0], []).append(word[1:])
+
+    parts = []
+    for first, rests in branches.items():
+        if len(rests) == 1:
+            parts.append(re.escape(first + rests[0]))
+        else:
+            parts.append(re.escape(first) + '(?:' + trie_pattern(rests) + ')')
+
+    pattern = '|'.join(parts)
+    if optional:
+        pattern = '(?:' + pattern + ')?'
+    return pattern
+
+
+class LiteralAutomaton:
+    """
+    Finds every occurrence of a set of lowercase literals, ignoring case.
+
+    No literal may be a prefix of another, so at most one of them starts
+    at any position.
+    """
+
+    def __init__(self, literals: Iterable[str], native: bool = True):
+        self.literals = sorted(set(literals))
+        self.native = native and ahocorasick is not None and bool(self.literals)
+
+        pattern = trie_pattern(self.literals)
+        self._search = re.compile(pattern).search
+        self._search_ci = re.compile(pattern, re.IGNORECASE).search
+
+        self._automaton = None
+        if self.native:
+            self._automaton = ahocorasick.Automaton()
+            for literal in self.literals:
+                self._automaton.add_word(literal, len(literal))
+            self._automaton.make_automaton()
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (start, literal) for each occurrence in text, with the
+        literal lowercased in ASCII text and as written otherwise.
+        Occurrences of any one literal come in order of position.
+        """
+        if not self.literals:
+            return
+
+        # ASCII text can be lowered without shifting offsets; anything
+        # else is searched case-insensitively in place.
+        if not text.isascii():
+            yield from self._scan(text, self._search_ci)
+            return
+
+        haystack = text.lower()
+        if self._automaton is None:
+            yield from self._scan(haystack, self._search)
+            return
+        for end, length in self._automaton.iter(haystack):
+            start = end - length + 1
+            yield start, haystack[start:end + 1]
+
+    @staticmethod
+    def _scan(haystack: str, search) -> Iterator[Tuple[int, str]]:
+        m = search(haystack)
+        while m is not None:
+            start = m.start()
+            yield start, m.group()
+            m = search(haystack, start + 1)
@@ -0,0 +1,130 @@
+# backend/app/registry.py
+"""
+Detectors by name, constructed the first time they are used.
+
+A detector is registered as an import path, "package.module:ClassName",
+so registering costs nothing: its module is imported, and the detector
+constructed, on first lookup. Rules are compiled later still, by the
+scan engine, the first time they are matched. A request that selects a
+few detectors therefore never loads the others.
+
+Besides the built-in detectors, in-house ones can be added without
+touching the app:
+
+- as package entry points in the "promptredteam.detectors" group, the
+  entry point name being the detector name:
+
+      [project.entry-points."promptredteam.detectors"]
+      pii_leak = "acme_detectors.pii:PiiLeakAttack"
+
+- or listed in the DETECTORS setting, as a JSON object of names to
+  import paths
+
+Later sources override earlier ones: built-ins, then entry points, then
+DETECTORS. Detector classes must be constructible without arguments.
+Each path's module is located with importlib.util.find_spec when it is
+registered, which imports its parent packages but not the module
+itself, so a misspelled one fails at startup rather than on the first
+request that selects it.
+"""
+import importlib
+import importlib.util
+import threading
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from app.attacks.base import BaseAttack
+
+ENTRY_POINT_GROUP = "promptredteam.detectors"
+
+BUILTIN_DETECTORS = {
+    "zero_width": "app.attacks.zero_width:ZeroWidthAttack",
+    "direct_injection": "app.attacks.direct_injection:DirectInjectionAttack",
+    "role_manipulation": "app.attacks.role_manipulation:RoleManipulationAttack",
+    "delimiter_injection": "app.attacks.delimiter_injection:DelimiterInjectionAttack",
+    "encoded_payload": "app.attacks.encoded_payload:EncodedPayloadAttack",
+}
+
+
+def split_path(path: str) -> Tuple[str, str]:
+    """The module name and class name of a "package.module:ClassName" path"""
+    module_name, _, qualname = path.partition(":")
+    if not module_name or not qualname:
+        raise ValueError(f"Detector path must look like 'package.module:ClassName', got {path!r}")
+    return module_name, qualname
+
+
+def check_path(path: str) -> None:
+    """Raise ValueError unless path is well formed and its module can be found"""
+    module_name = split_path(path)[0]
+    try:
+        found = importlib.util.find_spec(module_name) is not None
+    except (ImportError, ValueError):  # a parent package is missing
+        found = False
+    if not found:
+        raise ValueError(f"Detector module {module_name!r} of {path!r} not found")
+
+
+def load_class(path: str) -> type:
+    """Import "package.module:ClassName" and return the class"""
+    module_name, qualname = split_path(path)
+    target = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        target = getattr(target, attr)
+    if not (isinstance(target, type) and issubclass(target, BaseAttack)):
+        raise TypeError(f"{path} is not a BaseAttack subclass")
+    return target
+
+
+def entry_point_detectors(group: str = ENTRY_POINT_GROUP) -> Dict[str, str]:
+    """Detector import paths declared as entry points by installed packages"""
+    from importlib.metadata import entry_points
+    return {ep.name: ep.value for ep in entry_points(group=group)}
+
+
+class DetectorRegistry(Mapping[str, BaseAttack]):
+    """
+    A read-only mapping of names to detector instances, each built on
+    first lookup. Iterating, len() and `in` only look at names.
+    generation counts the changes made by register(), for those caching
+    what they built from the detectors.
+    """
+
+    def __init__(self, paths: Optional[Dict[str, str]] = None):
+        self.paths: Dict[str, str] = dict(BUILTIN_DETECTORS if paths is None else paths)
+        self._instances: Dict[str, BaseAttack] = {}
+        self._lock = threading.Lock()
+        self.generation = 0
+
+    def register(self, name: str, path: str) -> None:
+        """
+        Add or replace a detector; a replaced one is rebuilt on its next
+        lookup. ValueError if path's module can't be found.
+        """
+        check_path(path)
+        with self._lock:
+            self.paths[name] = path
+            self._instances.pop(name, None)
+            self.generation += 1
+
+    def __getitem__(self, name: str) -> BaseAttack:
+        attack = self._instances.get(name)
+        if attack is None:
+            path = self.paths[name]
+            with self._lock:
+                attack = self._instances.get(name)
+                if attack is None:
+                    attack = self._instances[name] = load_class(path)()
+        return attack
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.paths
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.paths)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def loaded(self) -> List[str]:
+        """Names of the detectors built so far"""
+        return list(self._instances)
@@ -0,0 +1,56 @@
+# backend/app/responses.py
+"""
+JSON responses written straight from plain Python values.
+
+When an endpoint returns a model, FastAPI validates it against the
+route's response_model, converts it with jsonable_encoder and encodes it
+with json.dumps: for a /test report that is one model per detector,
+built and then checked again, which can cost more than the scan itself.
+Reports from Scanner.report are already in the response's shape, built
+from typed AttackResults, so endpoints return them as a
+PlainJSONResponse instead, encoded once. The routes keep their
+response_model, so the OpenAPI schema is unchanged.
+
+orjson encodes when it is installed; the standard json module otherwise.
+
+BodyStreamingResponse is for responses written while the request body
+is still being read, such as NDJSON batches scanned as their lines arrive.
+"""
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # optional C extension
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """content as compact UTF-8 JSON; tuples become arrays"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class PlainJSONResponse(JSONResponse):
+    """A JSON response of dicts, lists, strings, numbers, booleans and None, not validated again"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    A streaming response whose iterator reads the request body itself.
+    StreamingResponse would also listen for a disconnect on the same
+    receive channel, under servers older than ASGI 2.4, and take body
+    messages meant for the iterator; reading the body notices a
+    disconnect anyway.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
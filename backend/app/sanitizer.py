@@ -0,0 +1,165 @@
+# backend/app/sanitizer.py
+"""
+Sanitizing of texts before they are passed on to a model.
+
+Four kinds of content are handled, each stripped, escaped or kept:
+
+- invisible:  format (Cf) characters such as zero-width spaces, joiners,
+              the soft hyphen and BOM, plus variation selectors and Hangul
+              fillers, which render as nothing
+- tags:       Unicode tag characters (U+E0000-U+E007F), which can spell out
+              a hidden ASCII message
+- bidi:       bidirectional embeddings, overrides, isolates and marks,
+              which make text display in a different order than it reads
+- delimiters: chat template tokens such as <|im_start|>, [INST] and
+              <<SYS>>, which could open a turn of their own
+
+Escaping writes a character as \\uXXXX, or puts a backslash before the
+punctuation of a delimiter. A stripped delimiter leaves a space behind,
+so that the text either side of it can't join into another one:
+"<|im_<|x|>start|>" must not become "<|im_start|>". The replacements come from translation
+tables built once, and one regex pass finds every span to replace, so
+a text is sanitized in a single pass.
+"""
+import re
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+STRIP = "strip"
+ESCAPE = "escape"
+KEEP = "keep"
+ACTIONS = (STRIP, ESCAPE, KEEP)
+
+# Code point ranges (inclusive) of each kind of character, as of Unicode 15
+CHARACTER_RANGES: Dict[str, Sequence[Tuple[int, int]]] = {
+    "invisible": [
+        (0x00AD, 0x00AD), (0x034F, 0x034F), (0x0600, 0x0605), (0x06DD, 0x06DD), (0x070F, 0x070F),
+        (0x0890, 0x0891), (0x08E2, 0x08E2), (0x115F, 0x1160), (0x17B4, 0x17B5), (0x180B, 0x180F),
+        (0x200B, 0x200D), (0x2060, 0x2064), (0x206A, 0x206F), (0x3164, 0x3164), (0xFE00, 0xFE0F),
+        (0xFEFF, 0xFEFF), (0xFFA0, 0xFFA0), (0xFFF9, 0xFFFB), (0x110BD, 0x110BD), (0x110CD, 0x110CD),
+        (0x13430, 0x1343F), (0x1BCA0, 0x1BCA3), (0x1D173, 0x1D17A), (0xE0100, 0xE01EF),
+    ],
+    "tags": [(0xE0000, 0xE007F)],
+    "bidi": [(0x061C, 0x061C), (0x200E, 0x200F), (0x202A, 0x202E), (0x2066, 0x2069)],
+}
+
+
+def delimiter_pattern(gap: str = "") -> str:
+    """
+    Chat template tokens of common model families, all starting with < or [,
+    matched in any case; gap, if given, may come between their characters
+    """
+    def word(chars: str) -> str:
+        return gap.join(re.escape(c) for c in chars)
+
+    return (
+        r'[<\[]' + gap + '(?:'
+        + r'\|' + gap + f'(?:[A-Za-z0-9_]{gap}){{1,32}}' + r'\|' + gap + '>'  # ChatML and Llama 3: <|im_start|>, <|eot_id|>
+        + f'|(?:/{gap})?' + word('INST]')                                       # Llama 2 and Mistral: [INST],
+        + f'|<{gap}(?:/{gap})?' + word('SYS>>')                                 # <<SYS>>
+        + f'|(?:{word("start")}|{word("end")}){gap}' + word('_of_turn>')       # Gemma
+        + ')'
+    )
+
+
+DELIMITER_PATTERN = delimiter_pattern()
+DELIMITER_ESCAPES = str.maketrans({c: '\\' + c for c in '<>|[]/'})
+
+DEFAULT_ACTIONS = {"invisible": STRIP, "tags": STRIP, "bidi": STRIP, "delimiters": ESCAPE}
+
+
+class SanitizedSpan(NamedTuple):
+    """A span of the original text that was replaced"""
+    start: int
+    end: int
+    kind: str
+    action: str
+
+
+def _escape(code: int) -> str:
+    return f"\\u{code:04x}" if code <= 0xFFFF else f"\\U{code:08x}"
+
+
+def _char_class(ranges: Sequence[Tuple[int, int]]) -> str:
+    return "[" + "".join(
+        re.escape(chr(lo)) if lo == hi else f"{re.escape(chr(lo))}-{re.escape(chr(hi))}"
+        for lo, hi in ranges
+    ) + "]+"
+
+
+class Sanitizer:
+    """
+    Strips or escapes each kind of content, as set in actions (kind to
+    "strip", "escape" or "keep"; kinds left out use DEFAULT_ACTIONS).
+    """
+
+    def __init__(self, actions: Optional[Dict[str, str]] = None):
+        self.actions = dict(DEFAULT_ACTIONS, **(actions or {}))
+        for kind, action in self.actions.items():
+            if kind not in DEFAULT_ACTIONS:
+                raise ValueError(f"Unknown kind of content to sanitize: {kind}")
+            if action not in ACTIONS:
+                raise ValueError(f"Sanitize action for {kind} must be one of {', '.join(ACTIONS)}")
+
+        # The characters to replace, their kinds, and one table of replacements
+        # for all of them; one character class matches them all, as separate
+        # classes per kind made the pattern twice as slow
+        self.kinds: Dict[str, str] = {}
+        self.table: Dict[int, Optional[str]] = {}
+        ranges = []
+        for kind, kind_ranges in CHARACTER_RANGES.items():
+            action = self.actions[kind]
+            if action == KEEP:
+                continue
+            ranges.extend(kind_ranges)
+            for lo, hi in kind_ranges:
+                for code in range(lo, hi + 1):
+                    self.kinds[chr(code)] = kind
+                    self.table[code] = None if action == STRIP else _escape(code)
+
+        # Stripping characters from inside a delimiter would leave it whole, so
+        # delimiters are matched with stripped characters allowed between theirs
+        stripped = [r for kind, kind_ranges in CHARACTER_RANGES.items()
+                    if self.actions[kind] == STRIP for r in kind_ranges]
+        gap = _char_class(stripped)[:-1] + "*" if stripped else ""
+
+        chars = f"(?P<chars>{_char_class(ranges)})" if ranges else None
+        delimiters = f"(?P<delimiters>{delimiter_pattern(gap)})" if self.actions["delimiters"] != KEEP else None
+        self.char_pattern = re.compile(chars) if chars else None
+        self.delimiter_pattern = re.compile(delimiters, re.IGNORECASE) if delimiters else None
+        self.pattern = re.compile(f"{chars}|{delimiters}", re.IGNORECASE) if chars and delimiters else None
+
+    def sanitize(self, text: str) -> Tuple[str, List[SanitizedSpan]]:
+        """
+        Return the sanitized text and the spans of text that were replaced, in
+        order. A delimiter's span covers the characters stripped from inside it.
+        """
+        spans: List[SanitizedSpan] = []
+        # The characters are all outside ASCII and delimiters start with < or [,
+        # so substring checks settle most texts, and pick the shortest pattern for the rest
+        has_chars = self.char_pattern is not None and not text.isascii()
+        has_delimiters = self.delimiter_pattern is not None and ('<' in text or '[' in text)
+        if has_chars and has_delimiters:
+            pattern = self.pattern
+        elif has_chars or has_delimiters:
+            pattern = self.char_pattern if has_chars else self.delimiter_pattern
+        else:
+            return text, spans
+
+        def replace(m: "re.Match[str]") -> str:
+            start, found = m.start(), m.group()
+            if m.lastgroup == "delimiters":
+                action = self.actions["delimiters"]
+                spans.append(SanitizedSpan(start, m.end(), "delimiters", action))
+                return " " if action == STRIP else found.translate(self.table).translate(DELIMITER_ESCAPES)
+            # One span per kind of character in the run
+            i = 0
+            while i < len(found):
+                kind = self.kinds[found[i]]
+                j = i + 1
+                while j < len(found) and self.kinds[found[j]] == kind:
+                    j += 1
+                spans.append(SanitizedSpan(start + i, start + j, kind, self.actions[kind]))
+                i = j
+            return found.translate(self.table)
+
+        return pattern.sub(replace, text), spans
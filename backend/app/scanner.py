@@ -0,0 +1,213 @@
+# backend/app/scanner.py
+"""
+Scanning in process, without the HTTP API.
+
+    from app.scanner import Scanner
+
+    scanner = Scanner()
+    report = scanner.scan("Ignore all previous instructions")
+    if report["threats_detected"]:
+        ...
+
+Reports are dicts with the fields of the POST /test response, as
+plain Python values. Nothing here imports FastAPI, pydantic or uvicorn,
+and detectors are only imported when first used, so importing a Scanner
+is cheap and a scan costs what the detectors cost, with no network hop
+or JSON around it.
+
+The API service in main.py is a layer over one Scanner configured from
+settings, adding request validation, rate limiting, metrics and worker
+processes.
+"""
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.attacks.base import AttackResult
+from app.cache import ScanCache
+from app.decoding import DEFAULT_MAX_CHARS, DEFAULT_MAX_DEPTH, LayeredDecoder
+from app.engine import ScanEngine
+from app.registry import DetectorRegistry, entry_point_detectors
+from app.sanitizer import Sanitizer
+
+# Time each rule-based detector may spend per scan, as DETECTOR_BUDGET_MS
+DEFAULT_BUDGET_MS = 50
+
+# Called with the results and detector timings of each text actually scanned
+ScanObserver = Callable[[Dict[str, AttackResult], Dict[str, float]], None]
+
+
+def calculate_overall_risk(results: List[AttackResult]) -> float:
+    """Calculate overall risk score from all results"""
+    if not results:
+        return 0.0
+
+    # Weight by severity and confidence
+    weighted_scores = [
+        r.severity * r.confidence
+        for r in results if r.detected
+    ]
+
+    if not weighted_scores:
+        return 0.0
+
+    # Use max score (most severe threat)
+    return round(max(weighted_scores), 2)
+
+
+def generate_recommendations(threats: List[AttackResult]) -> List[str]:
+    """Generate actionable recommendations based on threats found"""
+    if not threats:
+        return ["No threats detected. Your prompt appears secure."]
+
+    recommendations = []
+
+    # Collect unique mitigations
+    mitigations = set()
+    for threat in threats:
+        if threat.mitigation:
+            mitigations.add(threat.mitigation)
+
+    recommendations.extend(mitigations)
+
+    # Add general recommendations
+    if len(threats) > 2:
+        recommendations.append("Multiple threats detected. Consider a comprehensive security review.")
+
+    # Add severity-based recommendations
+    high_severity_threats = [t for t in threats if t.severity > 0.8]
+    if high_severity_threats:
+        recommendations.append("High severity threats found. Address these immediately.")
+
+    return list(recommendations)
+
+
+class Scanner:
+    """
+    Scans texts with the registered detectors, over decoded content too.
+
+    detectors adds or replaces detectors by name, as "package.module:ClassName"
+    import paths; with entry_points, those installed packages declare are
+    loaded as well. budget_ms of 0 lets detectors run unbounded, and a
+    decode_max_depth of 0 turns decoding off. sanitize holds the action
+    ("strip", "escape" or "keep") for each kind of content cleaned when a
+    scan asks for it. Results are only reused if a cache is given.
+    """
+
+    def __init__(self, detectors: Optional[Dict[str, str]] = None, entry_points: bool = True,
+                 budget_ms: float = DEFAULT_BUDGET_MS, decode_max_depth: int = DEFAULT_MAX_DEPTH,
+                 decode_max_chars: int = DEFAULT_MAX_CHARS, sanitize: Optional[Dict[str, str]] = None,
+                 cache: Optional[ScanCache] = None):
+        # Built-ins, then installed plugins, then detectors; each is imported
+        # and built the first time a scan selects it
+        self.attacks = DetectorRegistry()
+        if entry_points:
+            for name, path in entry_point_detectors().items():
+                self.attacks.register(name, path)
+        for name, path in (detectors or {}).items():
+            self.attacks.register(name, path)
+
+        self.budget = budget_ms / 1000 or None
+        self.decoder = LayeredDecoder(
+            max_depth=decode_max_depth,
+            max_chars=decode_max_chars
+        ) if decode_max_depth > 0 else None
+        self.engine = ScanEngine(self.attacks, budget=self.budget, decoder=self.decoder)
+        self.sanitizer = Sanitizer(sanitize)
+        self.cache = ScanCache(enabled=False) if cache is None else cache
+
+        # Worker processes to scan on (an app.workers.ScanPool), if any
+        self.pool = None
+
+    def scan(self, text: str, attacks: Optional[List[str]] = None, sanitize: bool = False) -> Dict[str, Any]:
+        """The POST /test report for text, with the named attacks or all of them"""
+        return self.scan_many([text], attacks, sanitize)[0]
+
+    def scan_many(self, texts: Iterable[str], attacks: Optional[List[str]] = None,
+                  sanitize: bool = False) -> List[Dict[str, Any]]:
+        """Reports for texts, in order, scanning each distinct text once"""
+        start_time = time.time()
+        texts = list(texts)
+        names = self.resolve(attacks)
+        distinct = list(dict.fromkeys(texts))
+        timings: List[Dict[str, float]] = []
+        scanned = dict(zip(distinct, zip(self.run([(text, names) for text in distinct], timings), timings)))
+
+        scan_id = f"scan_{int(start_time * 1000)}"
+        reports = []
+        for i, text in enumerate(texts):
+            results, times = scanned[text]
+            reports.append(self.report(
+                text, names, [results[name] for name in names],
+                scan_id if len(texts) == 1 else f"{scan_id}_{i}", start_time, times, sanitize
+            ))
+        return reports
+
+    def resolve(self, attacks: Optional[List[str]] = None) -> List[str]:
+        """Return the attacks to run, all of them if none are named; ValueError for unknown names"""
+        attacks_to_run = list(attacks) if attacks else list(self.attacks)
+        invalid_attacks = [a for a in attacks_to_run if a not in self.attacks]
+        if invalid_attacks:
+            raise ValueError(f"Invalid attack types: {invalid_attacks}. Valid types: {list(self.attacks)}")
+        return attacks_to_run
+
+    def run(self, jobs: List[Tuple[str, List[str]]], timings: Optional[List[Dict[str, float]]] = None,
+            observe: Optional[ScanObserver] = None) -> List[Dict[str, AttackResult]]:
+        """
+        Scan (text, attacks) jobs, on the pool if there is one, reusing cached
+        results. If timings is given, each job's detector timings in seconds
+        are appended to it; jobs answered from the cache get an empty map.
+        observe is called for each job actually scanned.
+        """
+        keys = [self.cache.make_key(text, attacks, self.engine.version_for(attacks)) for text, attacks in jobs]
+        scanned = [self.cache.get(key) for key in keys]
+        job_timings: List[Dict[str, float]] = [{} for _ in jobs]
+
+        missing = [i for i, s in enumerate(scanned) if s is None]
+        if missing:
+            todo = [jobs[i] for i in missing]
+            fresh_timings: List[Dict[str, float]] = []
+            if self.pool is not None:
+                fresh = self.pool.scan_many(todo, fresh_timings)
+            else:
+                fresh = []
+                for text, attacks in todo:
+                    fresh_timings.append({})
+                    fresh.append(self.engine.scan(text, attacks, fresh_timings[-1]))
+            for i, results, times in zip(missing, fresh, fresh_timings):
+                scanned[i] = results
+                job_timings[i] = times
+                if observe is not None:
+                    observe(results, times)
+                # Timed-out results depend on load, so they are not reused
+                if not any(r.timed_out for r in results.values()):
+                    self.cache.put(keys[i], results)
+
+        if timings is not None:
+            timings.extend(job_timings)
+        return scanned
+
+    def report(self, text: str, attacks: List[str], results: List[AttackResult], scan_id: str, timestamp: float,
+               timings: Optional[Dict[str, float]] = None, sanitize: bool = False) -> Dict[str, Any]:
+        """Assemble the report for a scanned text, sanitizing it if asked to"""
+        threats = [r for r in results if r.detected]
+        cleaned, spans = self.sanitizer.sanitize(text) if sanitize else (None, None)
+
+        return {
+            "scan_id": scan_id,
+            "timestamp": timestamp,
+            "text_length": len(text),
+            "attacks_tested": len(results),
+            "threats_detected": len(threats),
+            "overall_risk_score": calculate_overall_risk(results),
+            "results": [self.result_dict(attack_name, text, r) for attack_name, r in zip(attacks, results)],
+            "recommendations": generate_recommendations(threats),
+            "cleaned_text": cleaned,
+            "sanitized_spans": None if spans is None else [span._asdict() for span in spans],
+            "timings_ms": None if timings is None else {
+                name: round(seconds * 1000, 3) for name, seconds in timings.items()
+            },
+        }
+
+    def result_dict(self, attack_name: str, text: str, result: AttackResult) -> Dict[str, Any]:
+        """One attack's result, with its evidence built from its spans in text"""
+        return dict(result.__dict__, evidence=self.attacks[attack_name].evidence(text, result))
@@ -0,0 +1,53 @@
+# backend/app/startup.py
+"""
+Init-time breakdown.
+
+On Lambda the whole import of the app runs before a cold start's first
+request is answered, so startup is split into named phases and timed.
+Code marks the end of each phase as it goes; the breakdown is logged once
+init is done and served at GET /startup-stats.
+"""
+import time
+from typing import Dict, Optional
+
+
+class StartupTimer:
+    """Wall time of consecutive startup phases, from when it was created"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases: Dict[str, float] = {}
+        self.first_request: Optional[float] = None
+
+    def mark(self, phase: str) -> None:
+        """End phase now; it is timed from the previous mark"""
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self._last
+        self._last = now
+
+    def record_first_request(self, seconds: float) -> None:
+        if self.first_request is None:
+            self.first_request = seconds
+
+    def get_stats(self) -> Dict:
+        """Return phase timings in milliseconds"""
+        return {
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+            "init_ms": round((self._last - self.started) * 1000, 1),
+            "first_request_ms": None if self.first_request is None else round(self.first_request * 1000, 1),
+        }
+
+
+def warm_event_loop() -> None:
+    """
+    Load anyio's event loop backend, which Starlette would otherwise load
+    while serving the first request; on Lambda that time belongs in init.
+    Call it outside a running loop.
+    """
+    import anyio
+    anyio.run(anyio.sleep, 0)
+
+
+# Created on first import, so import app.startup before anything else
+startup_timer = StartupTimer()
@@ -0,0 +1,288 @@
+# backend/app/streaming.py
+"""
+Streaming scans for texts too large to hold in memory.
+
+The text is fed in pieces and scanned in fixed-size windows, each one
+overlapping the next by `overlap` characters. A window only keeps the
+findings that start before its overlap; later ones are found again, whole,
+at the start of the next window. Any match no longer than the overlap is
+therefore counted exactly once, wherever the window boundaries fall.
+
+A match can be longer: the whitespace of "ignore" + 3000 spaces +
+"previous instructions", or a long base64 run. While a rule's match
+attempt from the first `window - overlap` characters could still run
+past the end of a window (RuleMatcher.reach_start), the window is held
+open and doubled as more text arrives, up to `max_window` characters;
+it then keeps only the findings that start before such attempts. Other
+detectors hold it open the same way through stream_reach(), e.g. for a
+base64 run ending the window. Matches are so counted exactly unless one
+needs more than `max_window` characters of text from the start of its
+window, by default MAX_WINDOW_GROWTH windows.
+
+Memory stays bounded by the largest window plus a fixed amount of running
+state: per rule, a match count and the first MAX_KEPT_MATCHES matched
+strings with their spans; per non-rule detector, whatever its
+start_stream() keeps: the whole text for one that only implements
+detect(), such as a plugin not written for streaming. Findings are
+scored on the full counts, but their spans and evidence come from the
+kept matches only.
+
+ScanSession is for text that arrives a little at a time, such as chat
+input or model output: it reports results after every append, found by
+finishing a fork() of the scan, so the scan itself can take more text.
+Windows are small, so an append costs the chunk plus one window and the
+kept matches, however long the text has grown; a window held open for a
+long match grows only to SESSION_MAX_WINDOW.
+"""
+import copy
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+from app.attacks.base import AttackResult, RuleHits, Span
+from app.engine import Budget, ScanEngine, mark_timed_out
+
+DEFAULT_WINDOW = 64 * 1024
+DEFAULT_OVERLAP = 1024
+
+# Matched strings kept per rule for scoring, evidence and spans
+MAX_KEPT_MATCHES = 256
+
+# Window of a ScanSession, which rescans the text after its last full
+# window on every append
+SESSION_WINDOW = 2 * DEFAULT_OVERLAP
+
+# How many times its size a window may grow to for a rule match running past it
+MAX_WINDOW_GROWTH = 16
+
+# Largest window of a ScanSession, which rescans it on every append while held open
+SESSION_MAX_WINDOW = 2 * SESSION_WINDOW
+
+
+class _RuleTally:
+    """Running matches of one rule"""
+
+    __slots__ = ("count", "matches", "spans", "next_start")
+
+    def __init__(self):
+        self.count = 0
+        self.matches: List[str] = []
+        self.spans: List[Tuple[int, int]] = []  # of the kept matches, in the text
+        self.next_start = 0
+
+    def copy(self) -> "_RuleTally":
+        tally = _RuleTally()
+        tally.count = self.count
+        tally.matches = self.matches[:]
+        tally.spans = self.spans[:]
+        tally.next_start = self.next_start
+        return tally
+
+
+class StreamScan:
+    """
+    Scans a text fed piece by piece with feed(), then returns the
+    results by detector name from finish().
+    """
+
+    def __init__(self, engine: ScanEngine, names: Optional[Iterable[str]] = None,
+                 window: int = DEFAULT_WINDOW, overlap: int = DEFAULT_OVERLAP,
+                 max_window: Optional[int] = None):
+        if not 0 < overlap < window:
+            raise ValueError("overlap must be positive and smaller than the window")
+
+        self.attacks = engine.attacks
+        self.budget = engine.budget
+        self.names = list(self.attacks) if names is None else list(dict.fromkeys(names))
+        self.window = window
+        self.overlap = overlap
+        self.max_window = max(window, max_window or MAX_WINDOW_GROWTH * window)
+
+        rule_based = frozenset(n for n in self.names if self.attacks[n].get_rules())
+        self._matcher = engine.matcher_for(rule_based) if rule_based else None
+        self._tallies: Dict[str, Dict[str, _RuleTally]] = {n: {} for n in rule_based}
+        # Rule-based detectors that ran out of time in some window; they
+        # are skipped from then on
+        self.timed_out = set()
+        self._states = {
+            n: self.attacks[n].start_stream() for n in self.names if n not in rule_based
+        }
+
+        self._buffer = ""
+        self._offset = 0  # position of _buffer[0] in the text
+        self.length = 0
+        self.windows_scanned = 0
+
+    def feed(self, chunk: str) -> None:
+        """Add the next piece of the text, scanning every window it completes"""
+        self._buffer += chunk
+        self.length += len(chunk)
+
+        step = self.window - self.overlap
+        start = 0
+        size = self.window
+        while len(self._buffer) - start >= size:
+            window = self._buffer[start:start + size]
+            # Findings from reach on may still run past the end
+            reach = self._reach(window)
+            if reach < step and size < self.max_window:
+                size = min(2 * size, self.max_window)
+                continue
+            owned = min(size - self.overlap, max(reach, step))
+            self._scan_window(window, owned, self._offset + start)
+            start += owned
+            size = self.window
+
+        if start:
+            self._buffer = self._buffer[start:]
+            self._offset += start
+
+    def fork(self) -> "StreamScan":
+        """
+        An independent copy of the scan so far, to finish() while this
+        one is fed more text. Costs the kept matches and detector states,
+        not the text.
+        """
+        fork = copy.copy(self)
+        fork._tallies = {
+            owner: {rule_id: tally.copy() for rule_id, tally in tallies.items()}
+            for owner, tallies in self._tallies.items()
+        }
+        fork._states = copy.deepcopy(self._states)
+        fork.timed_out = set(self.timed_out)
+        return fork
+
+    def finish(self) -> Dict[str, AttackResult]:
+        """Scan what is left of the text and return the results by name"""
+        if self._buffer or not self.windows_scanned:
+            self._scan_window(self._buffer, len(self._buffer), self._offset)
+            self._buffer = ""
+
+        results: Dict[str, AttackResult] = {}
+        for name in self.names:
+            if name in self._states:
+                results[name] = self.attacks[name].finish_stream(self._states[name])
+            else:
+                attack = self.attacks[name]
+                text, hits, spans = self._hits_for(name)
+                result = results[name] = attack.score(text, hits)
+                # Spans into the rebuilt text mean nothing to the caller, so
+                # the evidence is built from it now and the spans replaced
+                result.evidence = attack.evidence(text, result)
+                if result.spans:
+                    result.spans = spans
+                if name in self.timed_out:
+                    mark_timed_out(results[name], self.budget)
+        return results
+
+    def _reach(self, window: str) -> int:
+        """The earliest position in window from which a finding may still run past its end"""
+        reach = len(window)
+        if self._matcher is not None:
+            reach = self._matcher.reach_start(window, reach)
+        for name in self._states:
+            reach = min(reach, self.attacks[name].stream_reach(window))
+        return reach
+
+    def _scan_window(self, window: str, owned: int, base: int) -> None:
+        """Record the findings starting in window[:owned], base being its offset in the text"""
+        self.windows_scanned += 1
+
+        if self._matcher is not None:
+            # Carry each rule's findall() cursor over from the previous window
+            cursors = {
+                (owner, rule_id): tally.next_start - base
+                for owner, tallies in self._tallies.items()
+                for rule_id, tally in tallies.items()
+                if tally.next_start > base
+            }
+            budget = Budget(self.budget, self.timed_out) if self.budget else None
+            hits = self._matcher.scan(window, cursors, budget)
+            if budget is not None:
+                self.timed_out |= budget.timed_out
+            for owner, rule_hits in hits.items():
+                tallies = self._tallies[owner]
+                for rule_id, spans in rule_hits.items():
+                    for start, end in spans:
+                        if start >= owned:
+                            continue
+                        tally = tallies.get(rule_id)
+                        if tally is None:
+                            tally = tallies[rule_id] = _RuleTally()
+                        tally.count += 1
+                        if len(tally.matches) < MAX_KEPT_MATCHES:
+                            tally.matches.append(window[start:end])
+                            tally.spans.append((base + start, base + end))
+                        tally.next_start = base + (end if end > start else start + 1)
+
+        for name, state in self._states.items():
+            self.attacks[name].feed_stream(state, window, owned)
+
+    def _hits_for(self, name: str) -> Tuple[str, RuleHits, List[Span]]:
+        """
+        Rebuild a text and hits for score() from the kept matches, laid
+        out in text order, and return their spans in the real text too.
+        A rule that matched more often than it kept gets its last kept
+        match again for the rest, so that score() sees the real count.
+        """
+        kept: List[Tuple[Span, str]] = []
+        for rule_id, tally in self._tallies[name].items():
+            for (start, end), match in zip(tally.spans, tally.matches):
+                kept.append(((start, end, rule_id), match))
+        kept.sort()
+
+        pieces: List[str] = []
+        hits: RuleHits = {}
+        position = 0
+        for span, match in kept:
+            pieces.append(match)
+            hits.setdefault(span[2], []).append((position, position + len(match)))
+            position += len(match)
+        for rule_id, tally in self._tallies[name].items():
+            if tally.count > len(tally.matches):
+                rule_hits = hits[rule_id]
+                rule_hits.extend([rule_hits[-1]] * (tally.count - len(tally.matches)))
+        return "".join(pieces), hits, [span for span, _ in kept]
+
+
+def verdict_of(results: Dict[str, AttackResult]) -> Tuple[Hashable, ...]:
+    """What a client acts on in results: which detectors fired, and how strongly"""
+    return tuple(
+        (name, r.detected, r.severity, r.confidence, r.timed_out)
+        for name, r in results.items()
+    )
+
+
+class ScanSession:
+    """
+    Scans text appended chunk by chunk, returning the results for all of
+    it so far from append() only when the verdict changed.
+    """
+
+    def __init__(self, engine: ScanEngine, names: Optional[Iterable[str]] = None,
+                 window: int = SESSION_WINDOW, overlap: int = DEFAULT_OVERLAP, max_window: int = SESSION_MAX_WINDOW):
+        self.scan = StreamScan(engine, names, window=window, overlap=overlap, max_window=max_window)
+        self.results: Dict[str, AttackResult] = {}
+        self._verdict: Optional[Tuple[Hashable, ...]] = None
+
+    @property
+    def length(self) -> int:
+        return self.scan.length
+
+    def append(self, chunk: str) -> Optional[Dict[str, AttackResult]]:
+        """Add chunk; return the updated results if the verdict changed, else None"""
+        self.scan.feed(chunk)
+        self.results = self.scan.fork().finish()
+        verdict = verdict_of(self.results)
+        if verdict == self._verdict:
+            return None
+        self._verdict = verdict
+        return self.results
+
+
+def scan_chunks(engine: ScanEngine, chunks: Iterable[str], names: Optional[Iterable[str]] = None,
+                window: int = DEFAULT_WINDOW, overlap: int = DEFAULT_OVERLAP,
+                max_window: Optional[int] = None) -> Dict[str, AttackResult]:
+    """Scan a text given as an iterable of pieces, e.g. a file read in blocks"""
+    scan = StreamScan(engine, names, window=window, overlap=overlap, max_window=max_window)
+    for chunk in chunks:
+        scan.feed(chunk)
+    return scan.finish()
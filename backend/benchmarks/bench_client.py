@@ -0,0 +1,133 @@
+# backend/benchmarks/bench_client.py
+"""
+Load on a local server from many concurrent callers, each scanning one
+text at a time:
+
+- naive:    a new httpx.AsyncClient, so a new connection, per POST /test,
+            as the README's requests.post examples do
+- pooled:   AsyncScanClient with max_batch_size=1: one POST /test per
+            scan over pooled keep-alive connections
+- batched:  AsyncScanClient gathering concurrent scans into POST
+            /test/batch requests
+
+Reports scans/s, p50/p99 per scan and the HTTP requests sent, and checks
+that every way returns the same results. The server is the app under
+uvicorn in a subprocess, with rate limiting and the scan cache out of
+the way.
+
+Run from backend/:  python -m benchmarks.bench_client [callers] [scans]
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+import httpx
+
+from app.client import AsyncScanClient
+from benchmarks.corpus import mixed_corpus
+
+
+def serve(port: int) -> None:
+    """Run the app on port for the benchmark; called in the subprocess"""
+    import uvicorn
+    from app import main
+    from app.middleware.rate_limit import rate_limiter
+
+    rate_limiter.requests_per_minute = 10 ** 9
+    main.SCAN_CACHE.enabled = False
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server() -> Tuple[subprocess.Popen, str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_client", "serve", str(port)],
+                              env=dict(os.environ, PYTHONPATH="."))
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url + "/health")
+            return server, url
+        except httpx.TransportError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+async def load(scan, texts: List[str], callers: int):
+    """Each caller scans its share of texts one at a time; returns reports, latencies and seconds"""
+    reports = [None] * len(texts)
+    latencies = []
+
+    async def caller(first: int):
+        for i in range(first, len(texts), callers):
+            started = time.perf_counter()
+            reports[i] = await scan(texts[i])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller(c) for c in range(callers)))
+    return reports, sorted(latencies), time.perf_counter() - started
+
+
+def verdicts(reports):
+    return [[(r["attack_name"], r["detected"], r["severity"], r["confidence"]) for r in report["results"]]
+            for report in reports]
+
+
+async def run(url: str, callers: int, count: int):
+    texts = mixed_corpus(count=count, length=400, density=0.1)
+    requests = {}
+
+    async def naive(text):
+        async with httpx.AsyncClient(base_url=url) as client:
+            response = await client.post("/test", json={"text": text})
+            response.raise_for_status()
+            return response.json()
+
+    ways = {"naive": (naive, None)}
+    for label, batch_size in [("pooled", 1), ("batched", 100)]:
+        client = AsyncScanClient(url, max_batch_size=batch_size, max_connections=callers)
+        ways[label] = (client.scan, client)
+
+    expected = None
+    for label, (scan, client) in ways.items():
+        await load(scan, texts[:50], min(callers, 50))  # warm up
+        sent = client.requests_sent if client else 0
+        reports, latencies, seconds = await load(scan, texts, callers)
+        requests = client.requests_sent - sent if client else len(texts)
+        if client:
+            await client.aclose()
+        if expected is None:
+            expected = verdicts(reports)
+        elif verdicts(reports) != expected:
+            raise AssertionError(f"{label} results differ from naive")
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f"  {label:<8} {len(texts) / seconds:8.0f} scans/s   p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   "
+              f"{requests:5} requests")
+
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        serve(int(sys.argv[2]))
+        return
+    callers = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    server, url = start_server()
+    try:
+        print(f"{callers} concurrent callers, {count} scans of 400-character texts:")
+        asyncio.run(run(url, callers, count))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
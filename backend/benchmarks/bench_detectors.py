@@ -0,0 +1,166 @@
+# backend/benchmarks/bench_detectors.py
+"""
+Detector micro-benchmarks with regression checks.
+
+Times each detector's detect() and the full test_prompt pipeline over a
+grid of text lengths and attack densities (the share of prompts in a text
+that are malicious), and reports ops/s with p50/p99 latency per cell.
+
+- --save PATH      write the results as a JSON baseline
+- --compare PATH   compare against a saved baseline, exiting with status 1
+                   if any cell's p50 grew by more than --threshold (default
+                   0.25, or the baseline's own) and by at least
+                   --min-delta-us, so timer noise on cells of a few
+                   microseconds doesn't fail the run
+
+Baselines only compare on the machine they were saved on: save one from
+the main branch, then compare a change against it on the same host.
+
+The scan cache is turned off while timing the pipeline, so every call scans.
+
+Run from backend/:  python -m benchmarks.bench_detectors [--quick] [--save PATH] [--compare PATH]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List
+
+from app import main
+from benchmarks.corpus import mixed_corpus
+
+LENGTHS = [100, 1000, 10000]
+DENSITIES = [0.0, 0.1, 0.5]
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_US = 2.0
+
+
+def time_calls(fn: Callable[[str], object], texts: List[str], offset: int,
+               min_calls: int, min_seconds: float) -> List[float]:
+    """Call fn over texts until both minimums are met; return the sorted call times"""
+    samples = []
+    started = time.perf_counter()
+    i = offset
+    while len(samples) < min_calls or time.perf_counter() - started < min_seconds:
+        text = texts[i % len(texts)]
+        i += 1
+        call_started = time.perf_counter()
+        fn(text)
+        samples.append(time.perf_counter() - call_started)
+    samples.sort()
+    return samples
+
+
+def targets() -> Dict[str, Callable[[str], object]]:
+    """Each detector's detect(), then the whole test_prompt pipeline"""
+    funcs = {name: attack.detect for name, attack in main.ATTACKS.items()}
+    funcs["test_prompt"] = lambda text: main.test_prompt(main.TestRequest(text=text))
+    return funcs
+
+
+def run(lengths: List[int], densities: List[float], min_calls: int, min_seconds: float,
+        rounds: int = 5) -> Dict[str, Dict]:
+    """
+    Time every cell of the grid. The grid is swept rounds times and each
+    cell's p50 is its lowest round median, so a burst of load from other
+    processes only spoils the rounds it overlaps; ops/s and p99 are over
+    all calls.
+    """
+    main.SCAN_CACHE.enabled = False
+    main.rate_limiter.max_text_length = max(main.rate_limiter.max_text_length, max(lengths))
+
+    cells = []
+    for length in lengths:
+        for density in densities:
+            texts = mixed_corpus(count=200, length=length, density=density)
+            for name, fn in targets().items():
+                for text in texts[:10]:
+                    fn(text)  # warm up
+                cells.append((f"{name}/len={length}/density={density}", fn, texts))
+
+    samples: Dict[str, List[float]] = {key: [] for key, _, _ in cells}
+    medians: Dict[str, List[float]] = {key: [] for key, _, _ in cells}
+    for r in range(rounds):
+        for key, fn, texts in cells:
+            round_samples = time_calls(fn, texts, r * min_calls, min_calls, min_seconds)
+            medians[key].append(round_samples[len(round_samples) // 2])
+            samples[key].extend(round_samples)
+
+    results = {}
+    for key, _, _ in cells:
+        calls = sorted(samples[key])
+        results[key] = row = {
+            "calls": len(calls),
+            "ops_per_sec": round(len(calls) / sum(calls), 1),
+            "p50_us": round(min(medians[key]) * 1e6, 2),
+            "p99_us": round(calls[min(len(calls) * 99 // 100, len(calls) - 1)] * 1e6, 2),
+        }
+        print(f"  {key:<44} {row['ops_per_sec']:10.0f} ops/s   "
+              f"p50 {row['p50_us']:9.1f} us   p99 {row['p99_us']:9.1f} us")
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, threshold: float,
+            min_delta_us: float = DEFAULT_MIN_DELTA_US) -> List[str]:
+    """Return a line for every cell whose p50 regressed past threshold"""
+    regressions = []
+    for key, base in baseline["results"].items():
+        current = results.get(key)
+        if current is None:
+            continue
+        delta = current["p50_us"] - base["p50_us"]
+        if delta > max(base["p50_us"] * threshold, min_delta_us):
+            regressions.append(f"{key}: p50 {base['p50_us']:.1f} -> {current['p50_us']:.1f} us "
+                               f"({current['p50_us'] / base['p50_us']:.2f}x)")
+    return regressions
+
+
+def cli(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="fewer calls per cell, for a fast check")
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="fail on regressions against this baseline")
+    parser.add_argument("--threshold", type=float, help=f"allowed p50 growth (default {DEFAULT_THRESHOLD})")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                        help=f"smallest p50 growth counted as a regression (default {DEFAULT_MIN_DELTA_US})")
+    args = parser.parse_args(argv)
+
+    min_calls, min_seconds = (20, 0.01) if args.quick else (100, 0.06)
+    print(f"Python {platform.python_version()} on {platform.machine()}, {os.cpu_count()} CPUs")
+    results = run(LENGTHS, DENSITIES, min_calls, min_seconds)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    threshold = args.threshold
+    if threshold is None:
+        threshold = baseline.get("threshold", DEFAULT_THRESHOLD) if baseline else DEFAULT_THRESHOLD
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "threshold": threshold,
+                "results": results,
+            }, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, threshold, args.min_delta_us)
+        if regressions:
+            print(f"\n{len(regressions)} regressions past {threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions past {threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli(sys.argv[1:]))
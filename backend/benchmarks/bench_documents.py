@@ -0,0 +1,68 @@
+# backend/benchmarks/bench_documents.py
+"""
+Latency of one keystroke in a document open for editing, against the
+document's size:
+
+- full:   POST /test on the whole edited text, as an editor re-posting
+          the document on every keystroke does (scan cache off)
+- edits:  POST /documents/{id}/edits with the keystroke
+
+Documents are paragraphs of 400 characters with 10% of prompts
+malicious, up to past DOCUMENT_MAX_LENGTH. Both must return the same
+results after every keystroke.
+
+Run from backend/:  python -m benchmarks.bench_documents
+"""
+import json
+import random
+import time
+
+from starlette.requests import Request
+
+from app import main
+from app.responses import dumps
+from benchmarks.corpus import mixed_corpus
+
+KEYSTROKES = 50
+
+
+def document(length: int) -> str:
+    return "\n".join(mixed_corpus(count=max(length // 400, 1), length=400, density=0.1))
+
+
+def same(response, expected) -> bool:
+    return json.loads(response.body)["results"] == json.loads(dumps(expected))["results"]
+
+
+if __name__ == "__main__":
+    main.SCAN_CACHE.enabled = False
+    main.DOCUMENTS.max_length = 300_000
+    client = Request({"type": "http", "headers": [], "client": ("127.0.0.1", 0)})
+    rng = random.Random(0)
+    print(f"median of {KEYSTROKES} keystrokes:")
+    for length in (4_000, 16_000, 64_000, 256_000):
+        text = document(length)
+        main.open_document("bench", main.DocumentRequest(text=text), client)
+        full, edits = [], []
+        for _ in range(KEYSTROKES):
+            offset = rng.randrange(len(text) + 1)
+            key = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+            text = text[:offset] + key + text[offset:]
+
+            started = time.perf_counter()
+            expected = main.build_response(text, list(main.ATTACKS), list(main.ENGINE.scan(text).values()), "bench", 0)
+            full.append(time.perf_counter() - started)
+
+            request = main.DocumentEditRequest(edits=[main.TextEditRequest(offset=offset, insert=key)])
+            started = time.perf_counter()
+            got = main.edit_document("bench", request, client)
+            edits.append(time.perf_counter() - started)
+
+            if not same(got, expected):
+                raise AssertionError(f"edit results differ from a full scan at {length} characters")
+        full.sort()
+        edits.sort()
+        p50_full, p50_edits = full[len(full) // 2], edits[len(edits) // 2]
+        print(f"  {length:8,} chars   full {p50_full * 1e3:7.2f} ms   edits {p50_edits * 1e3:7.2f} ms   "
+              f"{p50_full / p50_edits:5.1f}x")
+    print(f"documents: {main.DOCUMENTS.get_stats()}")
@@ -0,0 +1,93 @@
+# backend/benchmarks/bench_gate.py
+"""
+Compare POST /gate with the full POST /test report it stands in for:
+
+- costs:      each detector's time alone on everyday 1000-character
+              prompts, the basis of gate.DEFAULT_COSTS
+- agreement:  gate must block exactly the texts whose full-scan risk
+              score reaches the threshold
+- latency:    p50 of gate_prompt and test_prompt on benign, mixed and
+              malicious traffic
+- escalation: a cascade holding back encoded_payload and decoded content
+              for ambiguous texts: its p50, the tiers that decided, and
+              the decisions it gets wrong against a full scan
+
+The scan cache is turned off, so every call scans.
+
+Run from backend/:  python -m benchmarks.bench_gate
+"""
+from collections import Counter
+from typing import Dict, List
+
+from app import main
+from app.gate import Gate, risk
+from benchmarks.bench_detectors import time_calls
+from benchmarks.corpus import MALICIOUS_PROMPTS, benign_corpus, malicious_corpus, mixed_corpus
+
+
+def p50(fn, texts: List[str], rounds: int = 5) -> float:
+    """Lowest round median, in seconds"""
+    medians = []
+    for r in range(rounds):
+        samples = time_calls(fn, texts, r * 50, 50, 0.05)
+        medians.append(samples[len(samples) // 2])
+    return min(medians)
+
+
+def costs(texts: List[str]) -> Dict[str, float]:
+    """Each detector's p50 alone, in microseconds"""
+    return {
+        name: p50(lambda text, name=name: main.ENGINE.scan(text, [name], decode=False), texts) * 1e6
+        for name in main.ATTACKS
+    }
+
+
+def agreement(corpora: Dict[str, List[str]]) -> int:
+    checked = 0
+    for texts in corpora.values():
+        for text in texts:
+            full = main.ENGINE.scan(text)
+            expected = max(risk(r) for r in full.values()) >= main.GATE.threshold
+            if main.GATE.check(text).blocked != expected:
+                raise AssertionError(f"gate and full scan disagree on {text!r}")
+            checked += 1
+    return checked
+
+
+def run():
+    main.SCAN_CACHE.enabled = False
+    corpora = {
+        "benign": benign_corpus(count=100),
+        "mixed 10%": mixed_corpus(count=100, density=0.1),
+        "malicious": malicious_corpus(count=100),
+        "attack prompts": MALICIOUS_PROMPTS,
+    }
+
+    print("detector costs on 1000-character benign texts:")
+    for name, us in sorted(costs(corpora["benign"]).items(), key=lambda item: item[1]):
+        print(f"  {name:<22} {us:8.1f} us")
+
+    print(f"agreement: {agreement(corpora)} texts, same decisions as a full scan")
+
+    test = lambda text: main.test_prompt(main.TestRequest(text=text))
+    gate = lambda text: main.gate_prompt(main.GateRequest(text=text))
+    for label, texts in corpora.items():
+        blocked = sum(main.GATE.check(text).blocked for text in texts)
+        full, fast = p50(test, texts), p50(gate, texts)
+        print(f"  {label:<16} {blocked:3}/{len(texts):<3} blocked   test {full * 1e6:8.1f} us   "
+              f"gate {fast * 1e6:8.1f} us   {full / fast:5.2f}x")
+
+    cascade = Gate(main.ENGINE, main.GATE.threshold, costs=main.GATE.costs,
+                   escalation=["encoded_payload"], escalate_at=0.3, escalate_decoding=True)
+    print("escalation (encoded_payload and decoding held back below 0.3):")
+    for label, texts in corpora.items():
+        verdicts = [cascade.check(text) for text in texts]
+        wrong = sum(v.blocked != main.GATE.check(text).blocked for v, text in zip(verdicts, texts))
+        tiers = Counter(v.tier for v in verdicts)
+        fast = p50(cascade.check, texts)
+        print(f"  {label:<16} {wrong:3} wrong   cascade {fast * 1e6:8.1f} us   "
+              f"tiers {', '.join(f'{tier} {n}' for tier, n in tiers.most_common())}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,49 @@
+# backend/benchmarks/bench_rate_limit.py
+"""
+Stress the rate limiter with 1M distinct client keys.
+
+- burst:   every key makes one request within a single window
+- spread:  the same keys arrive over ten simulated minutes, so idle
+           keys become evictable as the clock moves on
+
+Reports requests/s, then tracked keys and traced memory at the end of a
+second, traced run (tracing slows the limiter down too much to time it).
+
+Run from backend/:  python -m benchmarks.bench_rate_limit [keys]
+"""
+import sys
+import time
+import tracemalloc
+
+from app.middleware.rate_limit import RateLimiter
+
+
+def push(limiter, names, duration):
+    start_time = 1_000_000.0
+    step = duration / len(names)
+    for i, name in enumerate(names):
+        limiter.is_rate_limited(name, now=start_time + i * step)
+
+
+def run(keys, duration):
+    names = [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}:{i}" for i in range(keys)]
+
+    limiter = RateLimiter(requests_per_minute=10)
+    started = time.perf_counter()
+    push(limiter, names, duration)
+    rate = keys / (time.perf_counter() - started)
+
+    limiter = RateLimiter(requests_per_minute=10)
+    tracemalloc.start()
+    push(limiter, names, duration)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return rate, limiter.tracked_clients(), memory
+
+
+if __name__ == "__main__":
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for label, duration in [("burst", 1), ("spread", 600)]:
+        rate, tracked, memory = run(keys, duration)
+        print(f"{label:<7} {keys} keys over {duration:>3}s: {rate:9.0f} req/s   "
+              f"{tracked:8d} tracked   {memory / 1e6:6.1f} MB   ({memory / max(tracked, 1):.0f} B/key)")
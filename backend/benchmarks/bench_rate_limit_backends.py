@@ -0,0 +1,80 @@
+# backend/benchmarks/bench_rate_limit_backends.py
+"""
+Compare the rate limit backends on the same traffic:
+
+- agreement:  a scripted mix of clients, clocks and bursts is replayed
+              against MemoryBackend and RedisBackend, and every decision,
+              remaining count and reset time must match
+- latency:    checks/s and p50/p99 per check, where a RedisBackend check
+              is one pipelined round trip
+
+RedisBackend talks to the in-process stand-in server (tests.resp_server)
+unless a URL is given.
+
+Run from backend/:  python -m benchmarks.bench_rate_limit_backends [redis_url]
+"""
+import random
+import sys
+import time
+
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.rate_limit_backends import MemoryBackend, RedisBackend, RedisClient
+from tests.resp_server import start_server
+
+
+def traffic(seed=0, clients=200, events=5000):
+    """(client, time) pairs in time order, with some clients bursting"""
+    rng = random.Random(seed)
+    now = 1_000_000.0
+    for _ in range(events):
+        now += rng.expovariate(5)
+        client = f"10.0.0.{rng.randrange(clients)}"
+        for _ in range(rng.choice([1, 1, 1, 1, 1, 5, 15])):
+            yield client, now
+
+
+def agreement(url):
+    flush(url)
+    memory = RateLimiter(requests_per_minute=10, backend=MemoryBackend())
+    redis = RateLimiter(requests_per_minute=10, backend=RedisBackend(RedisClient.from_url(url, timeout=1)))
+    checks = limited = 0
+    for client, now in traffic():
+        expected = memory.check(client, now)
+        actual = redis.check(client, now)
+        if expected != actual:
+            raise AssertionError(f"{client} at {now}: memory {expected} != redis {actual}")
+        checks += 1
+        limited += expected.limited
+    return checks, limited
+
+
+def latency(limiter, n=20000):
+    # Real clock, so counter keys expire on the server as they would in production
+    times = []
+    for i in range(n):
+        start = time.perf_counter()
+        limiter.check(f"10.1.{i >> 8 & 255}.{i & 255}")
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return n / sum(times), times[n // 2] * 1e6, times[n * 99 // 100] * 1e6
+
+
+def flush(url):
+    RedisClient.from_url(url, timeout=1).execute(("FLUSHDB",))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        url = sys.argv[1]
+    else:
+        url = start_server().url
+        print(f"Stand-in server at {url}")
+
+    checks, limited = agreement(url)
+    print(f"agreement: {checks} checks, {limited} limited, backends identical")
+
+    flush(url)
+    for label, backend in [("memory", MemoryBackend()),
+                           ("redis", RedisBackend(RedisClient.from_url(url, timeout=1)))]:
+        rate, p50, p99 = latency(RateLimiter(requests_per_minute=10, backend=backend))
+        print(f"{label:<7} {rate:9.0f} checks/s   p50 {p50:7.1f} us   p99 {p99:7.1f} us")
@@ -0,0 +1,111 @@
+# backend/benchmarks/bench_responses.py
+"""
+Request latency of the report endpoints, and what encoding a report costs:
+
+- before/after:  p50 of POST /test on 60- and 1000-character texts, against
+                 the same request served the way it was before responses
+                 were written directly: the endpoint returns a TestResponse
+                 and FastAPI validates and encodes it through response_model
+                 (a route added for the benchmark); the two alternate
+- requests:      p50 of POST /gate and a 100-item POST /test/batch
+- encoding:      one /test report as a model (TestResponse built, then
+                 dumped and json.dumps'd) against responses.dumps; both must
+                 give the same JSON
+
+Requests are sent in process over httpx's ASGI transport, with rate
+limiting and the scan cache out of the way.
+
+Run from backend/:  python -m benchmarks.bench_responses
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List
+
+import httpx
+
+from app import main, responses
+from app.middleware.rate_limit import rate_limiter
+from benchmarks.bench_detectors import time_calls
+from benchmarks.corpus import mixed_corpus
+
+
+VALIDATED_PATH = "/bench/test-validated"
+
+
+def add_validated_route():
+    """POST /test as it was served before: a TestResponse validated and encoded by FastAPI"""
+    @main.app.post(VALIDATED_PATH, response_model=main.TestResponse)
+    def test_validated(request: main.TestRequest):
+        start_time = time.time()
+        attacks_to_run = main.resolve_attacks(request.attacks)
+        timings: List[Dict[str, float]] = []
+        results = main.run_many([(request.text, attacks_to_run)], timings)[0]
+        return main.TestResponse(**main.build_response(
+            request.text, attacks_to_run, results, f"scan_{int(start_time * 1000)}", start_time, timings[0]
+        ))
+
+
+async def p50s(client: httpx.AsyncClient, paths: List[str], bodies: List[Dict], rounds: int = 10) -> List[float]:
+    """Median seconds per request of each path, sending every body to each path in turn"""
+    samples: List[List[float]] = [[] for _ in paths]
+    for _ in range(rounds):
+        for path, times in zip(paths, samples):
+            for body in bodies:
+                started = time.perf_counter()
+                response = await client.post(path, json=body)
+                times.append(time.perf_counter() - started)
+                response.raise_for_status()
+    return [sorted(times)[len(times) // 2] for times in samples]
+
+
+async def requests(texts: Dict[str, List[str]]):
+    add_validated_route()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, key in [("60 chars", "short"), ("1000 chars", "long")]:
+            bodies = [{"text": text} for text in texts[key]]
+            await p50s(client, [VALIDATED_PATH, "/test"], bodies[:10], rounds=1)  # warm up
+            before, after = await p50s(client, [VALIDATED_PATH, "/test"], bodies)
+            print(f"  /test        {label:<18} before {before * 1e3:7.3f} ms   after {after * 1e3:7.3f} ms   "
+                  f"{before / after:5.2f}x")
+        for path, label, bodies in [
+            ("/gate", "60 chars", [{"text": text} for text in texts["short"]]),
+            ("/test/batch", "100 x 1000 chars", [{"items": texts["long"]}] * 5),
+        ]:
+            (after,) = await p50s(client, [path], bodies, rounds=3)
+            print(f"  {path:<12} {label:<18} {after * 1e3:7.3f} ms")
+
+
+def encoding(texts: List[str]):
+    names = list(main.ATTACKS)
+    reports = [main.build_response(text, names, list(main.ENGINE.scan(text).values()), "bench", 0.0, {})
+               for text in texts]
+
+    def model(report):
+        return json.dumps(main.TestResponse(**report).model_dump(mode="json"), separators=(",", ":")).encode()
+
+    for report in reports:
+        if json.loads(model(report)) != json.loads(responses.dumps(report)):
+            raise AssertionError(f"encodings differ for {report}")
+
+    for label, encode in [("model", model), ("direct", responses.dumps)]:
+        samples = time_calls(encode, reports, 0, len(reports), 0.05)
+        print(f"  {label:<10} {samples[len(samples) // 2] * 1e6:8.1f} us")
+
+
+def run():
+    rate_limiter.requests_per_minute = 10 ** 9
+    main.SCAN_CACHE.enabled = False
+    texts = {
+        "short": [text[:60] for text in mixed_corpus(count=100, length=200, density=0.3)],
+        "long": mixed_corpus(count=100, length=1000, density=0.3),
+    }
+    print(f"request p50 (JSON encoder: {'orjson' if responses.orjson else 'json'}):")
+    asyncio.run(requests(texts))
+    print("encoding one /test report:")
+    encoding(texts["long"])
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,66 @@
+# backend/benchmarks/bench_session.py
+"""
+Cost of following a text that arrives in small chunks, such as a chat
+reply streamed token by token:
+
+- rescan:   scan the whole text so far after every chunk, as re-POSTing
+            the growing buffer to /test does
+- session:  one ScanSession, as WS /test/session uses
+
+Both must report the same results once the text is complete.
+
+Run from backend/:  python -m benchmarks.bench_session
+"""
+import time
+
+from app.engine import ScanEngine
+from app.registry import DetectorRegistry
+from app.streaming import ScanSession
+from benchmarks.corpus import mixed_corpus
+
+CHUNK = 16
+
+
+def chunks(text: str):
+    return [text[i:i + CHUNK] for i in range(0, len(text), CHUNK)]
+
+
+def rescan(engine: ScanEngine, text: str):
+    buffer = ""
+    for chunk in chunks(text):
+        buffer += chunk
+        results = engine.scan(buffer, decode=False)
+    return results
+
+
+def session(engine: ScanEngine, text: str):
+    scan = ScanSession(engine)
+    for chunk in chunks(text):
+        scan.append(chunk)
+    return scan.results
+
+
+def agree(engine: ScanEngine, text: str, expected, got) -> None:
+    for name, result in expected.items():
+        same = (result.detected, result.severity, result.confidence, engine.attacks[name].evidence(text, result))
+        if same != (got[name].detected, got[name].severity, got[name].confidence, got[name].evidence):
+            raise AssertionError(f"{name} differs between rescan and session")
+
+
+if __name__ == "__main__":
+    engine = ScanEngine(DetectorRegistry())
+    print(f"{CHUNK}-character chunks, time to follow the whole text:")
+    for length in (1000, 4000, 16000, 32000):
+        text = mixed_corpus(count=1, length=length, density=0.1)[0]
+        timings = {}
+        for label, follow in (("rescan", rescan), ("session", session)):
+            start = time.perf_counter()
+            results = follow(engine, text)
+            timings[label] = time.perf_counter() - start
+            timings[label + " results"] = results
+        agree(engine, text, timings["rescan results"], timings["session results"])
+        appends = len(chunks(text))
+        print(f"  {length:6} chars   rescan {timings['rescan'] * 1e3:8.1f} ms   "
+              f"session {timings['session'] * 1e3:7.1f} ms   "
+              f"({timings['session'] / appends * 1e6:5.1f} us per append)   "
+              f"{timings['rescan'] / timings['session']:5.1f}x")
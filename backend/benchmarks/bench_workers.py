@@ -0,0 +1,59 @@
+# backend/benchmarks/bench_workers.py
+"""
+Scan throughput against worker count:
+
+- in-process:   one ScanEngine in the calling process
+- N workers:    ScanPool with N processes, jobs sent SCAN_CHUNK_SIZE at a time
+
+Run from backend/:  python -m benchmarks.bench_workers [max_workers]
+
+max_workers defaults to the number of CPUs; worker counts double up to it.
+"""
+import os
+import sys
+import time
+
+from app.engine import ScanEngine
+from app.registry import BUILTIN_DETECTORS, DetectorRegistry
+from app.workers import ScanPool
+from benchmarks.corpus import malicious_corpus
+
+NAMES = list(BUILTIN_DETECTORS)
+
+
+def throughput(scan_many, jobs, repeat=3):
+    scan_many(jobs[:100])  # warm up
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scan_many(jobs)
+        best = min(best, time.perf_counter() - start)
+    return len(jobs) / best
+
+
+if __name__ == "__main__":
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+
+    print(f"{os.cpu_count()} CPUs")
+    for length in (1000, 10000):
+        jobs = [(text, NAMES) for text in malicious_corpus(count=2000, length=length)]
+        print(f"\n{len(jobs)} texts of {length} chars")
+
+        engine = ScanEngine(DetectorRegistry())
+        baseline = throughput(lambda js: [engine.scan(t, n) for t, n in js], jobs)
+        print(f"  {'in-process':<12} {baseline:9.0f} texts/s   1.0x")
+
+        for workers in counts:
+            for chunk_size in (1, 16, 64):
+                pool = ScanPool(BUILTIN_DETECTORS, workers=workers, chunk_size=chunk_size)
+                pool.warm()
+                rate = throughput(pool.scan_many, jobs)
+                pool.close()
+                label = f"{workers} x {chunk_size}"
+                print(f"  {label:<12} {rate:9.0f} texts/s {rate / baseline:5.1f}x   (workers x chunk size)")
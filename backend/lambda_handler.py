@@ -1,6 +1,31 @@
 # backend/lambda_handler.py
+import logging
+import time
+
+from app.startup import startup_timer, warm_event_loop
 from mangum import Mangum
+startup_timer.mark("import mangum")
+from app.config import settings
 from app.main import app
 
 # Mangum wraps FastAPI for AWS Lambda
-handler = Mangum(app)
\ No newline at end of file
+asgi_handler = Mangum(app)
+warm_event_loop()
+startup_timer.mark("handler")
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.LOG_LEVEL)  # Lambda's root logger only passes warnings
+
+# One line per cold start in the CloudWatch log
+logger.info("cold_start %s", startup_timer.get_stats())
+
+
+def handler(event, context):
+    if startup_timer.first_request is not None:
+        return asgi_handler(event, context)
+
+    started = time.perf_counter()
+    response = asgi_handler(event, context)
+    startup_timer.record_first_request(time.perf_counter() - started)
+    logger.info("first_request_ms %s", startup_timer.get_stats()["first_request_ms"])
+    return response
@@ -0,0 +1,13 @@
+# backend/tests/conftest.py
+import pytest
+
+from tests.resp_server import start_server
+
+
+@pytest.fixture
+def resp_server():
+    """A stand-in Redis server on a free port, stopped after the test"""
+    server = start_server()
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,24 @@
+# backend/tests/plugins.py
+"""Detectors registered by the tests, as a DETECTORS plugin would be"""
+from app.attacks.base import AttackResult, BaseAttack
+
+
+class KeywordAttack(BaseAttack):
+    """Implements only detect(), as a plugin written for /test would"""
+
+    def detect(self, text: str) -> AttackResult:
+        found = "exfiltrate" in text.lower()
+        return AttackResult(
+            attack_name="Keyword",
+            attack_type="custom",
+            detected=found,
+            severity=0.8 if found else 0.0,
+            confidence=0.9 if found else 1.0,
+            description=f"Length {len(text)}",
+        )
+
+    def generate_payload(self, instruction: str) -> str:
+        return f"exfiltrate {instruction}"
+
+    def get_category(self) -> str:
+        return "custom"
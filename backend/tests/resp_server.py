@@ -0,0 +1,140 @@
+# backend/tests/resp_server.py
+"""
+In-process stand-in for a Redis server, for exercising RedisBackend
+without installing Redis.
+
+Speaks RESP2 and supports the commands RedisBackend and RedisClient send:
+PING, AUTH, SELECT, GET, MGET, INCR, DECR, EXPIRE, DEL, FLUSHDB, MULTI
+and EXEC.
+Data lives in one dict for all databases; commands run one at a time, so
+MULTI/EXEC blocks are atomic.
+
+Used by tests/conftest.py and benchmarks.bench_rate_limit_backends.
+Run from backend/:  python -m tests.resp_server [port]
+"""
+import socketserver
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+
+class Store:
+    def __init__(self):
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def run(self, name, args):
+        if name == b"PING":
+            return b"+PONG\r\n"
+        if name in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"FLUSHDB":
+            self.data.clear()
+            return b"+OK\r\n"
+        if name == b"GET":
+            return bulk(self._get(args[0]))
+        if name == b"MGET":
+            return b"*%d\r\n" % len(args) + b"".join(bulk(self._get(key)) for key in args)
+        if name in (b"INCR", b"DECR"):
+            value = self._get(args[0])
+            try:
+                number = int(value or 0) + (1 if name == b"INCR" else -1)
+            except ValueError:
+                return b"-ERR value is not an integer or out of range\r\n"
+            expires_at = self.data[args[0]][1] if value is not None else None
+            self.data[args[0]] = (str(number).encode(), expires_at)
+            return b":%d\r\n" % number
+        if name == b"EXPIRE":
+            value = self._get(args[0])
+            if value is None:
+                return b":0\r\n"
+            self.data[args[0]] = (value, time.monotonic() + int(args[1]))
+            return b":1\r\n"
+        if name == b"DEL":
+            removed = [key for key in args if self._get(key) is not None]
+            for key in removed:
+                del self.data[key]
+            return b":%d\r\n" % len(removed)
+        return b"-ERR unknown command '%s'\r\n" % name.lower()
+
+
+def bulk(value):
+    return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    # Replies go out as separate writes; don't hold them back for ACKs
+    disable_nagle_algorithm = True
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        queued = None
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            name, args = command[0].upper(), command[1:]
+            if name == b"MULTI":
+                queued = []
+                reply = b"+OK\r\n"
+            elif name == b"EXEC":
+                with store.lock:
+                    replies = [store.run(n, a) for n, a in queued or []]
+                queued = None
+                reply = b"*%d\r\n" % len(replies) + b"".join(replies)
+            elif queued is not None:
+                queued.append((name, args))
+                reply = b"+QUEUED\r\n"
+            else:
+                with store.lock:
+                    reply = store.run(name, args)
+            self.wfile.write(reply)
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), Handler)
+        self.store = Store()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+
+def start_server(port: int = 0) -> RespServer:
+    """Serve on a background thread; port 0 picks a free one"""
+    server = RespServer(port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 6379
+    server = RespServer(port)
+    print(f"Listening on {server.url}")
+    server.serve_forever()
@@ -0,0 +1,37 @@
+# backend/tests/test_client.py
+import asyncio
+import json
+
+import httpx
+
+from app.client import AsyncScanClient, ScanError
+
+
+def batch_server(drop):
+    """A /test/batch that answers every item but those at the indexes in drop"""
+    def handle(request: httpx.Request) -> httpx.Response:
+        items = json.loads(request.content)["items"]
+        results = [{"index": i, "result": {"text": item["text"]}, "error": None}
+                   for i, item in enumerate(items) if i not in drop]
+        return httpx.Response(200, json={"batch_id": "b", "items_tested": len(results), "results": results})
+    return httpx.AsyncClient(transport=httpx.MockTransport(handle), base_url="http://scanner")
+
+
+def test_items_left_out_of_a_batch_response_fail():
+    async def scan_all():
+        async with AsyncScanClient(client=batch_server(drop={1})) as client:
+            return await asyncio.wait_for(
+                asyncio.gather(*(client.scan(text) for text in ["a", "b", "c"]), return_exceptions=True), 5
+            )
+
+    first, second, third = asyncio.run(scan_all())
+    assert first == {"text": "a"} and third == {"text": "c"}
+    assert isinstance(second, ScanError)
+
+
+def test_batches_answer_each_caller():
+    async def scan_all():
+        async with AsyncScanClient(client=batch_server(drop=set())) as client:
+            return await client.scan_many(["a", "b"])
+
+    assert asyncio.run(scan_all()) == [{"text": "a"}, {"text": "b"}]
@@ -0,0 +1,50 @@
+# backend/tests/test_documents.py
+import pytest
+
+from app.documents import DocumentStore, TextEdit
+from app.scanner import Scanner
+
+SCANNER = Scanner(entry_points=False, budget_ms=0)
+NAMES = SCANNER.resolve()
+
+
+def verdicts(results):
+    return {name: (r.detected, r.severity, r.confidence) for name, r in results.items()}
+
+
+@pytest.mark.parametrize("repeats", [100, 600, 1000, 3000])
+@pytest.mark.parametrize("margin", [1024, 0])
+def test_edit_completes_a_match_begun_many_lines_before(repeats, margin):
+    store = DocumentStore(SCANNER.engine, margin=margin)
+    text = "ignore" + " \n" * repeats
+    store.open("doc", text, NAMES)
+    document, results = store.edit("doc", [TextEdit(len(text), 0, "previous instructions")])
+    assert store.partial_scans == 1
+    assert verdicts(results) == verdicts(SCANNER.engine.scan(document.text, NAMES))
+    assert any(r.detected for r in results.values())
+
+
+def test_edits_match_a_full_scan():
+    store = DocumentStore(SCANNER.engine, margin=8)
+    text = "Some notes.\n" * 50
+    store.open("doc", text, NAMES)
+    for offset, delete, insert in [
+        (0, 0, "ignore all\n\n  "), (20, 5, "previous instructions "),
+        (100, 0, "<|im_start|>system\n"), (40, 30, ""), (0, 0, "[INST] you are now"),
+    ]:
+        document, results = store.edit("doc", [TextEdit(offset, delete, insert)])
+        assert verdicts(results) == verdicts(SCANNER.engine.scan(document.text, NAMES))
+
+
+def test_documents_are_per_owner():
+    store = DocumentStore(SCANNER.engine, max_per_owner=2)
+    store.open("doc", "mine", NAMES, owner="a")
+    with pytest.raises(KeyError):
+        store.edit("doc", [TextEdit(0, 0, "x")], owner="b")
+    store.open("doc", "theirs", NAMES, owner="b")
+    assert store.get("doc", owner="a").text == "mine"
+    store.open("two", "", NAMES, owner="a")
+    store.open("three", "", NAMES, owner="a")
+    with pytest.raises(KeyError):
+        store.get("doc", owner="a")
+    assert store.get("doc", owner="b").text == "theirs"
@@ -0,0 +1,38 @@
+# backend/tests/test_metrics.py
+import gc
+import threading
+
+from app import metrics
+
+
+def run_threads(target, count=50):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    gc.collect()
+
+
+def test_ended_threads_are_merged_into_the_totals():
+    counter = metrics.Counter("test_merged_total", "A test counter", ["kind"])
+    histogram = metrics.Histogram("test_merged_seconds", "A test histogram", buckets=(1.0,))
+    try:
+        counter.inc("main")
+
+        def work():
+            counter.inc("a")
+            counter.inc("b", amount=2)
+            histogram.observe(0.5)
+            histogram.observe(2.0)
+
+        run_threads(work)
+        assert len(counter._shards) == 1 and len(histogram._shards) == 0
+        assert counter.values() == {("main",): 1, ("a",): 50, ("b",): 100}
+        assert histogram.values() == {(): [50, 50, 125.0]}
+        run_threads(work)
+        assert counter.value("a") == 100
+        assert histogram.values() == {(): [100, 100, 250.0]}
+    finally:
+        metrics.REGISTRY.remove(counter)
+        metrics.REGISTRY.remove(histogram)
@@ -0,0 +1,60 @@
+# backend/tests/test_prefilter.py
+import random
+import re
+
+import pytest
+
+from app import prefilter
+from app.prefilter import LiteralAutomaton, literal_prefix, trie_pattern
+
+LITERALS = ["ignore", "act", "<|", "[inst]", "you", "system", "```"]
+
+
+@pytest.mark.parametrize("pattern, flags, prefix", [
+    (r"ignore\s+previous", 0, "ignore"),
+    (r"<\|endoftext\|>", 0, "<|endoftext|>"),
+    (r"act\s+as", re.IGNORECASE, "act"),
+    (r"(?:you|we)\s+are", 0, ""),
+    (r"\[INST\]", 0, "[INST]"),
+])
+def test_literal_prefix(pattern, flags, prefix):
+    assert literal_prefix(pattern, flags) == prefix
+
+
+def test_trie_pattern_matches_exactly_its_words():
+    words = ["act", "acting", "a", "ignore", "ign", "<|"]
+    pattern = re.compile(f"(?:{trie_pattern(words)})\\Z")
+    for word in words:
+        assert pattern.match(word)
+    for other in ["ac", "ig", "ignor", "<", "actin"]:
+        assert not pattern.match(other)
+
+
+def occurrences(text, literals):
+    lowered = text.lower()
+    return sorted((i, literal) for literal in literals
+                  for i in range(len(text)) if lowered.startswith(literal, i))
+
+
+@pytest.mark.parametrize("native", [True, False])
+def test_automaton_finds_every_occurrence_ignoring_case(native):
+    random.seed(2)
+    automaton = LiteralAutomaton(LITERALS, native=native)
+    pieces = LITERALS + ["IGNORE", "Act", "<|<|", "xyz", " ", "yo", "SYSTEM"]
+    for _ in range(200):
+        text = "".join(random.choice(pieces) for _ in range(random.randint(0, 20)))
+        assert sorted(automaton.finditer(text)) == occurrences(text, LITERALS), text
+
+
+def test_automaton_matches_non_ascii_text_in_place():
+    # "İ" lowers to two characters, which must not shift the offsets; "ſ"
+    # folds to "s" as it does in the rules' own case-insensitive regexes
+    text = "İİ Ignore ſystem"
+    assert sorted(LiteralAutomaton(LITERALS).finditer(text)) == [(3, "Ignore"), (10, "ſystem")]
+
+
+def test_without_the_extension_the_regex_fallback_is_used(monkeypatch):
+    monkeypatch.setattr(prefilter, "ahocorasick", None)
+    automaton = LiteralAutomaton(LITERALS)
+    assert not automaton.native
+    assert list(automaton.finditer("Act now, ignore it")) == [(0, "act"), (9, "ignore")]
@@ -0,0 +1,23 @@
+# backend/tests/test_rate_limit.py
+from app.middleware.rate_limit import RateLimiter
+
+
+def test_rejected_requests_do_not_extend_the_lockout():
+    limiter = RateLimiter(requests_per_minute=3)
+    assert [limiter.check("client", now=0.0).limited for _ in range(4)] == [False, False, False, True]
+    for second in range(1, 60):
+        status = limiter.check("client", now=float(second))
+        assert status.limited and status.reset_in > 0
+    assert limiter.get_request_count("client", now=59.0) == 3
+    # Only the three admitted requests carry over into the next window
+    assert not limiter.check("client", now=70.0).limited
+
+
+def test_reset_time_is_when_a_request_is_admitted_again():
+    limiter = RateLimiter(requests_per_minute=3)
+    for _ in range(3):
+        limiter.check("client", now=0.0)
+    status = limiter.check("client", now=30.0)
+    assert status.limited
+    assert limiter.check("client", now=30.0 + status.reset_in - 1).limited
+    assert not limiter.check("client", now=30.0 + status.reset_in).limited
@@ -0,0 +1,77 @@
+# backend/tests/test_rate_limit_backends.py
+import socket
+
+import pytest
+
+from app.middleware.rate_limit import RateLimiter
+from app.middleware.rate_limit_backends import MemoryBackend, RedisBackend, RedisClient, RedisError
+
+
+@pytest.fixture
+def unreachable_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"redis://127.0.0.1:{port}/0"
+
+
+def test_encode():
+    assert RedisClient.encode("INCR", "key", 2) == b"*3\r\n$4\r\nINCR\r\n$3\r\nkey\r\n$1\r\n2\r\n"
+
+
+def test_from_url():
+    client = RedisClient.from_url("redis://:p%40ss@cache.internal:6380/2", timeout=1.0)
+    assert (client.host, client.port, client.db, client.password, client.timeout) == (
+        "cache.internal", 6380, 2, "p@ss", 1.0
+    )
+    assert (RedisClient.from_url("redis://").host, RedisClient.from_url("redis://").port) == ("localhost", 6379)
+
+
+def test_pipelines_and_transactions(resp_server):
+    client = RedisClient.from_url(resp_server.url, timeout=1.0)
+    assert client.execute(("PING",), ("INCR", "a"), ("INCR", "a"), ("GET", "a"), ("GET", "missing")) == [
+        "PONG", 1, 2, b"2", None
+    ]
+    assert client.execute(("MULTI",), ("INCR", "a"), ("MGET", "a", "missing"), ("EXEC",)) == [
+        "OK", "QUEUED", "QUEUED", [3, [b"3", None]]
+    ]
+    with pytest.raises(RedisError):
+        client.execute(("NOPE",))
+    # An error reply leaves the connection usable
+    assert client.execute(("GET", "a")) == [b"3"]
+
+
+def test_reconnects_after_a_broken_connection(resp_server):
+    client = RedisClient.from_url(resp_server.url, timeout=1.0)
+    client.execute(("INCR", "a"))
+    client._sock.shutdown(socket.SHUT_RDWR)  # as if the server had dropped it
+    with pytest.raises(OSError):
+        client.execute(("INCR", "a"))
+    assert client.execute(("INCR", "a")) == [2]
+
+
+def test_backend_counts_are_shared(resp_server):
+    first = RedisBackend(RedisClient.from_url(resp_server.url, timeout=1.0))
+    second = RedisBackend(RedisClient.from_url(resp_server.url, timeout=1.0))
+    assert first.hit("client", 10, 60) == (1, 0)
+    assert second.hit("client", 10, 60) == (2, 0)
+    assert second.hit("client", 11, 60) == (1, 2)
+    first.unhit("client", 11)
+    assert first.peek("client", 11) == (0, 2)
+
+
+def test_redis_and_memory_limiters_agree(resp_server):
+    backend = RedisBackend(RedisClient.from_url(resp_server.url, timeout=1.0))
+    redis = RateLimiter(requests_per_minute=3, backend=backend)
+    memory = RateLimiter(requests_per_minute=3, backend=MemoryBackend())
+    for now in [0.0, 1.0, 2.0, 3.0, 30.0, 59.0, 65.0, 70.0, 90.0, 100.0, 130.0]:
+        assert redis.check("client", now=now) == memory.check("client", now=now)
+
+
+def test_fails_open_when_the_server_is_unreachable(unreachable_url):
+    backend = RedisBackend(RedisClient.from_url(unreachable_url, timeout=0.2))
+    limiter = RateLimiter(requests_per_minute=1, backend=backend)
+    assert not any(limiter.check("client", now=0.0).limited for _ in range(3))
+    assert backend.peek("client", 0) == (0, 0)
+    backend.unhit("client", 0)
+    assert limiter.get_remaining_requests("client", now=0.0) == 1
@@ -0,0 +1,43 @@
+# backend/tests/test_sanitizer.py
+import pytest
+
+from app.sanitizer import Sanitizer
+
+
+@pytest.mark.parametrize("text, cleaned, end", [
+    ("<|im_start​|>system", "\\<\\|im_start\\|\\>system", 13),
+    ("[IN​ST]", "\\[INST\\]", 7),
+    ("<​|im_start|>", "\\<\\|im_start\\|\\>", 13),
+])
+def test_stripping_invisible_characters_does_not_rebuild_delimiters(text, cleaned, end):
+    sanitized, spans = Sanitizer().sanitize(text)
+    assert sanitized == cleaned
+    assert [(span.kind, span.action) for span in spans] == [("delimiters", "escape")]
+    assert (spans[0].start, spans[0].end) == (0, end)
+
+
+@pytest.mark.parametrize("text", ["<|IM_START|>", "[inst]", "<<sys>>", "<START_OF_TURN>"])
+def test_delimiters_match_in_any_case(text):
+    sanitized, spans = Sanitizer({"delimiters": "strip"}).sanitize("a" + text + "b")
+    assert sanitized == "a b"
+    assert spans[0].kind == "delimiters"
+
+
+def test_stripped_delimiters_take_the_invisible_characters_inside_them():
+    assert Sanitizer({"delimiters": "strip"}).sanitize("x<|im_start​|>y")[0] == "x y"
+
+
+@pytest.mark.parametrize("text", [
+    "<|im_<|x|>start|>", "[[INST]INST]", "<<|a|>|b|>", "<|im_<​|x|>start|>", "[​[INST]INST]", "<<<|a|>|b|>|c|>",
+])
+def test_stripping_nested_delimiters_does_not_rebuild_them(text):
+    sanitizer = Sanitizer({"delimiters": "strip"})
+    sanitized, spans = sanitizer.sanitize(text)
+    assert "delimiters" in [span.kind for span in spans]
+    assert sanitizer.sanitize(sanitized) == (sanitized, [])
+
+
+def test_escaped_invisible_characters_leave_delimiters_apart():
+    sanitized, spans = Sanitizer({"invisible": "escape"}).sanitize("<|im_start​|>")
+    assert sanitized == "<|im_start\\u200b|>"
+    assert [span.kind for span in spans] == ["invisible"]
@@ -0,0 +1,31 @@
+# backend/tests/test_startup.py
+import subprocess
+import sys
+from pathlib import Path
+
+from app import startup
+from app.startup import StartupTimer
+
+
+def test_phases_are_timed_from_the_previous_mark(monkeypatch):
+    now = iter([10.0, 10.5, 10.75])
+    monkeypatch.setattr(startup.time, "perf_counter", lambda: next(now))
+    timer = StartupTimer()
+    timer.mark("imports")
+    timer.mark("detectors")
+    timer.record_first_request(0.03)
+    timer.record_first_request(0.5)
+    assert timer.get_stats() == {
+        "phases_ms": {"imports": 500.0, "detectors": 250.0},
+        "init_ms": 750.0,
+        "first_request_ms": 30.0,
+    }
+
+
+def test_importing_the_app_leaves_warm_up_to_the_handler():
+    code = ("import sys, app.main; from app.startup import warm_event_loop; "
+            "before = 'anyio._backends._asyncio' in sys.modules; warm_event_loop(); "
+            "print(before, 'anyio._backends._asyncio' in sys.modules)")
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).parents[1]).stdout
+    assert output.split() == ["False", "True"]
@@ -29,7 +29,7 @@ interface TestResponse {
   overall_risk_score: number;
   results: AttackResult[];
   recommendations: string[];
-  cleaned_text: string;
+  cleaned_text?: string | null;
 }
 
 const EXAMPLE_PROMPTS = [
@@ -164,7 +164,7 @@ const Documentation = () => {
                           <div>&nbsp;&nbsp;&nbsp;&nbsp;<span className="text-green-600">"Block this input"</span>,</div>
                           <div>&nbsp;&nbsp;&nbsp;&nbsp;<span className="text-green-600">"Review system prompt structure"</span></div>
                           <div>&nbsp;&nbsp;],</div>
-                          <div>&nbsp;&nbsp;"cleaned_text": <span className="text-green-600">"[REDACTED]"</span></div>
+                          <div>&nbsp;&nbsp;"cleaned_text": <span className="text-blue-600">null</span></div>
                           <div>&#125;</div>
                         </code>
                       </div>